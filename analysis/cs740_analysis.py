@@ -4,304 +4,246 @@ CS740 DNS Performance Analysis — Complete Pipeline
 Consolidates data → Computes stats → Generates figures
 """
 
+import argparse
 import os
+import sys
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
-# ============================================================
-# CONFIG
-# ============================================================
-RAW_DIR = "/home/claude/data/raw"
-OUT_DATA = "/mnt/user-data/outputs/data_clean"
-OUT_FIGS = "/mnt/user-data/outputs/figs"
-os.makedirs(OUT_DATA, exist_ok=True)
-os.makedirs(OUT_FIGS, exist_ok=True)
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+from cs740.correlate import join, regress, site_shares
+from cs740.figures import ANALYSIS_FIGURES, dns_phases, render
+from cs740.loader import load_dataset, precise_ms
+from cs740.pagedns import PAGE_DNS_COLS, page_dns, with_load_share
+from cs740.stats import compare_modes, with_ci
+from cs740.summary import GROUP_KEYS, stat_series, summarize
 
-DNS_HEADER = ["timestamp", "mode", "site", "trial", "ms", "status"]
-WEB_HEADER = ["timestamp", "mode", "site", "ttfb_ms", "dom_ms", "load_ms", "status"]
-
-# ============================================================
-# CHUNK 2: DATA CONSOLIDATION
 # ============================================================
-print("=" * 60)
-print("CHUNK 2: Consolidating raw data...")
-print("=" * 60)
-
-def load_dns(filename, mode_override=None, cache_state="cold"):
-    """Load DNS CSV, handle with/without headers."""
-    path = os.path.join(RAW_DIR, filename)
-    if not os.path.exists(path):
-        print(f"  [SKIP] {filename} not found")
-        return pd.DataFrame()
-    
-    # Check if has header
-    with open(path) as f:
-        first = f.readline()
-    has_header = first.startswith("iso") or first.startswith("timestamp")
-    
-    if has_header:
-        df = pd.read_csv(path)
-        df.columns = DNS_HEADER[:len(df.columns)]
-    else:
-        df = pd.read_csv(path, header=None, names=DNS_HEADER)
-    
-    if mode_override:
-        df["mode"] = mode_override
-    df["cache_state"] = cache_state
-    df = df[df["status"] == "ok"]
-    df["ms"] = pd.to_numeric(df["ms"], errors="coerce")
-    print(f"  [OK] {filename}: {len(df)} rows")
-    return df
-
-def load_web(filename, mode_override=None):
-    """Load web CSV."""
-    path = os.path.join(RAW_DIR, filename)
-    if not os.path.exists(path):
-        print(f"  [SKIP] {filename} not found")
-        return pd.DataFrame()
-    
-    with open(path) as f:
-        first = f.readline()
-    has_header = first.startswith("iso") or first.startswith("ts")
-    
-    if has_header:
-        df = pd.read_csv(path)
-        df.columns = WEB_HEADER[:len(df.columns)]
-    else:
-        df = pd.read_csv(path, header=None, names=WEB_HEADER)
-    
-    if mode_override:
-        df["mode"] = mode_override
-    df = df[df["status"] == "ok"]
-    for col in ["ttfb_ms", "dom_ms", "load_ms"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    print(f"  [OK] {filename}: {len(df)} rows")
-    return df
-
-# Load all DNS data
-dns_frames = [
-    load_dns("dns_public_cold.csv", "public_udp", "cold"),
-    load_dns("dns_public_warm.csv", "public_udp", "warm"),
-    load_dns("dns_isp.csv", "isp_udp", "cold"),  # ISP data treated as cold
-    load_dns("dns_dot_cold.csv", "dot", "cold"),
-    load_dns("dns_dot_warm.csv", "dot", "warm"),
-    load_dns("dns_doh.csv", "doh", "cold"),
-]
-dns_all = pd.concat([df for df in dns_frames if len(df) > 0], ignore_index=True)
-
-# Load all web data
-web_frames = [
-    load_web("web_public.csv", "public_udp"),
-    load_web("web_isp.csv", "isp_udp"),
-    load_web("web_dot.csv", "dot"),
-    load_web("web_doh.csv", "doh"),
-]
-web_all = pd.concat([df for df in web_frames if len(df) > 0], ignore_index=True)
-
-# Save consolidated
-dns_all.to_csv(f"{OUT_DATA}/dns_all.csv", index=False)
-web_all.to_csv(f"{OUT_DATA}/web_all.csv", index=False)
-print(f"\n  Saved: dns_all.csv ({len(dns_all)} rows), web_all.csv ({len(web_all)} rows)")
-
-# ============================================================
-# CHUNK 3: CORE ANALYSIS
+# CONFIG
 # ============================================================
-print("\n" + "=" * 60)
-print("CHUNK 3: Computing statistics...")
-print("=" * 60)
-
-# --- DNS Statistics ---
-# Filter out 0ms (cached) for cold analysis, keep for warm
-dns_cold = dns_all[(dns_all["cache_state"] == "cold") & (dns_all["ms"] > 0)]
-dns_warm = dns_all[dns_all["cache_state"] == "warm"]
-
-dns_summary = []
-for mode in ["public_udp", "isp_udp", "dot", "doh"]:
-    cold_data = dns_cold[dns_cold["mode"] == mode]["ms"]
-    warm_data = dns_warm[dns_warm["mode"] == mode]["ms"]
-    
-    cold_med = cold_data.median() if len(cold_data) > 0 else np.nan
-    warm_med = warm_data.median() if len(warm_data) > 0 else np.nan
-    improvement = ((cold_med - warm_med) / cold_med * 100) if cold_med > 0 else np.nan
-    
-    dns_summary.append({
-        "mode": mode,
-        "cold_median_ms": round(cold_med, 1) if not np.isnan(cold_med) else "N/A",
-        "warm_median_ms": round(warm_med, 1) if not np.isnan(warm_med) else "N/A",
-        "cold_mean_ms": round(cold_data.mean(), 1) if len(cold_data) > 0 else "N/A",
-        "cold_std_ms": round(cold_data.std(), 1) if len(cold_data) > 0 else "N/A",
-        "samples_cold": len(cold_data),
-        "samples_warm": len(warm_data),
-        "improvement_%": round(improvement, 1) if not np.isnan(improvement) else "N/A"
+RAW_DIR = os.path.join(REPO_DIR, "data/raw")
+OUT_DATA = os.path.join(REPO_DIR, "data/clean")
+OUT_FIGS = os.path.join(REPO_DIR, "figs")
+
+MODES = ["public_udp", "isp_udp", "dot", "doh"]
+ENCRYPTED = ["dot", "doh"]
+
+
+def fmt(series, digits=1):
+    """Rounded values with N/A for modes without samples."""
+    return series.round(digits).astype(object).where(series.notna(), "N/A")
+
+
+def main(raw_dir=RAW_DIR, out_data=OUT_DATA, out_figs=OUT_FIGS):
+    os.makedirs(out_data, exist_ok=True)
+    os.makedirs(out_figs, exist_ok=True)
+
+    # ============================================================
+    # CHUNK 2: DATA CONSOLIDATION
+    # ============================================================
+    print("=" * 60)
+    print("CHUNK 2: Consolidating raw data...")
+    print("=" * 60)
+
+    dataset = load_dataset(raw_dir)
+    dns_all = dataset.dns[dataset.dns["status"] == "ok"]
+    web_all = dataset.web[dataset.web["status"] == "ok"]
+    for (mode, state), n in dns_all.groupby(["mode", "cache_state"], observed=True).size().items():
+        print(f"  [OK] dns {mode}/{state}: {n} rows")
+    for mode, n in web_all.groupby("mode", observed=True).size().items():
+        print(f"  [OK] web {mode}: {n} rows")
+
+    # Save consolidated
+    dns_all.to_csv(f"{out_data}/dns_all.csv", index=False)
+    web_all.to_csv(f"{out_data}/web_all.csv", index=False)
+    print(f"\n  Saved: dns_all.csv ({len(dns_all)} rows), web_all.csv ({len(web_all)} rows)")
+
+    # ============================================================
+    # CHUNK 3: CORE ANALYSIS
+    # ============================================================
+    print("\n" + "=" * 60)
+    print("CHUNK 3: Computing statistics...")
+    print("=" * 60)
+
+    # --- DNS Statistics (float ms from the us column) ---
+    # Filter out dig's 0ms (below its resolution) for cold analysis, keep for warm
+    dns_ms = precise_ms(dns_all, drop_unresolved=False)
+    dns_cold = precise_ms(dns_all[dns_all["cache_state"] == "cold"])
+    dns_resolved = precise_ms(dns_all, drop_unresolved="cold")
+    dns_stats = with_ci(summarize(dns_resolved, by=["mode", "cache_state"]), dns_resolved,
+                        by=["mode", "cache_state"])
+    dns_site_stats = with_ci(summarize(dns_ms, by=GROUP_KEYS), dns_ms, by=GROUP_KEYS)
+
+    cold_stats = dns_stats[dns_stats["cache_state"] == "cold"].set_index("mode").reindex(MODES)
+    warm_stats = dns_stats[dns_stats["cache_state"] == "warm"].set_index("mode").reindex(MODES)
+    dns_summary_df = pd.DataFrame({
+        "mode": MODES,
+        "cold_median_ms": fmt(cold_stats["median"]).values,
+        "cold_median_ci_low_ms": fmt(cold_stats["median_ci_low"]).values,
+        "cold_median_ci_high_ms": fmt(cold_stats["median_ci_high"]).values,
+        "warm_median_ms": fmt(warm_stats["median"]).values,
+        "warm_median_ci_low_ms": fmt(warm_stats["median_ci_low"]).values,
+        "warm_median_ci_high_ms": fmt(warm_stats["median_ci_high"]).values,
+        "cold_mean_ms": fmt(cold_stats["mean"]).values,
+        "cold_std_ms": fmt(cold_stats["std"]).values,
+        "samples_cold": cold_stats["count"].fillna(0).astype(int).values,
+        "samples_warm": warm_stats["count"].fillna(0).astype(int).values,
+        "improvement_%": fmt(cold_stats["improvement_pct"]).values,
     })
-
-dns_summary_df = pd.DataFrame(dns_summary)
-print("\n📊 DNS Latency Summary:")
-print(dns_summary_df.to_string(index=False))
-
-# --- Web Statistics ---
-web_summary = []
-for mode in ["public_udp", "isp_udp", "dot", "doh"]:
-    mode_data = web_all[web_all["mode"] == mode]
-    if len(mode_data) == 0:
-        continue
-    web_summary.append({
-        "mode": mode,
-        "ttfb_median_ms": round(mode_data["ttfb_ms"].median(), 0),
-        "dom_median_ms": round(mode_data["dom_ms"].median(), 0),
-        "load_median_ms": round(mode_data["load_ms"].median(), 0),
-        "samples": len(mode_data)
+    print("\n📊 DNS Latency Summary:")
+    print(dns_summary_df.to_string(index=False))
+
+    # --- Web Statistics ---
+    web_stats = with_ci(summarize(web_all, values=["ttfb_ms", "dom_ms", "load_ms"], by=["mode"]),
+                        web_all, values=["ttfb_ms", "dom_ms", "load_ms"], by=["mode"])
+    web_load_ci = web_stats[web_stats["metric"] == "load_ms"].set_index("mode")
+    web_medians = (web_stats.pivot(index="mode", columns="metric", values="median")
+                   .reindex(MODES).dropna(how="all"))
+    web_summary_df = pd.DataFrame({
+        "mode": web_medians.index,
+        "ttfb_median_ms": web_medians["ttfb_ms"].round(0).values,
+        "dom_median_ms": web_medians["dom_ms"].round(0).values,
+        "load_median_ms": web_medians["load_ms"].round(0).values,
+        "load_median_ci_low_ms": web_load_ci["median_ci_low"].reindex(web_medians.index).round(0).values,
+        "load_median_ci_high_ms": web_load_ci["median_ci_high"].reindex(web_medians.index).round(0).values,
+        "samples": stat_series(web_stats, "count", metric="load_ms")
+                   .reindex(web_medians.index).astype(int).values,
     })
-
-web_summary_df = pd.DataFrame(web_summary)
-print("\n📊 Page Load Summary:")
-print(web_summary_df.to_string(index=False))
-
-# --- Encrypted vs Unencrypted Comparison ---
-print("\n📊 Encrypted vs Unencrypted DNS:")
-unenc = dns_cold[dns_cold["mode"].isin(["public_udp", "isp_udp"])]["ms"]
-enc = dns_cold[dns_cold["mode"].isin(["dot", "doh"])]["ms"]
-print(f"  Unencrypted (public+isp) median: {unenc.median():.1f} ms")
-print(f"  Encrypted (DoT+DoH) median:      {enc.median():.1f} ms")
-print(f"  Overhead: {enc.median() - unenc.median():.1f} ms ({(enc.median()/unenc.median()-1)*100:.1f}%)")
-
-# Save summaries
-dns_summary_df.to_csv(f"{OUT_DATA}/dns_summary.csv", index=False)
-web_summary_df.to_csv(f"{OUT_DATA}/web_summary.csv", index=False)
-print(f"\n  Saved: dns_summary.csv, web_summary.csv")
-
-# ============================================================
-# CHUNK 4: VISUALIZATIONS
-# ============================================================
-print("\n" + "=" * 60)
-print("CHUNK 4: Generating figures...")
-print("=" * 60)
-
-plt.style.use('seaborn-v0_8-whitegrid')
-COLORS = {'public_udp': '#2ecc71', 'isp_udp': '#3498db', 'dot': '#9b59b6', 'doh': '#e74c3c'}
-LABELS = {'public_udp': 'Public UDP', 'isp_udp': 'ISP UDP', 'dot': 'DoT', 'doh': 'DoH'}
-
-# --- Figure 1: DNS Latency by Mode (Cold) ---
-fig1, ax1 = plt.subplots(figsize=(8, 5))
-modes = ["public_udp", "isp_udp", "dot", "doh"]
-medians = [dns_cold[dns_cold["mode"] == m]["ms"].median() for m in modes]
-stds = [dns_cold[dns_cold["mode"] == m]["ms"].std() for m in modes]
-
-bars = ax1.bar([LABELS[m] for m in modes], medians, color=[COLORS[m] for m in modes], 
-               yerr=stds, capsize=5, edgecolor='black', linewidth=1.2)
-ax1.set_ylabel("DNS Latency (ms)", fontsize=12)
-ax1.set_xlabel("DNS Mode", fontsize=12)
-ax1.set_title("DNS Resolution Time by Mode (Cold Cache)", fontsize=14, fontweight='bold')
-ax1.set_ylim(0, max(medians) * 1.3)
-for bar, med in zip(bars, medians):
-    ax1.annotate(f'{med:.0f}', xy=(bar.get_x() + bar.get_width()/2, bar.get_height()),
-                 ha='center', va='bottom', fontsize=11, fontweight='bold')
-plt.tight_layout()
-plt.savefig(f"{OUT_FIGS}/fig1_dns_latency_by_mode.png", dpi=150)
-print("  [OK] fig1_dns_latency_by_mode.png")
-
-# --- Figure 2: Cold vs Warm Comparison ---
-fig2, ax2 = plt.subplots(figsize=(8, 5))
-x = np.arange(len(modes))
-width = 0.35
-
-cold_meds = [dns_cold[dns_cold["mode"] == m]["ms"].median() for m in modes]
-warm_meds = []
-for m in modes:
-    w = dns_warm[dns_warm["mode"] == m]["ms"]
-    warm_meds.append(w.median() if len(w) > 0 else 0)
-
-bars1 = ax2.bar(x - width/2, cold_meds, width, label='Cold', color='#e74c3c', edgecolor='black')
-bars2 = ax2.bar(x + width/2, warm_meds, width, label='Warm', color='#2ecc71', edgecolor='black')
-
-ax2.set_ylabel("DNS Latency (ms)", fontsize=12)
-ax2.set_xlabel("DNS Mode", fontsize=12)
-ax2.set_title("Cold vs Warm DNS Lookup Time", fontsize=14, fontweight='bold')
-ax2.set_xticks(x)
-ax2.set_xticklabels([LABELS[m] for m in modes])
-ax2.legend()
-ax2.set_ylim(0, max(cold_meds) * 1.2)
-plt.tight_layout()
-plt.savefig(f"{OUT_FIGS}/fig2_cold_vs_warm.png", dpi=150)
-print("  [OK] fig2_cold_vs_warm.png")
-
-# --- Figure 3: Page Load Breakdown ---
-fig3, ax3 = plt.subplots(figsize=(9, 5))
-web_modes = web_summary_df["mode"].tolist()
-ttfb = web_summary_df["ttfb_median_ms"].tolist()
-dom_only = (web_summary_df["dom_median_ms"] - web_summary_df["ttfb_median_ms"]).tolist()
-load_only = (web_summary_df["load_median_ms"] - web_summary_df["dom_median_ms"]).tolist()
-
-x = np.arange(len(web_modes))
-ax3.bar(x, ttfb, label='TTFB', color='#3498db', edgecolor='black')
-ax3.bar(x, dom_only, bottom=ttfb, label='DOM Load', color='#f39c12', edgecolor='black')
-ax3.bar(x, load_only, bottom=[t+d for t,d in zip(ttfb, dom_only)], label='Full Load', color='#e74c3c', edgecolor='black')
-
-ax3.set_ylabel("Time (ms)", fontsize=12)
-ax3.set_xlabel("DNS Mode", fontsize=12)
-ax3.set_title("Page Load Time Breakdown by DNS Mode", fontsize=14, fontweight='bold')
-ax3.set_xticks(x)
-ax3.set_xticklabels([LABELS[m] for m in web_modes])
-ax3.legend(loc='upper right')
-plt.tight_layout()
-plt.savefig(f"{OUT_FIGS}/fig3_pageload_breakdown.png", dpi=150)
-print("  [OK] fig3_pageload_breakdown.png")
-
-# --- Figure 4: DNS Box Plot ---
-fig4, ax4 = plt.subplots(figsize=(9, 5))
-box_data = [dns_cold[dns_cold["mode"] == m]["ms"].dropna().values for m in modes]
-bp = ax4.boxplot(box_data, labels=[LABELS[m] for m in modes], patch_artist=True)
-for patch, mode in zip(bp['boxes'], modes):
-    patch.set_facecolor(COLORS[mode])
-    patch.set_alpha(0.7)
-ax4.set_ylabel("DNS Latency (ms)", fontsize=12)
-ax4.set_xlabel("DNS Mode", fontsize=12)
-ax4.set_title("DNS Latency Distribution (Cold Cache)", fontsize=14, fontweight='bold')
-plt.tight_layout()
-plt.savefig(f"{OUT_FIGS}/fig4_dns_boxplot.png", dpi=150)
-print("  [OK] fig4_dns_boxplot.png")
-
-# --- Figure 5: Encrypted vs Unencrypted Summary ---
-fig5, ax5 = plt.subplots(figsize=(6, 5))
-categories = ['Unencrypted\n(Public+ISP)', 'Encrypted\n(DoT+DoH)']
-values = [unenc.median(), enc.median()]
-colors = ['#2ecc71', '#9b59b6']
-bars = ax5.bar(categories, values, color=colors, edgecolor='black', linewidth=1.5)
-ax5.set_ylabel("Median DNS Latency (ms)", fontsize=12)
-ax5.set_title("Encrypted vs Unencrypted DNS", fontsize=14, fontweight='bold')
-for bar, val in zip(bars, values):
-    ax5.annotate(f'{val:.1f} ms', xy=(bar.get_x() + bar.get_width()/2, bar.get_height()),
-                 ha='center', va='bottom', fontsize=12, fontweight='bold')
-ax5.set_ylim(0, max(values) * 1.25)
-plt.tight_layout()
-plt.savefig(f"{OUT_FIGS}/fig5_encrypted_comparison.png", dpi=150)
-print("  [OK] fig5_encrypted_comparison.png")
-
-# ============================================================
-# FINAL SUMMARY
-# ============================================================
-print("\n" + "=" * 60)
-print("✅ COMPLETE!")
-print("=" * 60)
-print(f"""
+    print("\n📊 Page Load Summary:")
+    print(web_summary_df.to_string(index=False))
+
+    # --- DNS Time per Page (browser resource timing) ---
+    page_dns_df = with_load_share(page_dns(dataset.req), web_all)
+    page_dns_stats = summarize(page_dns_df, values=PAGE_DNS_COLS, by=["mode", "cache_state"])
+    print("\n📊 DNS Time per Page Load (median per mode):")
+    if page_dns_df.empty:
+        print("  (no per-request timings in these files; collect them with python3 -m cs740.pageload)")
+    else:
+        print(page_dns_stats.pivot(index=["mode", "cache_state"], columns="metric", values="median")
+              [PAGE_DNS_COLS].round(1).to_string())
+
+    # --- DNS Lookups Joined to the Page Loads They Precede (per mode, site, run) ---
+    dns_page_df = join(dataset.dns, dataset.web)
+    dns_page_sites = site_shares(dns_page_df)
+    dns_page_fit = regress(dns_page_df)
+    print(f"\n📊 DNS Share of Page Loads ({len(dns_page_df)} of {len(web_all)} loads matched to a DNS run):")
+    if dns_page_df.empty:
+        print("  (no page load within a minute of a DNS run of the same mode / site / state)")
+    else:
+        print(site_shares(dns_page_df, by=["mode"]).round(1).to_string(index=False))
+        print(dns_page_fit[["mode", "metric", "n", "slope", "slope_ci_low", "slope_ci_high", "r2",
+                            "pearson_r", "spearman_rho"]].round(3).to_string(index=False))
+
+    # --- Pairwise Mode Differences (bootstrap CI of the median difference + tests) ---
+    mode_cmp = compare_modes(dns_resolved, by=["cache_state"])
+    mode_site_cmp = compare_modes(dns_ms, by=["cache_state", "site"])
+    print("\n📊 Median DNS Latency Differences Between Modes (a - b, 95% CI):")
+    if mode_cmp.empty:
+        print("  (fewer than two modes)")
+    else:
+        print(mode_cmp[["cache_state", "mode_a", "mode_b", "diff", "diff_ci_low", "diff_ci_high",
+                        "mwu_p", "perm_p"]].round(3).to_string(index=False))
+
+    # --- Encrypted vs Unencrypted Comparison ---
+    print("\n📊 Encrypted vs Unencrypted DNS:")
+    dns_enc = dns_cold.assign(encrypted=dns_cold["mode"].isin(ENCRYPTED))
+    enc_stats = with_ci(summarize(dns_enc, by=["encrypted"]), dns_enc, by=["encrypted"])
+    enc_medians = stat_series(enc_stats, "median", index="encrypted")
+    enc_ci = enc_stats.set_index("encrypted")[["median_ci_low", "median_ci_high"]].reindex([False, True])
+    unenc_median, enc_median = enc_medians.get(False, np.nan), enc_medians.get(True, np.nan)
+    enc_cmp = compare_modes(dns_enc, mode_col="encrypted", pairs=[(True, False)])
+    overhead = enc_cmp.iloc[0] if len(enc_cmp) else pd.Series(np.nan, index=enc_cmp.columns)
+    print(f"  Unencrypted (public+isp) median: {unenc_median:.1f} ms")
+    print(f"  Encrypted (DoT+DoH) median:      {enc_median:.1f} ms")
+    print(f"  Overhead: {enc_median - unenc_median:.1f} ms ({(enc_median/unenc_median-1)*100:.1f}%), "
+          f"95% CI [{overhead['diff_ci_low']:.1f}, {overhead['diff_ci_high']:.1f}] ms, "
+          f"Mann-Whitney p={overhead['mwu_p']:.3g}")
+
+    # --- DNS Phase Breakdown (lookups timed by cs740.measure) ---
+    # Mean time per phase, connect/TLS counted as 0 on reused connections, so
+    # the phases of a mode add up to its mean cost per lookup
+    phase_df = dns_phases(dataset.dns)
+    print("\n📊 DNS Phase Breakdown (mean ms per lookup):")
+    if phase_df.empty:
+        print("  (no per-phase timings in these files; collect them with python3 -m cs740.measure)")
+    else:
+        print(phase_df.to_string(index=False))
+
+    # Save summaries
+    dns_summary_df.to_csv(f"{out_data}/dns_summary.csv", index=False)
+    web_summary_df.to_csv(f"{out_data}/web_summary.csv", index=False)
+    dns_site_stats.to_csv(f"{out_data}/dns_stats.csv", index=False)
+    phase_df.to_csv(f"{out_data}/dns_phase_breakdown.csv", index=False)
+    page_dns_df.to_csv(f"{out_data}/page_dns.csv", index=False)
+    page_dns_stats.to_csv(f"{out_data}/page_dns_stats.csv", index=False)
+    mode_cmp.to_csv(f"{out_data}/dns_mode_comparison.csv", index=False)
+    mode_site_cmp.to_csv(f"{out_data}/dns_mode_comparison_by_site.csv", index=False)
+    dns_page_df.to_csv(f"{out_data}/dns_page_join.csv", index=False)
+    dns_page_sites.to_csv(f"{out_data}/dns_page_site_shares.csv", index=False)
+    dns_page_fit.to_csv(f"{out_data}/dns_page_regression.csv", index=False)
+    print(f"\n  Saved: dns_summary.csv, web_summary.csv, dns_stats.csv, dns_phase_breakdown.csv, "
+          f"page_dns.csv, page_dns_stats.csv, dns_mode_comparison.csv, dns_mode_comparison_by_site.csv, "
+          f"dns_page_join.csv, dns_page_site_shares.csv, dns_page_regression.csv")
+
+    # ============================================================
+    # CHUNK 4: VISUALIZATIONS
+    # ============================================================
+    print("\n" + "=" * 60)
+    print("CHUNK 4: Generating figures...")
+    print("=" * 60)
+
+    # Same figures as `python3 -m cs740.figures 'fig*'`, drawn in parallel from the
+    # tables computed above; unchanged figures are not redrawn
+    render(ANALYSIS_FIGURES, raw_dir, out_figs, modes=MODES, tables={
+        "dns_states": dns_stats, "dns_cold": dns_cold[["mode", "ms"]], "dns_encrypted": enc_stats,
+        "web_breakdown": web_stats, "dns_phases": phase_df, "dns_page_join": dns_page_df,
+        "dns_page_fit": dns_page_fit})
+
+    # ============================================================
+    # FINAL SUMMARY
+    # ============================================================
+    print("\n" + "=" * 60)
+    print("✅ COMPLETE!")
+    print("=" * 60)
+    print(f"""
 📁 Output Files:
-   {OUT_DATA}/dns_all.csv
-   {OUT_DATA}/web_all.csv
-   {OUT_DATA}/dns_summary.csv
-   {OUT_DATA}/web_summary.csv
+   {out_data}/dns_all.csv
+   {out_data}/web_all.csv
+   {out_data}/dns_summary.csv
+   {out_data}/web_summary.csv
+   {out_data}/dns_stats.csv
+   {out_data}/dns_phase_breakdown.csv
+   {out_data}/page_dns.csv
+   {out_data}/page_dns_stats.csv
+   {out_data}/dns_mode_comparison.csv
+   {out_data}/dns_mode_comparison_by_site.csv
+   {out_data}/dns_page_join.csv
+   {out_data}/dns_page_site_shares.csv
+   {out_data}/dns_page_regression.csv
    
 📊 Figures:
-   {OUT_FIGS}/fig1_dns_latency_by_mode.png
-   {OUT_FIGS}/fig2_cold_vs_warm.png
-   {OUT_FIGS}/fig3_pageload_breakdown.png
-   {OUT_FIGS}/fig4_dns_boxplot.png
-   {OUT_FIGS}/fig5_encrypted_comparison.png
+   {out_figs}/fig1_dns_latency_by_mode.png
+   {out_figs}/fig2_cold_vs_warm.png
+   {out_figs}/fig3_pageload_breakdown.png
+   {out_figs}/fig4_dns_boxplot.png
+   {out_figs}/fig5_encrypted_comparison.png
+   {out_figs}/fig6_dns_phase_breakdown.png (when phase timings exist)
+   {out_figs}/fig7_dns_vs_page_load.png (when page loads follow DNS runs)
 
 📈 Key Findings:
-   • Public UDP median: {dns_cold[dns_cold["mode"]=="public_udp"]["ms"].median():.1f} ms
-   • ISP UDP median: {dns_cold[dns_cold["mode"]=="isp_udp"]["ms"].median():.1f} ms  
-   • DoT median: {dns_cold[dns_cold["mode"]=="dot"]["ms"].median():.1f} ms
-   • DoH median: {dns_cold[dns_cold["mode"]=="doh"]["ms"].median():.1f} ms
-   • Encryption overhead: ~{enc.median() - unenc.median():.1f} ms
+   • Public UDP median: {cold_stats.loc["public_udp", "median"]:.1f} ms (95% CI {cold_stats.loc["public_udp", "median_ci_low"]:.1f}-{cold_stats.loc["public_udp", "median_ci_high"]:.1f})
+   • ISP UDP median: {cold_stats.loc["isp_udp", "median"]:.1f} ms (95% CI {cold_stats.loc["isp_udp", "median_ci_low"]:.1f}-{cold_stats.loc["isp_udp", "median_ci_high"]:.1f})
+   • DoT median: {cold_stats.loc["dot", "median"]:.1f} ms (95% CI {cold_stats.loc["dot", "median_ci_low"]:.1f}-{cold_stats.loc["dot", "median_ci_high"]:.1f})
+   • DoH median: {cold_stats.loc["doh", "median"]:.1f} ms (95% CI {cold_stats.loc["doh", "median_ci_low"]:.1f}-{cold_stats.loc["doh", "median_ci_high"]:.1f})
+   • Encryption overhead: ~{enc_median - unenc_median:.1f} ms (95% CI {overhead['diff_ci_low']:.1f} to {overhead['diff_ci_high']:.1f}, Mann-Whitney p={overhead['mwu_p']:.3g})
 """)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Consolidate data, compute statistics and draw the figures.")
+    ap.add_argument("--raw-dir", default=RAW_DIR)
+    ap.add_argument("--out-data", default=OUT_DATA)
+    ap.add_argument("--out-figs", default=OUT_FIGS)
+    args = ap.parse_args()
+    main(args.raw_dir, args.out_data, args.out_figs)
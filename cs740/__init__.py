@@ -0,0 +1,14 @@
+"""
+CS740 DNS measurement toolkit — shared code used by the figure scripts
+and analysis/cs740_analysis.py.
+
+Run `python3 -m cs740 --help` for the command-line tools (cs740.cli).
+The defaults below live here, away from the pandas-backed modules, so
+that the CLI can use them without importing those.
+"""
+
+import os
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get("CS740_CACHE_DIR", os.path.join(REPO_DIR, "data", "cache"))
+DEFAULT_DIRS = ("data_for_submission/pop_raw", "data_for_submission/unpop_raw")
@@ -0,0 +1,3 @@
+from cs740.cli import main
+
+main()
@@ -0,0 +1,93 @@
+"""
+Adaptive trial counts: keep measuring a (mode, site, cache state) until the
+bootstrap confidence interval of its median latency is narrow enough.
+
+- StopRule.check() looks at the latencies measured so far and says whether
+  to stop, and why: `converged` (CI width within ci_width_ms, or within
+  ci_rel of the median), `failing` (min_trials reached without a single
+  answer) or `max_trials` (budget spent).
+- The CI is a percentile bootstrap (cs740.stats) over the successful
+  trials, drawn with a fixed seed so re-checking the same samples gives
+  the same answer (a resumed campaign stops exactly where the first run
+  would have).
+- Every stop is logged as a Stop row to a `_stops` file next to the raw
+  data (see stops_path()); the loader ignores those files.
+"""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from cs740.stats import BOOTSTRAP_RESAMPLES, BOOTSTRAP_SEED, DEFAULT_LEVEL, quantile_ci
+
+STOP_HEADER = ["iso", "mode", "site", "trials", "ok", "median_ms", "ci_low_ms", "ci_high_ms", "reason"]
+DEFAULT_MIN_TRIALS = 5
+DEFAULT_MAX_TRIALS = 50
+DEFAULT_CI_WIDTH_MS = 2.0
+
+Stop = namedtuple("Stop", STOP_HEADER)
+
+
+def median_ci(values, level=DEFAULT_LEVEL, resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED):
+    """Percentile-bootstrap (low, high) CI of the median of values."""
+    values = np.asarray(values, dtype="float64")
+    if len(values) < 2:
+        return np.nan, np.nan
+    ci = quantile_ci(pd.DataFrame({"ms": values}), by=(), level=level, resamples=resamples, seed=seed)
+    return float(ci["ci_low"].iloc[0]), float(ci["ci_high"].iloc[0])
+
+
+def _ms(value):
+    return "NA" if value != value else f"{value:.3f}"
+
+
+def stops_path(out):
+    """Where the stop log of the raw file out goes (x.csv -> x_stops.csv)."""
+    stem, ext = os.path.splitext(out)
+    return f"{stem}_stops{ext or '.csv'}"
+
+
+class StopRule:
+    """When to stop measuring one (mode, site, cache state)."""
+
+    def __init__(self, min_trials=DEFAULT_MIN_TRIALS, max_trials=DEFAULT_MAX_TRIALS,
+                 ci_width_ms=DEFAULT_CI_WIDTH_MS, ci_rel=None, level=DEFAULT_LEVEL):
+        if not 1 <= min_trials <= max_trials:
+            raise ValueError("need 1 <= min_trials <= max_trials")
+        self.min_trials = min_trials
+        self.max_trials = max_trials
+        self.ci_width_ms = ci_width_ms
+        self.ci_rel = ci_rel
+        self.level = level
+
+    def check(self, trials, values_ms):
+        """(reason, median, low, high) after `trials` trials with successful latencies values_ms.
+
+        reason is None while more trials are needed.
+        """
+        values = [v for v in values_ms if v == v]    # drop NaN
+        median = float(np.median(values)) if values else np.nan
+        low, high = median_ci(values, self.level)
+        if trials < self.min_trials:
+            return None, median, low, high
+        if not values:
+            return "failing", median, low, high
+        width = high - low
+        limit = self.ci_width_ms if self.ci_width_ms is not None else 0.0
+        if self.ci_rel is not None:
+            limit = max(limit, self.ci_rel * abs(median))
+        if width == width and width <= limit:
+            return "converged", median, low, high
+        if trials >= self.max_trials:
+            return "max_trials", median, low, high
+        return None, median, low, high
+
+    def stop(self, iso, mode, site, trials, values_ms):
+        """A Stop row if (mode, site) is done after `trials` trials, else None."""
+        reason, median, low, high = self.check(trials, values_ms)
+        if reason is None:
+            return None
+        ok = sum(v == v for v in values_ms)
+        return Stop(iso, mode, site, trials, ok, _ms(median), _ms(low), _ms(high), reason)
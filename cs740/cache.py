@@ -0,0 +1,173 @@
+"""
+Persistent columnar cache of the consolidated DNS / web / req tables.
+
+- One cache entry per list of raw directories:
+      <CACHE_DIR>/<key>/dns.parquet, web.parquet, req.parquet, manifest.json
+- The manifest records, per table and in row order, every source file's
+  path, size, mtime and row count.
+- On load, rows of files whose (path, size, mtime) are unchanged are sliced
+  straight out of the cached table; only new or modified files are
+  re-parsed. The entry is rewritten only when something changed.
+- The measurement scripts only ever append, so for each file the manifest
+  also keeps the byte offset consumed so far and the last row read there.
+  If that row is still in place, only the appended tail is parsed and
+  merged; a truncated or recreated file is re-read in full.
+- Needs a Parquet engine (pyarrow); without one, loading falls back to
+  parsing the raw CSVs every time.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from cs740 import CACHE_DIR
+from cs740.loader import LABEL_COLUMNS, concat_frames, consolidate, parallel_map, read_raw
+
+# Bump whenever the loader's output schema or the manifest layout changes
+SCHEMA_VERSION = 7
+
+
+def file_stat(path, st=None):
+    st = st or os.stat(path)
+    return {"path": os.path.abspath(path), "ino": st.st_ino,
+            "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _key(entry):
+    return entry["path"], entry["ino"], entry["size"], entry["mtime_ns"]
+
+
+def _last_line(data):
+    """Last complete line of data (bytes), including its newline."""
+    return data[data.rfind(b"\n", 0, len(data) - 1) + 1:]
+
+
+def _entry(st, offset, tail, rows):
+    return dict(st, offset=offset, tail=tail.decode(errors="surrogateescape"), rows=rows)
+
+
+def ingest(raw, entry=None):
+    """Parse what is new in raw since its manifest entry was recorded.
+
+    Returns (frame, new_entry, appended): with appended=True, frame only
+    holds the rows added after entry's offset and must be concatenated to
+    the cached rows; otherwise it is the whole file. Runs in pool workers.
+    """
+    with open(raw.path, "rb") as f:
+        st = file_stat(raw.path, os.fstat(f.fileno()))
+        if entry is not None:
+            offset, tail = entry.get("offset"), entry.get("tail", "").encode(errors="surrogateescape")
+            if offset is not None and entry["ino"] == st["ino"] and st["size"] >= offset:
+                f.seek(offset - len(tail))
+                if f.read(len(tail)) == tail:
+                    data = f.read()
+                    data = data[:data.rfind(b"\n") + 1]
+                    frame = read_raw(raw, data)
+                    new_entry = _entry(st, offset + len(data), _last_line(data) or tail,
+                                       entry["rows"] + len(frame))
+                    return frame, new_entry, True
+            f.seek(0)
+        data = f.read()
+    frame = read_raw(raw, data)
+    # a file without a trailing newline may be mid-write: re-read it in full next time
+    offset = len(data) if data.endswith(b"\n") else None
+    return frame, _entry(st, offset, _last_line(data), len(frame)), False
+
+
+def _atomic_write(path, write):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_json(obj, path):
+    with open(path, "w") as f:
+        json.dump(obj, f, indent=1)
+
+
+class TableCache:
+    """Cache entry for one tuple of raw directories."""
+
+    def __init__(self, dirs, cache_dir=CACHE_DIR):
+        key = hashlib.sha1("\n".join(os.path.abspath(d) for d in dirs).encode()).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, key)
+        self.manifest_path = os.path.join(self.path, "manifest.json")
+        self.manifest = self._read_manifest()
+
+    @staticmethod
+    def available():
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("version") != SCHEMA_VERSION:
+            return {}
+        return manifest
+
+    def _table_path(self, table):
+        return os.path.join(self.path, f"{table}.parquet")
+
+    def _cached_frames(self, table):
+        """Map path -> (entry, raw frame sliced from the cached table) for every cached file."""
+        entries = self.manifest.get(table)
+        if not entries or not os.path.exists(self._table_path(table)):
+            return {}
+        try:
+            cached = pd.read_parquet(self._table_path(table))
+        except (OSError, ValueError):
+            return {}
+        cached = cached.drop(columns=["mode"] + LABEL_COLUMNS)
+        bounds = np.cumsum([0] + [e["rows"] for e in entries])
+        if bounds[-1] != len(cached):
+            return {}
+        return {e["path"]: (e, cached.iloc[lo:hi])
+                for e, lo, hi in zip(entries, bounds[:-1], bounds[1:])}
+
+    def load(self, table, raws, workers=None):
+        """Return the consolidated table for raws, parsing only new files and appended rows."""
+        stats = [file_stat(r.path) for r in raws]
+        entries = self.manifest.get(table)
+        if entries is not None and list(map(_key, entries)) == list(map(_key, stats)):
+            try:
+                return pd.read_parquet(self._table_path(table))
+            except (OSError, ValueError):
+                pass
+
+        cached = self._cached_frames(table)
+        frames = [None] * len(raws)
+        entries = [None] * len(raws)
+        todo = []
+        for i, (raw, st) in enumerate(zip(raws, stats)):
+            entry, frame = cached.get(st["path"], (None, None))
+            if entry is not None and _key(entry) == _key(st):
+                entries[i], frames[i] = entry, frame
+            else:
+                todo.append((i, entry))
+
+        # only the bytes past each recorded offset have to be parsed
+        nbytes = sum(stats[i]["size"] - ((entry or {}).get("offset") or 0) for i, entry in todo)
+        results = parallel_map(ingest, [(raws[i], entry) for i, entry in todo], workers, nbytes)
+        for (i, _), (frame, entry, appended) in zip(todo, results):
+            if appended:
+                frame = concat_frames(raws[i].table, [cached[stats[i]["path"]][1], frame])
+            frames[i], entries[i] = frame, entry
+        df = consolidate(table, raws, frames)
+        self._store(table, df, entries)
+        return df
+
+    def _store(self, table, df, entries):
+        os.makedirs(self.path, exist_ok=True)
+        _atomic_write(self._table_path(table), lambda p: df.to_parquet(p, index=False))
+        self.manifest = dict(self.manifest, version=SCHEMA_VERSION, **{table: entries})
+        _atomic_write(self.manifest_path, lambda p: _write_json(self.manifest, p))
@@ -0,0 +1,276 @@
+"""
+Resolver cache simulator: predicted hit ratio and latency per mode for a
+query mix.
+
+- The query mix is either a trace (CSV with `site` and a time column:
+  `time` in seconds, or ISO-8601 `iso` / `ts`) or a synthetic one: Poisson
+  arrivals at --rate queries/s, sites drawn with Zipf weights 1/rank^s over
+  config/sites.txt followed by config/unpopular_sites.txt.
+- The resolver cache is an LRU of `capacity` names whose entries expire
+  `ttl` seconds after they were fetched. The TTL of a site is the largest
+  `ttl` cs740.measure recorded for it (DEFAULT_TTL where none was), unless
+  one is given. Expired entries keep their LRU slot until evicted or
+  refetched, as resolvers that expire lazily do.
+- Every query is classified without a per-query Python loop:
+    capacity  an entry survives until the query iff fewer than `capacity`
+              other names were asked for since its site was last asked
+              for (LRU stack distance); that count is a 2-D dominance
+              count over previous-occurrence indices, done as a bottom-up
+              merge count with one sort per level, O(n log n) whatever the
+              number of names (a few names take one cumsum each instead;
+              skipped when every name fits);
+    TTL       along each site's queries, the next refetch after a fetch
+              is the first query at least `ttl` later, found for every
+              site at once with np.searchsorted; each round advances all
+              chains by one expiry.
+- Latencies are drawn from the measured lookups of the same (mode, site)
+  and cache label (see cs740.loader.classify_cache): hits from the hit
+  samples, misses from the miss samples, falling back to the mode's
+  samples of all sites when a site has none.
+
+Usage:
+    python3 -m cs740 simulate --queries 1000000 --rate 200 --zipf 1.1 --capacity 15
+    python3 -m cs740 simulate --trace queries.csv --ttl 60 --format csv
+"""
+
+import argparse
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from cs740 import DEFAULT_DIRS, REPO_DIR
+from cs740.loader import CACHE_LOOKUPS, load_dataset, precise_ms
+from cs740.summary import quantile_column
+from cs740.timeseries import timestamps_ns
+
+SITE_LISTS = [os.path.join(REPO_DIR, "config", "sites.txt"),
+              os.path.join(REPO_DIR, "config", "unpopular_sites.txt")]
+DEFAULT_TTL = 300              # s, for sites without a recorded TTL
+DEFAULT_CAPACITY = 10_000      # names
+DEFAULT_QUERIES = 1_000_000
+DEFAULT_RATE = 100.0           # queries/s
+DEFAULT_ZIPF = 1.0
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+MERGE_LEVEL_COST = 4           # one level of smaller_before() costs about this many per-name passes
+
+# time: seconds, ascending; site: codes into sites
+Trace = namedtuple("Trace", ["time", "site", "sites"])
+
+
+# ---------------------------
+# Query mixes
+# ---------------------------
+def read_site_lists(paths=SITE_LISTS):
+    sites = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            sites += [ln.strip() for ln in f if ln.strip() and ln.strip() not in sites]
+    return sites
+
+
+def zipf_trace(sites, queries=DEFAULT_QUERIES, rate=DEFAULT_RATE, s=DEFAULT_ZIPF, seed=None):
+    """Poisson arrivals at rate queries/s; the site of rank r is asked with weight 1 / r**s."""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(sites) + 1) ** s
+    site = rng.choice(len(sites), size=queries, p=weights / weights.sum()).astype(np.int32)
+    return Trace(np.cumsum(rng.exponential(1.0 / rate, queries)), site, list(sites))
+
+
+def read_trace(path):
+    """Trace of a CSV with a `site` column and a `time` (s), `iso` or `ts` column."""
+    df = pd.read_csv(path)
+    time_col = next((c for c in ("time", "iso", "ts") if c in df.columns), None)
+    if time_col is None or "site" not in df.columns:
+        raise ValueError(f"{path}: needs a site column and a time, iso or ts column")
+    if pd.api.types.is_numeric_dtype(df[time_col]):
+        t = df[time_col].to_numpy("float64")
+    else:
+        t = timestamps_ns(df[time_col]).astype("float64") / 1e9
+    keep = ~np.isnan(t) & df["site"].notna().to_numpy()
+    order = np.argsort(t[keep], kind="stable")
+    site = pd.Categorical(df["site"][keep].astype(str))
+    return Trace(t[keep][order] - t[keep].min(), site.codes[order].astype(np.int32),
+                 list(site.categories))
+
+
+# ---------------------------
+# Cache
+# ---------------------------
+def previous_request(site):
+    """Index of the previous query of the same site, -1 for each site's first."""
+    order = np.argsort(site, kind="stable")
+    s = site[order]
+    prev = np.full(len(site), -1, np.int64)
+    same = s[1:] == s[:-1]
+    prev[order[1:][same]] = order[:-1][same]
+    return prev
+
+
+def smaller_before(values, at):
+    """For each index i in at (ascending): how many j < i have values[j] < values[i].
+
+    Merge counting without the merge: at level k the trace is cut into
+    blocks of 2**k queries, and an index in a right-hand block counts the
+    smaller values of its left-hand sibling with one searchsorted into the
+    blocks' values sorted per block. Every j < i is counted at exactly one
+    level. values must be non-negative.
+    """
+    n = len(values)
+    count = np.zeros(len(at), np.int64)
+    if not len(at):
+        return count
+    values = values.astype(np.int64)
+    span = int(values.max()) + 1
+    index = np.arange(n, dtype=np.int64)
+    k = 0
+    while (1 << k) < n:
+        block = at >> k
+        right = np.flatnonzero(block & 1)
+        if len(right):
+            keys = np.sort((index >> k) * span + values)      # values sorted within each block
+            left = block[right] - 1
+            probe = left * span + values[at[right]]
+            order = np.argsort(probe)                           # sorted probes search faster
+            count[right[order]] += np.searchsorted(keys, probe[order]) - (left[order] << k)
+        k += 1
+    return count
+
+
+def resident(site, n_sites, capacity):
+    """Whether each query's site is still in an LRU of capacity names (ignoring TTLs)."""
+    prev = previous_request(site)
+    found = prev >= 0
+    if capacity >= n_sites:
+        return found
+    # fewer than capacity queries in between can't have named capacity others
+    at = np.flatnonzero(found)
+    at = at[at - prev[at] > capacity]
+    names = np.unique(site)
+    if len(names) <= MERGE_LEVEL_COST * np.log2(len(site)):
+        distinct = np.zeros(len(at), np.int64)
+        for code in names:
+            seen = np.cumsum(site == code, dtype=np.int32)
+            distinct += seen[at - 1] > seen[prev[at]]
+    else:
+        # the other names asked for in (prev[i], i) are the j there whose own previous
+        # query is before prev[i]: #{j < i: prev[j] < prev[i]} minus the prev[i] + 1 up to prev[i]
+        distinct = smaller_before(prev + 1, at) - prev[at] - 1
+    found[at] = distinct < capacity
+    return found
+
+
+def simulate(trace, ttl, capacity=DEFAULT_CAPACITY):
+    """Boolean hit flag per query of trace; ttl is one TTL (s) or one per site of trace.sites."""
+    n = len(trace.site)
+    hit = np.zeros(n, bool)
+    if not n:
+        return hit
+    ttls = np.broadcast_to(np.asarray(ttl, "float64"), (len(trace.sites),))
+    kept = resident(trace.site, len(trace.sites), capacity)
+
+    # queries grouped by site, in time order within each; key increases across groups
+    order = np.lexsort((trace.time, trace.site))
+    site, t = trace.site[order], trace.time[order]
+    span = t.max() - t.min() + ttls.max() + 1
+    key = (t - t.min()) + site * span
+    expiry = ttls[site]
+    group_end = np.searchsorted(site, site, side="right")
+    # forced misses: first query of a site and queries after an LRU eviction
+    forced = ~kept[order]
+    next_forced = np.minimum.accumulate(np.append(np.where(forced, np.arange(n), n), n)[::-1])[::-1]
+
+    miss = forced.copy()
+    fetched = np.flatnonzero(forced)
+    while len(fetched):
+        nxt = np.searchsorted(key, key[fetched] + expiry[fetched], side="left")
+        fetched = nxt[nxt < np.minimum(next_forced[fetched + 1], group_end[fetched])]
+        miss[fetched] = True
+    hit[order] = ~miss
+    return hit
+
+
+# ---------------------------
+# Latency
+# ---------------------------
+def site_ttls(dns, sites, default=DEFAULT_TTL):
+    """Largest recorded answer TTL of each of sites, default where none was recorded."""
+    ttl = dns.dropna(subset=["ttl"]).groupby("site", observed=True)["ttl"].max()
+    return ttl.reindex(sites).astype("float64").fillna(default).to_numpy()
+
+
+def _draw(rows, sites, codes, rng):
+    """One latency per query of site codes, resampled from rows (site, ms) of one mode and label."""
+    out = np.full(len(codes), np.nan)
+    if not len(rows) or not len(codes):
+        return out
+    row_codes = pd.Categorical(rows["site"].astype(str), sites).codes
+    order = np.argsort(row_codes, kind="stable")
+    values = rows["ms"].to_numpy("float64")[order]
+    counts = np.bincount(row_codes[row_codes >= 0], minlength=len(sites))
+    starts = np.searchsorted(row_codes[order], np.arange(len(sites)))
+    u = rng.random(len(codes))
+    own = counts[codes] > 0
+    out[own] = values[starts[codes[own]] + (u[own] * counts[codes[own]]).astype(np.int64)]
+    out[~own] = values[(u[~own] * len(values)).astype(np.int64)]      # pooled over all sites
+    return out
+
+
+def predict(dns, trace, hit, seed=None):
+    """Per mode: queries, hit_ratio, mean and QUANTILES of the predicted latency (ms)."""
+    rng = np.random.default_rng(seed)
+    stat_cols = ["median" if q == 0.5 else quantile_column(q) for q in QUANTILES]
+    ok = precise_ms(dns[dns["status"] == "ok"], drop_unresolved="cold")
+    rows = []
+    for mode, samples in ok.groupby("mode", observed=True):
+        ms = np.empty(len(hit))
+        for label, flags in zip(CACHE_LOOKUPS, (~hit, hit)):
+            ms[flags] = _draw(samples[samples["cache"] == label], trace.sites, trace.site[flags], rng)
+        known = ms[~np.isnan(ms)]
+        stats = np.quantile(known, QUANTILES) if len(known) else [np.nan] * len(QUANTILES)
+        rows.append([mode, len(hit), hit.mean(), known.mean() if len(known) else np.nan, *stats])
+    return pd.DataFrame(rows, columns=["mode", "queries", "hit_ratio", "mean"] + stat_cols)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Predict resolver cache hit ratio and latency per mode "
+                                             "for a query mix.")
+    ap.add_argument("--data", nargs="+", default=list(DEFAULT_DIRS), help="raw data directories")
+    ap.add_argument("--trace", help="CSV of queries (site + time / iso / ts) instead of a Zipf mix")
+    ap.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="Zipf mix: number of queries")
+    ap.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Zipf mix: queries per second")
+    ap.add_argument("--zipf", type=float, default=DEFAULT_ZIPF, help="Zipf exponent s (default 1)")
+    ap.add_argument("--ttl", type=float, help=f"TTL of every site, s (default: recorded, else {DEFAULT_TTL})")
+    ap.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="cache size, names")
+    ap.add_argument("--seed", type=int, help="seed for the mix and the latency draws")
+    ap.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    args = ap.parse_args(argv)
+    if args.capacity < 1 or (args.ttl is not None and args.ttl <= 0):
+        ap.error("capacity and ttl must be positive")
+
+    dns = load_dataset(args.data).dns
+    try:
+        trace = read_trace(args.trace) if args.trace else zipf_trace(
+            read_site_lists(), args.queries, args.rate, args.zipf, args.seed)
+    except (OSError, ValueError) as e:
+        raise SystemExit(str(e))
+    ttl = args.ttl if args.ttl is not None else site_ttls(dns, trace.sites)
+
+    start = time.perf_counter()
+    hit = simulate(trace, ttl, args.capacity)
+    elapsed = time.perf_counter() - start
+    out = predict(dns, trace, hit, args.seed)
+    if args.format == "json":
+        print(out.to_json(orient="records", indent=1))
+    elif args.format == "csv":
+        print(out.to_csv(index=False), end="")
+    else:
+        print(out.to_string(index=False) if len(out) else "(no DNS rows)")
+        print(f"{len(hit)} queries over {len(trace.sites)} sites, cache simulated in {elapsed:.2f}s "
+              f"({len(hit) / max(elapsed, 1e-9) / 1e6:.1f}M queries/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Campaign scheduler — Python replacement for the mode-by-mode, site-by-site
+DNS loop of scripts/40_run_all.sh and 40_run_all_unpopular.sh.
+
+- Builds the whole (mode x site x cold/warm x trial) matrix from
+  config/modes.yml, config/sites.txt and config/unpopular_sites.txt.
+- Runs it in a random order (seeded, so a run can be replayed), so slow
+  drift in the network or the resolvers is spread over every mode and
+  site instead of landing on whichever mode ran last.
+- Each resolver gets its own client and at most `parallel` queries in
+  flight; different resolvers are measured at the same time. A cold trial
+  flushes first (FLUSH_CMD, and the stub restart when the mode goes
+  through a local stub, see cs740.measure.stub_restart) and holds its
+  resolver alone while it does; a warm trial primes the cache
+  with an unmeasured lookup right before the measured one, so it does not
+  depend on a cold trial having run first.
+- Rows go to the usual {mode}_dns_{cold|warm}[_unpopular].csv files. Those
+  files are the checkpoint: every (site, trial) already in them is skipped,
+  so an interrupted run picks up where it stopped (--fresh starts over).
+  A half-written last line is ignored, and dropped by the first write.
+- --adaptive runs in rounds instead of a fixed matrix: every (mode, site,
+  state) still open gets its next trial (its first min_trials in round
+  one), shuffled together, until a cs740.adaptive.StopRule closes it.
+
+Optional `campaign` section of modes.yml (defaults shown):
+
+    campaign:
+      trials: 10
+      parallel: 4               # queries in flight per resolver
+      adaptive:                 # used with --adaptive
+        min_trials: 5
+        max_trials: 50
+        ci_width_ms: 2.0        # 95% CI width of the median
+        ci_rel: null            # or as a fraction of the median
+      resolvers:                # per mode; default $RESOLVER_IP over udp
+        public_udp: 8.8.8.8
+        dot: {resolver: 1.1.1.1, transport: dot, tls_name: cloudflare-dns.com}
+
+Usage:
+    RESOLVER_IP=10.10.1.2 python3 -m cs740.campaign --out-dir data/raw
+    FLUSH_CMD='sudo unbound-control flush %s' python3 -m cs740.campaign --seed 7 --dry-run
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import random
+from collections import defaultdict, namedtuple
+
+from cs740 import REPO_DIR
+from cs740.dnswire import qname_from_site
+from cs740.measure import (DEFAULT_TIMEOUT, CacheTracker, ResolverSlots, RowWriter, flush, isodate,
+                           latency_ms, make_client, measure_trial, read_sites, stub_restart, tls_context)
+
+CONFIG_DIR = os.path.join(REPO_DIR, "config")
+SITE_LISTS = {"popular": "sites.txt", "unpopular": "unpopular_sites.txt"}
+STATES = ["cold", "warm"]
+DEFAULT_TRIALS = 10            # per site and state, as in 40_run_all.sh
+DEFAULT_PARALLEL = 4
+
+Task = namedtuple("Task", ["mode", "popularity", "site", "state", "trial"])
+Target = namedtuple("Target", ["resolver", "transport", "tls_name"])
+
+
+def read_config(path):
+    try:
+        import yaml
+    except ImportError as e:
+        raise SystemExit("cs740.campaign needs PyYAML to read modes.yml: pip install pyyaml") from e
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def mode_targets(modes, resolvers=None, default=None):
+    """Map mode -> Target from the campaign.resolvers section (str or dict per mode)."""
+    resolvers = resolvers or {}
+    targets = {}
+    for mode in modes:
+        spec = resolvers.get(mode, default)
+        if isinstance(spec, str):
+            spec = {"resolver": spec}
+        if not spec or not spec.get("resolver"):
+            raise ValueError(f"no resolver for mode {mode!r}: set RESOLVER_IP or campaign.resolvers")
+        targets[mode] = Target(spec["resolver"], spec.get("transport", "udp"), spec.get("tls_name"))
+    return targets
+
+
+def out_path(out_dir, mode, state, popularity):
+    suffix = "_unpopular" if popularity == "unpopular" else ""
+    return os.path.join(out_dir, f"{mode}_dns_{state}{suffix}.csv")
+
+
+def build_cells(modes, sites):
+    """Every (mode, popularity, site, state) of the campaign; sites maps popularity -> list of sites."""
+    return [(mode, popularity, site, state)
+            for mode in modes
+            for popularity, names in sites.items()
+            for site in names
+            for state in STATES]
+
+
+def build_matrix(modes, sites, trials=DEFAULT_TRIALS):
+    """Every Task of the campaign."""
+    return [Task(*cell, trial) for cell in build_cells(modes, sites) for trial in range(1, trials + 1)]
+
+
+def task_path(out_dir, task):
+    return out_path(out_dir, task.mode, task.state, task.popularity)
+
+
+def _latency(rec):
+    """ms of a raw CSV record (from `us` when the file has it), NaN unless it resolved."""
+    if rec.get("status") == "ok":
+        for col, scale in (("us", 1e3), ("ms", 1.0)):
+            try:
+                return float(rec[col]) / scale
+            except (KeyError, TypeError, ValueError):
+                pass
+    return float("nan")
+
+
+def completed(path):
+    """Map (site, trial) -> latency ms (NaN if failed) for the rows already in the raw DNS file at path."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb") as f:
+        data = f.read()
+    # a half-written last line (interrupted run) isn't done; RowWriter drops it before appending
+    lines = data[:data.rfind(b"\n") + 1].decode("utf-8").splitlines()
+    for rec in csv.DictReader(lines):
+        if rec.get("site") and (rec.get("trial") or "").isdigit():
+            done[rec["site"], int(rec["trial"])] = _latency(rec)
+    return done
+
+
+class Checkpoint:
+    """The rows already in the output files of a campaign, read once per file."""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self._files = {}
+
+    def rows(self, mode, popularity, site, state):
+        path = out_path(self.out_dir, mode, state, popularity)
+        if path not in self._files:
+            self._files[path] = completed(path)
+        return self._files[path]
+
+    def pending(self, tasks):
+        """tasks minus those whose row is already in its output file."""
+        return [t for t in tasks if (t.site, t.trial) not in self.rows(*t[:4])]
+
+    def history(self, cell):
+        """(last trial number, latencies ms in trial order) already measured for cell."""
+        rows = self.rows(*cell)
+        trials = sorted(trial for site, trial in rows if site == cell[2])
+        return (trials[-1] if trials else 0), [rows[cell[2], t] for t in trials]
+
+
+def pending(tasks, out_dir):
+    """tasks minus those whose row is already in its output file."""
+    return Checkpoint(out_dir).pending(tasks)
+
+
+async def run_task(client, slots, task, timeout=DEFAULT_TIMEOUT, flush_cmd=None, tracker=None,
+                   restart=None):
+    """Measure one cold or warm trial and return its Row.
+
+    tracker (a CacheTracker shared by every task of the resolver) labels the
+    measured answer a cache hit or miss; it also sees the priming lookup.
+    restart is the resolver's stub restart command (see stub_restart), if any.
+    """
+    if task.state == "cold":
+        needs_flush = bool(flush_cmd or restart)
+        taken = await slots.acquire(exclusive=needs_flush)
+        try:
+            flushed = needs_flush and await flush(flush_cmd, task.site, restart)
+            return await measure_trial(client, task.site, task.trial, task.mode, timeout,
+                                       tracker, flushed)
+        finally:
+            slots.release(taken)
+    taken = await slots.acquire()
+    try:
+        name = qname_from_site(task.site)
+        try:
+            _, response = await client.query(name, timeout=timeout)
+            if tracker:
+                tracker.observe(name, response)
+        except Exception:
+            pass  # priming is best effort; the measured lookup records any failure
+        return await measure_trial(client, task.site, task.trial, task.mode, timeout, tracker)
+    finally:
+        slots.release(taken)
+
+
+def open_clients(targets, ssl_context=None):
+    """Map each Target -> (client, CacheTracker), kept across run() calls by passing clients=."""
+    return {target: (make_client(target.resolver, target.transport,
+                                 ssl_context=ssl_context if target.transport in ("dot", "doh") else None,
+                                 server_hostname=target.tls_name), CacheTracker())
+            for target in targets}
+
+
+async def close_clients(clients):
+    for client, _ in clients.values():
+        await client.close()
+
+
+async def run(tasks, targets, out_dir, parallel=DEFAULT_PARALLEL, timeout=DEFAULT_TIMEOUT,
+              flush_cmd=None, ssl_context=None, progress=None, clients=None):
+    """Run tasks in the given order, in parallel across resolvers; returns (task, row) pairs.
+
+    clients (from open_clients) keeps pooled connections and cache labels
+    across calls; without it each call opens and closes its own.
+    """
+    by_target = defaultdict(list)
+    for task in tasks:
+        by_target[targets[task.mode]].append(task)
+    writers = {p: RowWriter(p) for p in sorted({task_path(out_dir, t) for t in tasks})}
+    results = []
+    own = clients is None
+    if own:
+        clients = open_clients(by_target, ssl_context)
+
+    async def drain(target, queue):
+        client, tracker = clients[target]
+        slots = ResolverSlots(parallel)
+
+        async def worker():
+            while queue:
+                task = queue.pop()
+                restart = stub_restart(task.mode, target.transport, target.resolver)
+                row = await run_task(client, slots, task, timeout, flush_cmd, tracker, restart)
+                writers[task_path(out_dir, task)].write(row)
+                results.append((task, row))
+                if progress:
+                    progress(len(results), len(tasks), row)
+
+        await asyncio.gather(*(worker() for _ in range(parallel)))
+
+    for w in writers.values():
+        w.__enter__()
+    try:
+        # pop() takes from the end: reverse so each resolver follows the given order
+        await asyncio.gather(*(drain(target, queue[::-1]) for target, queue in by_target.items()))
+    finally:
+        if own:
+            await close_clients(clients)
+        for w in writers.values():
+            w.__exit__(None, None, None)
+    return results
+
+
+def open_cell(rule, history):
+    """Whether a cell with history (last trial, latencies) still needs trials under rule."""
+    latencies = history[1]
+    return rule.check(len(latencies), latencies)[0] is None
+
+
+async def run_adaptive(cells, checkpoint, rule, targets, out_dir, rng, progress=None, **kwargs):
+    """Measure cells in shuffled rounds until rule stops each of them; returns (task, row) pairs."""
+    from cs740.adaptive import STOP_HEADER, stops_path
+
+    history = {cell: checkpoint.history(cell) for cell in cells}
+    open_cells = [c for c in cells if open_cell(rule, history[c])]
+    results = []
+    round_no = 0
+    # the same clients every round, so pooled connections and cache labels carry over
+    clients = open_clients(set(targets.values()), kwargs.get("ssl_context"))
+    try:
+        while open_cells:
+            round_no += 1
+            # round one brings every cell up to min_trials, later rounds add one trial each
+            tasks = []
+            for cell in open_cells:
+                last, latencies = history[cell]
+                tasks += [Task(*cell, last + i)
+                          for i in range(1, max(1, rule.min_trials - len(latencies)) + 1)]
+            rng.shuffle(tasks)
+            print(f"[campaign] round {round_no}: {len(open_cells)} open, {len(tasks)} trials")
+            done = await run(tasks, targets, out_dir, progress=progress, clients=clients, **kwargs)
+            results.extend(done)
+            for task, row in sorted(done, key=lambda r: r[0].trial):
+                cell = tuple(task[:4])
+                last, latencies = history[cell]
+                history[cell] = (max(last, task.trial), latencies + [latency_ms(row)])
+
+            still_open = []
+            for cell in open_cells:
+                latencies = history[cell][1]
+                stop = rule.stop(isodate(), cell[0], cell[2], len(latencies), latencies)
+                if stop is None:
+                    still_open.append(cell)
+                    continue
+                with RowWriter(stops_path(out_path(out_dir, cell[0], cell[3], cell[1])), STOP_HEADER) as w:
+                    w.write(stop)
+            open_cells = still_open
+    finally:
+        await close_clients(clients)
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run the whole DNS campaign in a random, resumable order.")
+    ap.add_argument("--config", default=os.path.join(CONFIG_DIR, "modes.yml"))
+    ap.add_argument("--sites-file", default=os.path.join(CONFIG_DIR, SITE_LISTS["popular"]))
+    ap.add_argument("--unpopular-sites-file", default=os.path.join(CONFIG_DIR, SITE_LISTS["unpopular"]))
+    ap.add_argument("--out-dir", default=os.path.join(REPO_DIR, "data", "raw"))
+    ap.add_argument("--trials", type=int, help=f"trials per (mode, site, state) (default {DEFAULT_TRIALS})")
+    ap.add_argument("--parallel", type=int, help=f"queries in flight per resolver (default {DEFAULT_PARALLEL})")
+    ap.add_argument("--seed", type=int, help="shuffle seed (default: random, printed)")
+    ap.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    ap.add_argument("--cafile", help="CA bundle to trust for DoT/DoH resolvers")
+    ap.add_argument("--insecure", action="store_true", help="skip TLS certificate verification")
+    ap.add_argument("--adaptive", action="store_true",
+                    help="measure each (mode, site, state) until its median's CI is narrow enough")
+    ap.add_argument("--fresh", action="store_true", help="delete existing outputs instead of resuming")
+    ap.add_argument("--dry-run", action="store_true", help="only print what is left to run")
+    args = ap.parse_args(argv)
+
+    config = read_config(args.config)
+    settings = config.get("campaign") or {}
+    modes = config.get("modes") or []
+    if not modes:
+        ap.error(f"no modes in {args.config}")
+    trials = args.trials or settings.get("trials", DEFAULT_TRIALS)
+    parallel = args.parallel or settings.get("parallel", DEFAULT_PARALLEL)
+    try:
+        targets = mode_targets(modes, settings.get("resolvers"), os.environ.get("RESOLVER_IP"))
+    except ValueError as e:
+        ap.error(str(e))
+    sites = {"popular": read_sites(args.sites_file), "unpopular": read_sites(args.unpopular_sites_file)}
+
+    cells = build_cells(modes, sites)
+    if args.fresh and not args.dry_run:
+        from cs740.adaptive import stops_path
+        for mode, popularity, _, state in cells:
+            path = out_path(args.out_dir, mode, state, popularity)
+            for p in (path, stops_path(path)):
+                if os.path.exists(p):
+                    os.remove(p)
+    checkpoint = Checkpoint(args.out_dir)
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    resolvers = len(set(targets.values()))
+
+    def progress(done, total, row):
+        if done % 100 == 0 or done == total:
+            print(f"[campaign] {done}/{total}  last: {row.mode} {row.site} trial {row.trial} {row.status}")
+
+    run_args = dict(parallel=parallel, timeout=args.timeout, flush_cmd=os.environ.get("FLUSH_CMD"),
+                    ssl_context=tls_context(args.cafile, args.insecure))
+    if args.adaptive:
+        # cs740.adaptive pulls in pandas; fixed-count campaigns don't need it
+        from cs740.adaptive import StopRule
+        try:
+            rule = StopRule(**settings.get("adaptive", {}))
+        except (TypeError, ValueError) as e:
+            ap.error(f"campaign.adaptive: {e}")
+        todo = [c for c in cells if open_cell(rule, checkpoint.history(c))]
+        print(f"[campaign] {len(todo)}/{len(cells)} (mode, site, state) open, {resolvers} resolver(s), "
+              f"seed={seed}")
+        if args.dry_run or not todo:
+            return
+        results = asyncio.run(run_adaptive(cells, checkpoint, rule, targets, args.out_dir, rng,
+                                           progress, **run_args))
+    else:
+        tasks = build_matrix(modes, sites, trials)
+        todo = checkpoint.pending(tasks)
+        rng.shuffle(todo)
+        print(f"[campaign] {len(todo)}/{len(tasks)} trials to run, {resolvers} resolver(s), seed={seed}")
+        if args.dry_run or not todo:
+            return
+        results = asyncio.run(run(todo, targets, args.out_dir, progress=progress, **run_args))
+    ok = sum(row.status == "ok" for _, row in results)
+    print(f"[campaign] {ok}/{len(results)} ok -> {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
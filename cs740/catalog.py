@@ -0,0 +1,279 @@
+"""
+Dataset index over every raw measurement file, and compaction into a
+partitioned Parquet store.
+
+- scan() walks the raw data roots recursively and recognises every layout:
+      per_mode  {mode}_{dns|web|req}_{cold|warm}[_unpopular].csv   (data_for_submission, data_ryan)
+      legacy    {dns|web}_{mode}[_{cold|warm}].csv                   (data/raw)
+      per_site  {dns|web}/{site}_{mode}_{cold|warm}.csv              (data/raw/dns, data/raw/web)
+  For each file it records the root it came from (`source`), layout,
+  table, mode, cache state, popularity, the sites in it, row count and
+  first / last timestamp. Per-site file names carry no popularity; sites
+  listed in config/unpopular_sites.txt count as unpopular.
+- The index is kept in <CACHE_DIR>/catalog.json. Files whose (path, inode,
+  size, mtime) are unchanged are not re-read.
+- compact() rewrites the indexed files into hive-style partitions
+      <store>/<table>/mode=<mode>/cache_state=<state>/part-0.parquet
+  with a typed `time` column (UTC) next to iso / ts and rows sorted by
+  popularity, site and time, so row-group statistics stay selective
+  (see cs740.query), plus <store>/index.json listing each partition's rows,
+  sites, popularity, time range and source files. Each table is built in
+  a temporary directory and swapped in whole. Rows keep a `source` column,
+  since the roots hold different campaigns.
+- read_partitions() reads only the partitions of the requested modes /
+  cache states.
+
+Usage:
+    python3 -m cs740 catalog index
+    python3 -m cs740 catalog index data_ryan --format csv
+    python3 -m cs740 catalog compact --store data/store
+"""
+
+import argparse
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from cs740 import CACHE_DIR, REPO_DIR
+from cs740.cache import file_stat
+from cs740.dnswire import qname_from_site
+from cs740.loader import (CACHE_STATES, SCHEMAS, RawFile, _label_column, consolidate, parallel_map,
+                          parse_filename, parse_site_filename, read_all, read_raw)
+from cs740.timeseries import NAT, timestamps_ns
+
+DEFAULT_ROOTS = ("data/raw", "data_for_submission", "data_ryan", "new_data")
+DEFAULT_STORE = os.path.join(REPO_DIR, "data", "store")
+INDEX_PATH = os.path.join(CACHE_DIR, "catalog.json")
+UNPOPULAR_CFG = os.path.join(REPO_DIR, "config", "unpopular_sites.txt")
+PARTITIONS = ["mode", "cache_state"]
+ROW_GROUP_SIZE = 50_000
+INDEX_VERSION = 3
+
+INDEX_COLUMNS = ["source", "path", "layout", "table", "mode", "cache_state", "popularity",
+                 "sites", "rows", "first", "last"]
+
+
+def _unpopular_hosts(path=UNPOPULAR_CFG):
+    if not os.path.isfile(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {qname_from_site(ln.strip()).lower() for ln in f if ln.strip()}
+
+
+def recognise(path, unpopular=frozenset()):
+    """(RawFile, layout) for any raw measurement CSV, or None."""
+    raw = parse_filename(path)
+    if raw is not None:
+        first = os.path.basename(path).lower().split("_")[0]
+        return raw, "legacy" if first in SCHEMAS else "per_mode"
+    found = parse_site_filename(path)
+    if found is None:
+        return None
+    raw, site = found
+    if qname_from_site(site).lower() in unpopular:
+        raw = raw._replace(popularity="unpopular")
+    return raw, "per_site"
+
+
+def _iso(ns):
+    return pd.Timestamp(ns, tz="UTC").isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _time_range(df, table):
+    ns = timestamps_ns(df["iso" if table == "dns" else "ts"])
+    ns = ns[ns != NAT]
+    return (_iso(ns.min()), _iso(ns.max())) if len(ns) else (None, None)
+
+
+def describe(raw):
+    """Rows, sites and time range of one raw file; runs in pool workers."""
+    df = read_raw(raw)
+    first, last = _time_range(df, raw.table)
+    return {"sites": sorted(df["site"].dropna().astype(str).unique()), "rows": len(df),
+            "first": first, "last": last}
+
+
+def _walk(root):
+    for d, subdirs, files in os.walk(root):
+        subdirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".csv"):
+                yield os.path.join(d, name)
+
+
+def _read_index(path):
+    try:
+        with open(path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return index.get("files", {}) if index.get("version") == INDEX_VERSION else {}
+
+
+def scan(roots=DEFAULT_ROOTS, index_path=INDEX_PATH, workers=None):
+    """Index of every raw file under roots (relative to the repository unless absolute).
+
+    One row per file: INDEX_COLUMNS plus its size and mtime. Only new or
+    changed files are read; the index is saved back to index_path.
+    """
+    unpopular = _unpopular_hosts()
+    known = _read_index(index_path)
+    entries, keys, todo = [], [], []
+    for root in roots:
+        top = os.path.join(REPO_DIR, root)
+        if not os.path.isdir(top):
+            continue
+        for path in _walk(top):
+            found = recognise(path, unpopular)
+            if found is None:
+                continue
+            raw, layout = found
+            st = file_stat(path)
+            entry = dict(st, source=root, path=os.path.relpath(path, REPO_DIR), layout=layout,
+                         **{k: getattr(raw, k) for k in ("table", "mode", "cache_state", "popularity")})
+            old = known.get(st["path"])
+            if old is not None and all(old.get(k) == v for k, v in entry.items()):
+                entry = old
+            else:
+                todo.append((len(entries), raw))
+            entries.append(entry)
+            keys.append(st["path"])
+
+    nbytes = sum(entries[i]["size"] for i, _ in todo)
+    for (i, _), info in zip(todo, parallel_map(describe, [(raw,) for _, raw in todo], workers, nbytes)):
+        entries[i].update(info)
+
+    if index_path:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        tmp = f"{index_path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump({"version": INDEX_VERSION, "files": dict(zip(keys, entries))}, f, indent=1)
+        os.replace(tmp, index_path)
+    columns = INDEX_COLUMNS + ["size", "mtime_ns"]
+    return pd.DataFrame([{c: e.get(c) for c in columns} for e in entries], columns=columns)
+
+
+# ---------------------------
+# Partitioned store
+# ---------------------------
+def _raw_file(entry):
+    return RawFile(os.path.join(REPO_DIR, entry["path"]), entry["table"], entry["mode"],
+                   entry["cache_state"], entry["popularity"])
+
+
+def compact(index, store=DEFAULT_STORE, tables=None, workers=None):
+    """Rewrite the files listed in index (see scan()) into store; returns the partition index."""
+    parts = []
+    for table in tables or SCHEMAS:
+        target = os.path.join(store, table)
+        tmp = f"{target}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        entries = index[index["table"] == table].to_dict("records")
+        groups = {}
+        for e in entries:
+            groups.setdefault((e["mode"], e["cache_state"]), []).append(e)
+
+        for (mode, cache_state), group in sorted(groups.items()):
+            raws = [_raw_file(e) for e in group]
+            frames = read_all(raws, workers)
+            df = consolidate(table, raws, frames)
+            df["source"] = _label_column([e["source"] for e in group], [len(f) for f in frames],
+                                         sorted({e["source"] for e in group}))
+            df["time"] = pd.to_datetime(timestamps_ns(df["iso" if table == "dns" else "ts"]), utc=True)
+            df = df.sort_values(["popularity", "site", "time"], kind="stable").drop(columns=PARTITIONS)
+            out = os.path.join(tmp, f"mode={mode}", f"cache_state={cache_state}")
+            os.makedirs(out, exist_ok=True)
+            df.to_parquet(os.path.join(out, "part-0.parquet"), index=False, row_group_size=ROW_GROUP_SIZE)
+            first, last = _time_range(df, table)
+            parts.append({"table": table, "mode": mode, "cache_state": cache_state, "rows": len(df),
+                          "popularity": sorted(df["popularity"].unique().astype(str)),
+                          "sites": sorted(df["site"].dropna().astype(str).unique()),
+                          "first": first, "last": last, "files": [e["path"] for e in group]})
+
+        # swap the rebuilt table in whole
+        old = f"{target}.old-{os.getpid()}"
+        if os.path.isdir(target):
+            os.replace(target, old)
+        if os.path.isdir(tmp):
+            os.replace(tmp, target)
+        shutil.rmtree(old, ignore_errors=True)
+
+    os.makedirs(store, exist_ok=True)
+    path = os.path.join(store, "index.json")
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump({"version": INDEX_VERSION, "partitions": parts}, f, indent=1)
+    os.replace(tmp, path)
+    return parts
+
+
+def read_store_index(store=DEFAULT_STORE):
+    """The partitions of a compacted store (as compact() returned them)."""
+    with open(os.path.join(store, "index.json")) as f:
+        index = json.load(f)
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"{store} was compacted by an older version; run `catalog compact` again")
+    return index["partitions"]
+
+
+def read_partitions(store=DEFAULT_STORE, table="dns", modes=None, cache_states=None, columns=None):
+    """Rows of the partitions of table matching modes / cache_states (None = all).
+
+    mode and cache_state come back as categorical columns like the loader's.
+    """
+    wanted = [p for p in read_store_index(store) if p["table"] == table
+              and (modes is None or p["mode"] in modes)
+              and (cache_states is None or p["cache_state"] in cache_states)]
+    frames = []
+    for p in wanted:
+        path = os.path.join(store, table, f"mode={p['mode']}", f"cache_state={p['cache_state']}",
+                            "part-0.parquet")
+        df = pd.read_parquet(path, columns=[c for c in columns if c not in PARTITIONS] if columns else None)
+        frames.append(df.assign(mode=p["mode"], cache_state=p["cache_state"]))
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    df = pd.concat(frames, ignore_index=True)
+    df["mode"] = df["mode"].astype("category")
+    df["cache_state"] = pd.Categorical(df["cache_state"], CACHE_STATES)
+    return df[columns] if columns else df
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Index every raw measurement file; compact them into a "
+                                             "partitioned Parquet store.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    for name, help_text in (("index", "list every raw file with its labels, rows and time range"),
+                            ("compact", "rewrite the raw files into <store>/<table>/mode=/cache_state=")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("roots", nargs="*", default=list(DEFAULT_ROOTS),
+                       help=f"directories to index (default {' '.join(DEFAULT_ROOTS)})")
+        p.add_argument("--workers", type=int, help="parsing processes (default CS740_WORKERS or one per core)")
+    p = sub.choices["index"]
+    p.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    p = sub.choices["compact"]
+    p.add_argument("--store", default=DEFAULT_STORE)
+    p.add_argument("--tables", nargs="+", choices=list(SCHEMAS))
+    args = ap.parse_args(argv)
+
+    index = scan(args.roots, workers=args.workers)
+    if args.command == "index":
+        if args.format == "json":
+            print(index.to_json(orient="records", indent=1))
+        elif args.format == "csv":
+            print(index.assign(sites=index["sites"].str.join(";")).to_csv(index=False), end="")
+        else:
+            shown = index.assign(sites=index["sites"].str.len()).drop(columns=["size", "mtime_ns"])
+            print(shown.to_string(index=False) if len(shown) else "(no raw files)")
+            print(f"{len(index)} files, {int(index['rows'].sum()) if len(index) else 0} rows")
+        return
+    parts = compact(index, args.store, args.tables, args.workers)
+    for p in parts:
+        print(f"  [OK] {p['table']}/mode={p['mode']}/cache_state={p['cache_state']}: "
+              f"{p['rows']} rows from {len(p['files'])} file(s)")
+    print(f"{len(index)} files -> {len(parts)} partitions in {args.store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Single entry point for the toolkit: python3 -m cs740 <command> ...
+
+    ingest     parse the raw CSVs into the Parquet cache, print row counts
+    summarize  grouped statistics of dns / web / page_dns / dns_page (table, CSV or JSON)
+    compare    median differences between modes with CIs and p-values
+    timeline   per-minute (or any step / rolling window) statistics over time
+    plot       render figures (cs740.figures)
+    measure    time DNS lookups (cs740.measure)
+    campaign   randomized, resumable DNS campaign (cs740.campaign)
+    pageload   page loads over a browser pool (cs740.pageload)
+    samples    binary sample store <-> raw CSVs (cs740.samples)
+    standin    local stand-in resolver for benchmarks (cs740.standin)
+    catalog    index of all raw files, partitioned store (cs740.catalog)
+    simulate   resolver cache hit ratio / latency for a query mix (cs740.cachesim)
+
+- Only the standard library is imported up front; pandas, numpy,
+  matplotlib and the measurement stack are imported by the commands that
+  use them, when they run.
+- summarize / compare / timeline answers are kept under
+  <CACHE_DIR>/answers, one file per distinct command line, keyed by the
+  (path, inode, size, mtime) of every raw CSV under --data and by the
+  source of the modules computing them. Asking again about unchanged
+  data prints the stored answer without importing pandas at all;
+  --no-cache recomputes (and skips the Parquet cache too).
+- With --store they read a compacted store (catalog compact) through
+  cs740.query instead; its answers are keyed by the store's index.json.
+"""
+
+import argparse
+import glob
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+
+from cs740 import CACHE_DIR, DEFAULT_DIRS
+
+ANSWER_DIR = os.path.join(CACHE_DIR, "answers")
+# modules whose code shapes summarize / compare / timeline answers
+ANSWER_SOURCES = ["cli.py", "loader.py", "cache.py", "summary.py", "stats.py", "pagedns.py",
+                  "timeseries.py", "query.py", "correlate.py"]
+
+# commands handled by another module's main(argv)
+TOOLS = {
+    "plot": ("cs740.figures", "render figures from one loaded dataset"),
+    "measure": ("cs740.measure", "time DNS lookups over UDP / TCP / DoT / DoH"),
+    "campaign": ("cs740.campaign", "randomized, resumable DNS campaign over all modes"),
+    "pageload": ("cs740.pageload", "page loads over a pool of long-lived browsers"),
+    "samples": ("cs740.samples", "convert raw DNS CSVs to and from the binary sample store"),
+    "standin": ("cs740.standin", "local resolver with simulated latency, cache and loss"),
+    "catalog": ("cs740.catalog", "index every raw file; compact them into a partitioned store"),
+    "simulate": ("cs740.cachesim", "predict resolver cache hit ratio and latency for a query mix"),
+}
+TABLES = ["dns", "web", "page_dns", "dns_page"]
+FORMATS = ["table", "csv", "json"]
+
+
+# ---------------------------
+# Answer cache
+# ---------------------------
+def raw_fingerprint(dirs):
+    """(path, inode, size, mtime) of every CSV directly under dirs, as the loader sees them."""
+    stats = []
+    for d in dirs:
+        for path in sorted(glob.glob(os.path.join(d, "*.csv"))):
+            st = os.stat(path)
+            stats.append([os.path.abspath(path), st.st_ino, st.st_size, st.st_mtime_ns])
+    return stats
+
+
+def _store_stat(store):
+    """(path, inode, size, mtime) of a compacted store's index.json, rewritten by every compaction."""
+    path = os.path.join(os.path.abspath(store), "index.json")
+    try:
+        st = os.stat(path)
+    except OSError:
+        raise SystemExit(f"{store}: no compacted store (run `python3 -m cs740 catalog compact`)")
+    return [path, st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def _source_digest():
+    h = hashlib.sha1()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in ANSWER_SOURCES:
+        with open(os.path.join(here, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def cached_answer(args, compute):
+    """compute()'s text for this command line, reused while the raw data and code are unchanged."""
+    request = {k: v for k, v in sorted(vars(args).items()) if k not in ("func", "no_cache")}
+    request["data"] = [os.path.abspath(d) for d in args.data]
+    if args.store:
+        request["store"] = os.path.abspath(args.store)
+        data = [_store_stat(args.store)]
+    else:
+        data = raw_fingerprint(args.data)
+    request = json.dumps(request, sort_keys=True, default=str)
+    path = os.path.join(ANSWER_DIR, hashlib.sha1(request.encode()).hexdigest() + ".json")
+    key = hashlib.sha1(json.dumps([data, _source_digest()]).encode()).hexdigest()
+
+    if not args.no_cache:
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            if entry.get("key") == key:
+                return entry["answer"]
+        except (OSError, ValueError):
+            pass
+
+    answer = compute()
+    if not args.no_cache:
+        os.makedirs(ANSWER_DIR, exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump({"request": request, "key": key, "answer": answer}, f)
+        os.replace(tmp, path)
+    return answer
+
+
+# ---------------------------
+# Commands
+# ---------------------------
+def _frame(table, dirs, cache=True, store=None):
+    """(rows, default value columns) of one table: ok rows, DNS latencies in float ms.
+
+    With store, rows come from the compacted store (cs740.query) with the
+    status filter pushed down to the Parquet reader, instead of from dirs.
+    """
+    from cs740.loader import load_dataset, precise_ms
+
+    if store:
+        from cs740.query import select
+
+        def ok(name):
+            return select(name, store=store, status="ok")
+        req = select("req", store=store) if table == "page_dns" else None
+    else:
+        dataset = load_dataset(dirs, cache=cache)
+
+        def ok(name):
+            df = getattr(dataset, name)
+            return df[df["status"] == "ok"]
+        req = dataset.req
+    if table == "dns":
+        return precise_ms(ok("dns"), drop_unresolved="cold"), ["ms"]
+    web = ok("web")
+    if table == "web":
+        return web, ["ttfb_ms", "dom_ms", "load_ms"]
+    if table == "dns_page":
+        from cs740.correlate import SHARE_COLS, join
+        return join(ok("dns"), web), SHARE_COLS
+    from cs740.pagedns import PAGE_DNS_COLS, page_dns, with_load_share
+    return with_load_share(page_dns(req), web), PAGE_DNS_COLS
+
+
+def _check_columns(df, columns):
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise SystemExit(f"unknown column(s) {', '.join(missing)}; have {', '.join(map(str, df.columns))}")
+
+
+def _format(df, fmt):
+    if fmt == "json":
+        return df.to_json(orient="records", indent=1)
+    if fmt == "csv":
+        return df.to_csv(index=False)
+    return df.to_string(index=False) if len(df) else "(no rows)"
+
+
+def cmd_ingest(args):
+    from cs740.loader import load_dataset
+
+    start = time.perf_counter()
+    dataset = load_dataset(args.data, cache=not args.no_cache, workers=args.workers)
+    for name, df in zip(dataset._fields, dataset):
+        modes = df.groupby("mode", observed=True).size() if len(df) else {}
+        detail = ", ".join(f"{m}={n}" for m, n in modes.items())
+        print(f"{name:4s} {len(df):>9d} rows" + (f"  ({detail})" if detail else ""))
+    print(f"loaded in {time.perf_counter() - start:.2f}s")
+
+
+def cmd_summarize(args):
+    def compute():
+        from cs740.summary import QUANTILES, summarize
+
+        df, values = _frame(args.table, args.data, cache=not args.no_cache, store=args.store)
+        values = args.values or values
+        _check_columns(df, args.by + values)
+        summary = summarize(df, values, by=args.by, quantiles=args.quantiles or QUANTILES)
+        if args.ci:
+            from cs740.stats import with_ci
+            summary = with_ci(summary, df, values, by=args.by)
+        return _format(summary, args.format)
+
+    print(cached_answer(args, compute).rstrip("\n"))
+
+
+def cmd_compare(args):
+    def compute():
+        from cs740.stats import compare_modes
+
+        df, values = _frame(args.table, args.data, cache=not args.no_cache, store=args.store)
+        value = args.value or values[-1]
+        _check_columns(df, args.by + [value])
+        pairs = [tuple(p.split(":", 1)) for p in args.pairs] if args.pairs else None
+        out = compare_modes(df, value, by=args.by, pairs=pairs, q=args.q, permutations=args.permutations)
+        return _format(out, args.format)
+
+    print(cached_answer(args, compute).rstrip("\n"))
+
+
+def cmd_timeline(args):
+    def compute():
+        from cs740.timeseries import TimeIndex
+
+        df, values = _frame(args.table, args.data, cache=not args.no_cache, store=args.store)
+        value = args.value or values[-1]
+        _check_columns(df, args.by + [value])
+        try:
+            index = TimeIndex(df)
+        except KeyError as e:
+            raise SystemExit(f"{args.table}: {e.args[0]}")
+        out = index.windows(value, step=args.step, window=args.window, quantiles=args.quantiles,
+                            by=args.by, start=args.start, end=args.end)
+        return _format(out, args.format)
+
+    print(cached_answer(args, compute).rstrip("\n"))
+
+
+def _pair(text):
+    if ":" not in text:
+        raise argparse.ArgumentTypeError("expected MODE_A:MODE_B")
+    return text
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="python3 -m cs740", description="CS740 DNS measurement toolkit.")
+    sub = ap.add_subparsers(dest="command", metavar="command", required=True)
+
+    data = argparse.ArgumentParser(add_help=False)
+    data.add_argument("--data", nargs="+", default=list(DEFAULT_DIRS), help="raw data directories")
+    data.add_argument("--no-cache", action="store_true", help="ignore (and don't write) any cache")
+
+    p = sub.add_parser("ingest", parents=[data], help="parse raw CSVs into the Parquet cache")
+    p.add_argument("--workers", type=int, help="parsing processes (default CS740_WORKERS or one per core)")
+    p.set_defaults(func=cmd_ingest)
+
+    def query(name, by, help_text):
+        p = sub.add_parser(name, parents=[data], help=help_text)
+        p.add_argument("--table", choices=TABLES, default="dns")
+        p.add_argument("--by", nargs="+", default=by, help=f"group keys (default {' '.join(by)})")
+        p.add_argument("--format", choices=FORMATS, default="table")
+        p.add_argument("--store", help="read the compacted store in this directory instead of --data "
+                                       "(python3 -m cs740 catalog compact)")
+        return p
+
+    p = query("summarize", ["mode", "cache_state"], "grouped statistics of a table")
+    p.add_argument("--values", nargs="+", help="value columns (default: the table's latencies)")
+    p.add_argument("--quantiles", nargs="+", type=float,
+                   help="quantiles reported besides the median (.5 is the median column), "
+                        "replacing the default .25 .75 .95 .99")
+    p.add_argument("--ci", action="store_true", help="add bootstrap 95%% CIs of the medians")
+    p.set_defaults(func=cmd_summarize)
+
+    p = query("compare", ["cache_state"], "median differences between modes")
+    p.add_argument("--value", help="value column (default ms, load_ms, dns_share_pct or dns_load_pct)")
+    p.add_argument("--pairs", nargs="+", type=_pair, metavar="A:B", help="mode pairs (default: all)")
+    p.add_argument("--q", type=float, default=0.5, help="quantile compared (default median)")
+    p.add_argument("--permutations", type=int, default=2000, help="permutation test resamples (0 = skip)")
+    p.set_defaults(func=cmd_compare)
+
+    p = query("timeline", ["mode"], "windowed statistics over the campaign's timestamps")
+    p.add_argument("--value", help="value column (default ms or load_ms)")
+    p.add_argument("--step", default="1min", help="window step, any pandas Timedelta (default 1min)")
+    p.add_argument("--window", help="trailing window length (default: one step)")
+    p.add_argument("--quantiles", nargs="+", type=float, default=[0.5, 0.95], help="default .5 .95")
+    p.add_argument("--start", help="first timestamp (ISO-8601, UTC when naive)")
+    p.add_argument("--end", help="end timestamp, exclusive")
+    p.set_defaults(func=cmd_timeline)
+
+    for name, (module, help_text) in TOOLS.items():
+        sub.add_parser(name, add_help=False, help=f"{help_text} ({module}; --help for its options)")
+    return ap
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    ap = build_parser()
+    if argv and argv[0] in TOOLS:
+        sys.argv[0] = f"{ap.prog} {argv[0]}"       # shown in the tool's usage line
+        return importlib.import_module(TOOLS[argv[0]][0]).main(argv[1:])
+    args = ap.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    main()
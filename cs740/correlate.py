@@ -0,0 +1,131 @@
+"""
+DNS lookups joined to the page loads they precede, per (mode, site, run).
+
+- The campaign resolves a site (one run of DNS trials) and then loads it
+  in the browser, with the same mode, cache state and popularity, but the
+  two land in separate files. dns_runs() groups each (mode, site, cache
+  state, popularity)'s lookups into runs (a new run starts at trial 1);
+  join() attaches to every ok page load the latest run that ended at most
+  `window` before it, with one sorted pd.merge_asof per table.
+- A run's dns_ms is the median of its lookups in the cache state the page
+  load found: misses for cold loads (the browser's lookup follows the
+  flush), hits for warm ones (see cs740.loader.classify_cache); all of the
+  run's lookups when it has none of those.
+- site_shares() gives DNS's share of TTFB and of load time per (mode,
+  site); regress() fits TTFB and load time on dns_ms per mode (least
+  squares with a bootstrap CI of the slope, Pearson r, Spearman rho).
+
+Usage:
+    pages = join(dataset.dns, dataset.web)
+    site_shares(pages), regress(pages)
+"""
+
+import numpy as np
+import pandas as pd
+
+from cs740.loader import precise_ms
+from cs740.stats import BOOTSTRAP_RESAMPLES, BOOTSTRAP_SEED, DEFAULT_LEVEL, MAX_CELLS
+from cs740.timeseries import timestamps_ns
+
+RUN_KEYS = ["mode", "site", "cache_state", "popularity"]
+JOIN_WINDOW = "60s"
+PAGE_TIMES = ["ttfb_ms", "load_ms"]
+SHARE_COLS = ["dns_ttfb_pct", "dns_load_pct"]
+
+
+def _times(values):
+    return pd.to_datetime(timestamps_ns(values), utc=True)
+
+
+def dns_runs(dns):
+    """One row per run of ok lookups: RUN_KEYS, time (its last lookup), lookups, miss_ms, hit_ms, all_ms."""
+    ok = precise_ms(dns[dns["status"] == "ok"], drop_unresolved="cold")
+    ok = ok.assign(time=_times(ok["iso"])).dropna(subset=["time"])
+    ok = ok.sort_values(RUN_KEYS + ["time", "trial"], kind="stable")
+    first = (ok["trial"] == 1).astype(int)
+    run = first.groupby([ok[k] for k in RUN_KEYS], observed=True).cumsum()
+    keys = RUN_KEYS + [run.rename("run")]
+    g = ok.groupby(keys, observed=True)
+    runs = g.agg(time=("time", "max"), lookups=("ms", "size"), all_ms=("ms", "median"))
+    by_label = ok.groupby(keys + ["cache"], observed=True)["ms"].median().unstack("cache")
+    runs = runs.join(by_label.reindex(columns=["miss", "hit"]).add_suffix("_ms"))
+    return runs.reset_index().drop(columns=["run"])
+
+
+def _merge_keys(df):
+    # merge_asof matches `by` columns by value; categoricals with different categories don't compare
+    return df.assign(**{k: df[k].astype(str) for k in RUN_KEYS})
+
+
+def join(dns, web, window=JOIN_WINDOW):
+    """Ok page loads with the DNS run right before them (within window); unmatched loads are dropped.
+
+    Adds dns_time, lag_s (page load time - end of the run), lookups, dns_ms
+    and DNS's share (%) of ttfb_ms and load_ms.
+    """
+    pages = web[web["status"] == "ok"]
+    pages = _merge_keys(pages.assign(time=_times(pages["ts"])).dropna(subset=["time"]))
+    runs = _merge_keys(dns_runs(dns)).rename(columns={"time": "dns_time"})
+    runs["time"] = runs["dns_time"]
+    joined = pd.merge_asof(pages.sort_values("time"), runs.sort_values("time"), on="time", by=RUN_KEYS,
+                           direction="backward", tolerance=pd.Timedelta(window))
+    joined = joined.dropna(subset=["dns_time"]).reset_index(drop=True)
+
+    state_ms = joined["miss_ms"].where(joined["cache_state"] == "cold", joined["hit_ms"])
+    joined["dns_ms"] = state_ms.fillna(joined["all_ms"])
+    joined["lag_s"] = (joined["time"] - joined["dns_time"]).dt.total_seconds()
+    for col, share in zip(PAGE_TIMES, SHARE_COLS):
+        total = joined[col].astype("float64")
+        joined[share] = joined["dns_ms"] / total.where(total > 0) * 100
+    columns = ["ts"] + RUN_KEYS + ["ttfb_ms", "dom_ms", "load_ms", "dns_time", "lag_s", "lookups",
+                                   "dns_ms"] + SHARE_COLS
+    return joined[columns]
+
+
+def site_shares(pages, by=("mode", "site")):
+    """Per group: page loads and the medians of dns_ms, ttfb_ms, load_ms and the DNS shares."""
+    by = list(by)
+    values = ["dns_ms"] + PAGE_TIMES + SHARE_COLS
+    g = pages.groupby(by, observed=True)
+    out = g[values].median().add_prefix("median_")
+    out.insert(0, "pages", g.size())
+    return out.reset_index()
+
+
+def _slope_ci(x, y, level, resamples, seed):
+    """Bootstrap CI of the least-squares slope of y on x, resampling (x, y) pairs."""
+    rng = np.random.default_rng(seed)
+    n = len(x)
+    slopes = []
+    step = max(1, MAX_CELLS // n)
+    for lo in range(0, resamples, step):
+        idx = rng.integers(0, n, size=(min(step, resamples - lo), n))
+        xs, ys = x[idx], y[idx]
+        xc = xs - xs.mean(axis=1, keepdims=True)
+        var = (xc * xc).sum(axis=1)
+        cov = (xc * (ys - ys.mean(axis=1, keepdims=True))).sum(axis=1)
+        slopes.append(np.divide(cov, var, out=np.full(len(var), np.nan), where=var > 0))
+    slopes = np.concatenate(slopes)
+    tail = (1 - level) / 2 * 100
+    return tuple(np.nanpercentile(slopes, [tail, 100 - tail])) if np.isfinite(slopes).any() else (np.nan,) * 2
+
+
+def regress(pages, x="dns_ms", ys=PAGE_TIMES, by=("mode",), level=DEFAULT_LEVEL,
+            resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED):
+    """Per group and y: n, slope (ms of y per ms of DNS) with CI, intercept, r2, pearson_r, spearman_rho."""
+    by = list(by)
+    rows = []
+    for key, g in pages.groupby(by, observed=True):
+        key = key if isinstance(key, tuple) else (key,)
+        for y in ys:
+            d = g[[x, y]].astype("float64").dropna()
+            xv, yv = d[x].to_numpy(), d[y].to_numpy()
+            stats = [np.nan] * 7
+            if len(d) >= 3 and xv.std() > 0 and yv.std() > 0:
+                slope, intercept = np.polyfit(xv, yv, 1)
+                r = np.corrcoef(xv, yv)[0, 1]
+                rho = np.corrcoef(d[x].rank(), d[y].rank())[0, 1]
+                stats = [slope, *_slope_ci(xv, yv, level, resamples, seed), intercept, r * r, r, rho]
+            rows.append([*key, y, len(d), *stats])
+    return pd.DataFrame(rows, columns=by + ["metric", "n", "slope", "slope_ci_low", "slope_ci_high",
+                                           "intercept", "r2", "pearson_r", "spearman_rho"])
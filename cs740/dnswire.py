@@ -0,0 +1,148 @@
+"""
+Minimal DNS wire format (RFC 1035) — just enough to time A/AAAA lookups.
+
+- build_query() encodes a single-question query with RD set.
+- parse_response() checks a reply against its query and returns the
+  header fields we record (rcode, answer count, TTLs of the answers).
+- parse_query() / build_response() are the server side, for the local
+  stand-in resolver (cs740.standin).
+- parse_resolver() reads the resolver specs shared by cs740.measure and
+  cs740.standin. This module only imports the standard library, so
+  `standin flush` (run as FLUSH_CMD before every cold trial) starts fast.
+- Raises DNSFormatError on anything it can't decode.
+"""
+
+import random
+import struct
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+QTYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "AAAA": 28}
+CLASS_IN = 1
+FLAG_QR = 0x8000
+FLAG_AA = 0x0400
+FLAG_TC = 0x0200
+FLAG_RD = 0x0100
+FLAG_RA = 0x0080
+
+DEFAULT_PORTS = {"udp": 53, "tcp": 53, "dot": 853, "doh": 443}
+DOH_PATH = "/dns-query"
+
+RCODE_NOERROR = 0
+RCODE_FORMERR = 1
+RCODE_NXDOMAIN = 3
+
+Response = namedtuple("Response", ["qid", "flags", "rcode", "ancount", "ttls"])
+# question is the raw question section, echoed back in replies
+Query = namedtuple("Query", ["qid", "flags", "name", "qtype", "question"])
+
+
+class DNSFormatError(ValueError):
+    pass
+
+
+def parse_resolver(resolver, transport="udp"):
+    """Return (host, port, path) for a resolver spec.
+
+    Accepts 'host#port' as in 20_measure_dns.sh, a plain host (default
+    port of the transport) and, for DoH, 'https://host[:port]/path'.
+    """
+    if "://" in resolver:
+        url = urlsplit(resolver)
+        return url.hostname, url.port or DEFAULT_PORTS[transport], url.path or DOH_PATH
+    host, _, port = resolver.partition("#")
+    return host, int(port or DEFAULT_PORTS[transport]), DOH_PATH
+
+
+def qname_from_site(site):
+    """Hostname to query for a site entry ('https://cern.ch' -> 'cern.ch')."""
+    host = urlsplit(site).hostname if "://" in site else site.split("/")[0]
+    return (host or site).rstrip(".")
+
+
+def encode_name(name):
+    out = bytearray()
+    for label in name.rstrip(".").split("."):
+        raw = label.encode("idna")
+        if not 0 < len(raw) < 64:
+            raise DNSFormatError(f"bad label in {name!r}")
+        out += bytes([len(raw)]) + raw
+    return bytes(out) + b"\0"
+
+
+def build_query(name, qtype="A", qid=None):
+    """Return (qid, wire bytes) for a recursive query of name."""
+    qid = random.getrandbits(16) if qid is None else qid
+    header = struct.pack(">HHHHHH", qid, FLAG_RD, 1, 0, 0, 0)
+    return qid, header + encode_name(name) + struct.pack(">HH", QTYPES[qtype], CLASS_IN)
+
+
+def skip_name(data, pos):
+    """Offset just past the (possibly compressed) name starting at pos."""
+    while True:
+        if pos >= len(data):
+            raise DNSFormatError("truncated name")
+        length = data[pos]
+        if length & 0xC0 == 0xC0:
+            return pos + 2
+        if length == 0:
+            return pos + 1
+        pos += length + 1
+
+
+def parse_response(data, qid=None):
+    """Decode the header and answer TTLs of a reply (checking its id if qid is given)."""
+    if len(data) < 12:
+        raise DNSFormatError("short response")
+    rid, flags, qdcount, ancount, _, _ = struct.unpack(">HHHHHH", data[:12])
+    if not flags & FLAG_QR:
+        raise DNSFormatError("not a response")
+    if qid is not None and rid != qid:
+        raise DNSFormatError("id mismatch")
+    pos = 12
+    for _ in range(qdcount):
+        pos = skip_name(data, pos) + 4
+    ttls = []
+    for _ in range(ancount):
+        pos = skip_name(data, pos)
+        if pos + 10 > len(data):
+            raise DNSFormatError("truncated answer")
+        _, _, ttl, rdlength = struct.unpack(">HHIH", data[pos:pos + 10])
+        ttls.append(ttl)
+        pos += 10 + rdlength
+    return Response(rid, flags, flags & 0x000F, ancount, ttls)
+
+
+def decode_name(data, pos):
+    """(name, offset just past it) for the uncompressed name starting at pos."""
+    labels = []
+    end = skip_name(data, pos)
+    while data[pos]:
+        if data[pos] & 0xC0:
+            raise DNSFormatError("compressed name in question")
+        labels.append(data[pos + 1:pos + 1 + data[pos]].decode("ascii", "replace"))
+        pos += data[pos] + 1
+    return ".".join(labels), end
+
+
+def parse_query(data):
+    """Decode the header and first question of a query."""
+    if len(data) < 12:
+        raise DNSFormatError("short query")
+    qid, flags, qdcount = struct.unpack(">HHH", data[:6])
+    if flags & FLAG_QR or qdcount < 1:
+        raise DNSFormatError("not a query")
+    name, pos = decode_name(data, 12)
+    if pos + 4 > len(data):
+        raise DNSFormatError("truncated question")
+    (qtype,) = struct.unpack(">H", data[pos:pos + 2])
+    return Query(qid, flags, name, qtype, data[12:pos + 4])
+
+
+def build_response(query, rcode=RCODE_NOERROR, answers=(), qid=None):
+    """Reply to query with answers [(type, ttl, rdata)], each owned by the question name."""
+    flags = FLAG_QR | FLAG_RA | (query.flags & FLAG_RD) | rcode
+    header = struct.pack(">HHHHHH", query.qid if qid is None else qid, flags, 1, len(answers), 0, 0)
+    records = b"".join(struct.pack(">HHHIH", 0xC00C, rtype, CLASS_IN, ttl, len(rdata)) + rdata
+                       for rtype, ttl, rdata in answers)        # 0xC00C points at the question name
+    return header + query.question + records
@@ -0,0 +1,789 @@
+"""
+Declarative figure pipeline: every figure of the project, rendered from one
+loaded dataset.
+
+- Tables are declared with @table: a named function of other tables (or of
+  the Dataset's dns / web / req). Only the tables the selected figures need
+  are built, each exactly once, in the parent process.
+- Figures are declared with @figure: a function of named tables (plus the
+  list of modes to show) returning a matplotlib Figure, or a
+  {filename: Figure} dict for figures split over several files, or None
+  when there is nothing to draw.
+- Figures are drawn with the object-oriented API on Agg canvases (no pyplot
+  state, never blocks on a window), in parallel worker processes
+  (CS740_WORKERS, default one per core).
+- A figure is skipped when its files exist and the digest of its input
+  tables, modes and of this module is the one recorded in the output
+  directory's .figures.json manifest.
+
+Usage:
+    python3 -m cs740 plot --list
+    python3 -m cs740 plot --data data_for_submission/pop_raw data_for_submission/unpop_raw \\
+        --out-dir use_this_fig 'dns_*' page_load_cold_vs_warm_bar
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cs740 import DEFAULT_DIRS, REPO_DIR
+from cs740.correlate import PAGE_TIMES, join, regress
+from cs740.loader import DNS_PHASES, load_dataset, parallel_map, precise_ms
+from cs740.stats import quantile_ci, with_ci
+from cs740.summary import stat_series, summarize
+from cs740.timeseries import TimeIndex
+
+MANIFEST = ".figures.json"
+DATASET_TABLES = ("dns", "web", "req")
+
+MODE_ORDER = ["public_udp", "isp_udp", "dot", "doh", "local_cache"]
+ENCRYPTED = ["dot", "doh"]
+PHASE_COLS = [p.replace("_us", "_ms") for p in DNS_PHASES]
+
+# site order of the per-site figures: first POPULAR_N of config/sites.txt,
+# then first UNPOPULAR_N of config/unpopular_sites.txt, then the rest
+POPULAR_CFG = os.path.join(REPO_DIR, "config", "sites.txt")
+UNPOPULAR_CFG = os.path.join(REPO_DIR, "config", "unpopular_sites.txt")
+POPULAR_N = 10
+UNPOPULAR_N = 10
+
+# style of the analysis figures (analysis/cs740_analysis.py)
+ANALYSIS_STYLE = "seaborn-v0_8-whitegrid"
+TIMELINE_STEP = "1min"
+COLORS = {'public_udp': '#2ecc71', 'isp_udp': '#3498db', 'dot': '#9b59b6', 'doh': '#e74c3c'}
+LABELS = {'public_udp': 'Public UDP', 'isp_udp': 'ISP UDP', 'dot': 'DoT', 'doh': 'DoH'}
+OTHER_COLOR = '#95a5a6'
+
+Table = namedtuple("Table", "name inputs build")
+FigureSpec = namedtuple("FigureSpec", "name filename inputs render dpi style")
+
+TABLES = {}
+FIGURES = {}
+
+
+def table(*inputs):
+    """Register build(*inputs) as the table named after it."""
+    def register(build):
+        TABLES[build.__name__] = Table(build.__name__, inputs, build)
+        return build
+    return register
+
+
+def figure(filename, *inputs, dpi=150, style=None):
+    """Register render(*inputs, modes=...) as the figure named after it."""
+    def register(render):
+        FIGURES[render.__name__] = FigureSpec(render.__name__, filename, inputs, render, dpi, style)
+        return render
+    return register
+
+
+def order_modes(modes):
+    """modes in MODE_ORDER, then any others sorted."""
+    modes = set(modes)
+    return [m for m in MODE_ORDER if m in modes] + sorted(modes - set(MODE_ORDER))
+
+
+def read_site_list(path, max_items=None):
+    if not os.path.isfile(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [ln.strip() for ln in f if ln.strip()]
+    return lines[:max_items] if max_items is not None else lines
+
+
+def with_phase(dns, drop_unresolved=False):
+    """ok lookups in float ms, labelled phase=cold (a cache miss, see classify_cache) or warm."""
+    dns = precise_ms(dns[dns['status'] == 'ok'], drop_unresolved=drop_unresolved)
+    return dns.assign(phase=dns['cache'].cat.rename_categories({'miss': 'cold', 'hit': 'warm'}))
+
+
+def _new_figure(figsize):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize)
+    return fig, fig.add_subplot()
+
+
+# ============================================================
+# Tables
+# ============================================================
+
+@table("dns")
+def dns_ok(dns):
+    """ok lookups (dig's 0 ms dropped) with their cold / warm phase."""
+    return with_phase(dns, drop_unresolved=True)
+
+
+@table("dns_ok")
+def dns_by_popularity(dns_ok):
+    return summarize(dns_ok, by=['popularity', 'mode'])
+
+
+@table("dns_ok")
+def dns_by_phase(dns_ok):
+    return summarize(dns_ok, by=['mode', 'phase'])
+
+
+@table("dns_ok")
+def dns_by_mode(dns_ok):
+    return summarize(dns_ok, by=['mode'])
+
+
+@table("dns_ok")
+def dns_phase_samples(dns_ok):
+    return dns_ok[['mode', 'phase', 'ms']]
+
+
+@table("web")
+def web_loads(web):
+    return web[(web['status'] == 'ok') & (web['load_ms'] > 0)]
+
+
+@table("web_loads")
+def web_by_state(web_loads):
+    return summarize(web_loads, 'load_ms', by=['mode', 'cache_state'])
+
+
+@table("web_loads")
+def web_by_mode(web_loads):
+    return summarize(web_loads, 'load_ms', by=['mode'])
+
+
+@table("dns")
+def dns_sites(dns):
+    """Per-site statistics per (mode, site, phase)."""
+    return summarize(with_phase(dns), by=['mode', 'site', 'phase'])
+
+
+@table("dns_sites")
+def dns_site_modes(dns_sites):
+    """Median of the site medians per (mode, phase), with IQR and bootstrap 95% CI."""
+    mode_stats = summarize(dns_sites, values='median', by=['mode', 'phase'], quantiles=(0.25, 0.75))
+    ci = quantile_ci(dns_sites, value='median', by=['mode', 'phase'])
+    return mode_stats.merge(ci[['mode', 'phase', 'ci_low', 'ci_high']], on=['mode', 'phase'], how='left')
+
+
+@table("dns")
+def dns_timeline(dns):
+    """Per-minute median / p95 per mode over the campaign (rows with a timestamp only)."""
+    resolved = precise_ms(dns[dns['status'] == 'ok'], drop_unresolved='cold')
+    return TimeIndex(resolved).windows('ms', step=TIMELINE_STEP, quantiles=(0.5, 0.95))
+
+
+@table()
+def site_order():
+    return pd.DataFrame({'site': read_site_list(POPULAR_CFG, POPULAR_N) +
+                                 read_site_list(UNPOPULAR_CFG, UNPOPULAR_N)})
+
+
+@table("dns")
+def dns_states(dns):
+    """Per (mode, cache state) with median CIs; dig's 0 ms only dropped from cold lookups."""
+    resolved = precise_ms(dns[dns['status'] == 'ok'], drop_unresolved='cold')
+    return with_ci(summarize(resolved, by=['mode', 'cache_state']), resolved, by=['mode', 'cache_state'])
+
+
+@table("dns")
+def dns_cold(dns):
+    ok = dns[(dns['status'] == 'ok') & (dns['cache_state'] == 'cold')]
+    return precise_ms(ok)[['mode', 'ms']]
+
+
+@table("dns_cold")
+def dns_encrypted(dns_cold):
+    """Cold lookups of encrypted (ENCRYPTED) vs unencrypted modes, with median CIs."""
+    enc = dns_cold.assign(encrypted=dns_cold['mode'].isin(ENCRYPTED))
+    return with_ci(summarize(enc, by=['encrypted']), enc, by=['encrypted'])
+
+
+@table("web")
+def web_breakdown(web):
+    ok = web[web['status'] == 'ok']
+    return summarize(ok, values=['ttfb_ms', 'dom_ms', 'load_ms'], by=['mode'])
+
+
+@table("dns")
+def dns_phases(dns):
+    """Mean time per phase of the lookups timed by cs740.measure, one row per mode.
+
+    connect / TLS count as 0 on reused connections, so the phases of a mode
+    add up to its mean cost per lookup.
+    """
+    rows = dns[(dns['status'] == 'ok')].dropna(subset=['write_us'])
+    phase_ms = rows[['mode']].join(rows[DNS_PHASES].fillna(0).div(1000).set_axis(PHASE_COLS, axis=1))
+    stats = summarize(phase_ms, values=PHASE_COLS, by=['mode'])
+    modes = order_modes(rows['mode'].unique())
+    df = stats.pivot(index='mode', columns='metric', values='mean').reindex(index=modes, columns=PHASE_COLS).round(2)
+    df['total_ms'] = df.sum(axis=1)
+    df['samples'] = stat_series(stats, 'count', metric=PHASE_COLS[0]).reindex(modes)
+    return df.rename_axis('mode').reset_index()
+
+
+@table("dns", "web")
+def dns_page_join(dns, web):
+    """Ok page loads with the DNS run right before them (cs740.correlate)."""
+    return join(dns, web)
+
+
+@table("dns_page_join")
+def dns_page_fit(dns_page_join):
+    return regress(dns_page_join)
+
+
+# ============================================================
+# Figures: top-level comparison scripts (use_this_fig)
+# ============================================================
+
+def _pair_bars(ax, modes, left, right, labels, offset, fmt):
+    """Two bars per mode (blue, orange) with their values written on top."""
+    x = np.arange(len(modes))
+    width = 0.35
+    bars_left = ax.bar(x - width/2, left, width, color='#1f77b4', label=labels[0])
+    bars_right = ax.bar(x + width/2, right, width, color='#ff7f0e', label=labels[1])
+    for bar in bars_left + bars_right:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2, height + offset, format(height, fmt),
+                ha='center', va='bottom', fontsize=10)
+    ax.set_xticks(x, modes, rotation=20)
+    ax.legend()
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
+
+
+@figure("dns_lookup_pop_vs_unpop_bar.png", "dns_by_popularity", dpi=300)
+def dns_pop_vs_unpop_bar(dns_by_popularity, modes):
+    """Mean DNS lookup time of popular vs unpopular sites per mode (cold + warm)."""
+    means = stat_series(dns_by_popularity, 'mean', index=['popularity', 'mode'])
+    fig, ax = _new_figure((10, 6))
+    _pair_bars(ax, modes, [means.get(('popular', m), 0) for m in modes],
+               [means.get(('unpopular', m), 0) for m in modes], ('Popular', 'Unpopular'), 0.2, '.1f')
+    ax.set_ylabel("Mean DNS lookup time (ms)")
+    ax.set_title("DNS Lookup Time: Popular vs Unpopular Sites")
+    fig.tight_layout()
+    return fig
+
+
+@figure("page_load_cold_vs_warm_bar.png", "web_by_state", dpi=300)
+def page_load_cold_vs_warm_bar(web_by_state, modes):
+    """Mean page load time, cold vs warm runs, per mode."""
+    means = stat_series(web_by_state, 'mean', index=['mode', 'cache_state'])
+    fig, ax = _new_figure((10, 6))
+    _pair_bars(ax, modes, [means.get((m, 'cold'), 0) for m in modes],
+               [means.get((m, 'warm'), 0) for m in modes], ('Cold', 'Warm'), 50, '.0f')
+    ax.set_ylabel("Mean Page Load Time (ms)")
+    ax.set_title("Page Load Time: Cold vs Warm per Mode")
+    fig.tight_layout()
+    return fig
+
+
+@figure("boxplot_dns_cold_vs_warm.png", "dns_phase_samples", dpi=300)
+def dns_cold_vs_warm_boxplot(dns_phase_samples, modes):
+    """Distribution of DNS lookup times, cold (first trial of a cold run) vs warm, per mode."""
+    samples = {key: g.to_numpy() for key, g in dns_phase_samples.groupby(['mode', 'phase'], observed=True)['ms']}
+    data, labels = [], []
+    for mode in modes:
+        for phase in ('cold', 'warm'):
+            data.append(samples.get((mode, phase), np.array([])))
+            labels.append(f"{mode}\n{phase.capitalize()}")
+    fig, ax = _new_figure((12, 6))
+    bp = ax.boxplot(data, patch_artist=True, widths=0.6)
+    ax.set_xticks(np.arange(1, len(labels) + 1), labels, rotation=20)
+    for patch, color in zip(bp['boxes'], ['#1f77b4', '#ff7f0e'] * len(modes)):
+        patch.set_facecolor(color)
+        patch.set_alpha(0.6)
+    ax.set_ylabel("DNS Lookup Time (ms)")
+    ax.set_title("DNS Lookup Time: Cold vs Warm per Mode")
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
+    fig.tight_layout()
+    return fig
+
+
+@figure("dns_lookup_cold_vs_warm_bar.png", "dns_by_phase", dpi=300)
+def dns_cold_vs_warm_bar(dns_by_phase, modes):
+    """Mean DNS lookup time, cold (first trial of a cold run) vs warm, per mode."""
+    means = stat_series(dns_by_phase, 'mean', index=['mode', 'phase'])
+    fig, ax = _new_figure((10, 6))
+    _pair_bars(ax, modes, [means.get((m, 'cold'), 0) for m in modes],
+               [means.get((m, 'warm'), 0) for m in modes], ('Cold', 'Warm'), 0.2, '.1f')
+    ax.set_ylabel("Mean DNS lookup time (ms)")
+    ax.set_title("DNS Lookup Time: Cold vs Warm")
+    fig.tight_layout()
+    return fig
+
+
+@figure("dns_summary_bar.png", "dns_by_mode", "web_by_mode", dpi=300)
+def dns_vs_page_load_bar(dns_by_mode, web_by_mode, modes):
+    """Mean DNS lookup time next to mean page load time per mode."""
+    dns_avg = stat_series(dns_by_mode, 'mean')
+    web_avg = stat_series(web_by_mode, 'mean')
+    fig, ax = _new_figure((10, 6))
+    _pair_bars(ax, modes, [dns_avg.get(m, 0) for m in modes], [web_avg.get(m, 0) for m in modes],
+               ('DNS Lookup', 'Page Load'), 10, '.0f')
+    ax.set_ylabel("Average Time (ms)")
+    ax.set_title("DNS Lookup & Page Load Time")
+    fig.tight_layout()
+    return fig
+
+
+# ============================================================
+# Figures: per-site medians (plot_dns_latency.py, new_fig)
+# ============================================================
+
+def _by_phase(stats, column, modes):
+    """One column of the (mode, phase)-indexed stats as a modes x [cold, warm] frame."""
+    return stats[column].unstack('phase').reindex(index=modes, columns=['cold', 'warm']).astype(float)
+
+
+@figure("modes_dns_cold_warm_improved.png", "dns_site_modes")
+def modes_cold_warm(dns_site_modes, modes):
+    """Median of per-site medians per mode, cold vs warm, with IQR whiskers and the median's 95% CI."""
+    if dns_site_modes.empty:
+        return None
+    stats = dns_site_modes.set_index(['mode', 'phase'])
+    n_sites = _by_phase(stats, 'count', modes).fillna(0)
+    modes = [m for m in modes if n_sites.loc[m].max() > 0]
+    if not modes:
+        return None
+    median, q1, q3, ci_low, ci_high = (_by_phase(stats, c, modes)
+                                       for c in ('median', 'p25', 'p75', 'ci_low', 'ci_high'))
+
+    x = np.arange(len(modes))
+    width = 0.35
+    fig, ax = _new_figure((max(10, len(modes)*2.0), 6))
+    for offset, phase in ((-width/2, 'cold'), (width/2, 'warm')):
+        med = median[phase].to_numpy()
+        # asymmetric yerr = [[median - q1], [q3 - median]]
+        ax.bar(x + offset, med, width, label=f'{phase.capitalize()} (median of site-medians)',
+               yerr=np.nan_to_num([med - q1[phase], q3[phase] - med]), capsize=6)
+        # bootstrap 95% CI of the median, drawn over the IQR whiskers
+        ax.errorbar(x + offset, med, yerr=np.nan_to_num([med - ci_low[phase], ci_high[phase] - med]),
+                    fmt='none', ecolor='black', elinewidth=2.5, capsize=3,
+                    label='95% CI of median' if phase == 'cold' else None)
+        # annotate sample sizes (n_sites)
+        for xi, height, n in zip(x + offset, np.nan_to_num(med), n_sites.loc[modes, phase]):
+            ax.text(xi, height + 1, f"n={int(n)}", ha='center', va='bottom', fontsize=8)
+
+    ax.set_xticks(x, modes, rotation=25, ha='right')
+    ax.set_ylabel("Latency (ms) — median of per-site medians")
+    ax.set_title("Median DNS Lookup Latency by Mode (cold vs warm)")
+    ax.legend()
+    ax.grid(axis='y', linestyle='--', alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+@figure("{mode}_per_site_ordered.png", "dns_sites", "site_order")
+def per_site_ordered(dns_sites, site_order, modes):
+    """One figure per mode: per-site cold / warm medians, sites in config order."""
+    per_site = dns_sites.pivot(index=['mode', 'site'], columns='phase', values=['median', 'count'])
+    per_site = per_site.reindex(columns=pd.MultiIndex.from_product([['median', 'count'], ['cold', 'warm']]))
+    figs = {}
+    for mode in modes:
+        if mode not in per_site.index.get_level_values('mode'):
+            continue
+        sites = per_site.loc[mode]
+        # config order first (popular, then unpopular), then the remaining sites sorted
+        listed = [s for s in dict.fromkeys(site_order['site']) if s in sites.index]
+        ordered = listed + sorted(set(sites.index) - set(listed))
+        sites = sites.reindex(ordered)
+        # NaN (no samples) drawn as a hatched 0 bar annotated n=0
+        cold_plot = sites[('median', 'cold')].fillna(0).to_numpy()
+        warm_plot = sites[('median', 'warm')].fillna(0).to_numpy()
+        cold_ns = sites[('count', 'cold')].fillna(0).astype(int).to_numpy()
+        warm_ns = sites[('count', 'warm')].fillna(0).astype(int).to_numpy()
+
+        x = np.arange(len(ordered))
+        width = 0.35
+        fig, ax = _new_figure((max(12, len(ordered)*0.6), 6))
+        bars_cold = ax.bar(x - width/2, cold_plot, width, label='Cold (per-site median)')
+        bars_warm = ax.bar(x + width/2, warm_plot, width, label='Warm (per-site median)')
+        for i in range(len(ordered)):
+            ax.text(x[i] - width/2, max(cold_plot[i], 0) + 1, f"n={cold_ns[i]}", ha='center', va='bottom', fontsize=7)
+            ax.text(x[i] + width/2, max(warm_plot[i], 0) + 1, f"n={warm_ns[i]}", ha='center', va='bottom', fontsize=7)
+            if cold_ns[i] == 0:
+                bars_cold[i].set_hatch('//')
+                bars_cold[i].set_alpha(0.4)
+            if warm_ns[i] == 0:
+                bars_warm[i].set_hatch('\\')
+                bars_warm[i].set_alpha(0.4)
+        ax.set_xticks(x, ordered, rotation=25, ha='right', fontsize=8)
+        ax.set_ylabel("Latency (ms) — per-site median")
+        ax.set_title(f"Per-site DNS Lookup Median for mode '{mode}'\n"
+                     f"Popular (top {POPULAR_N}) first, Unpopular (top {UNPOPULAR_N}) next")
+        ax.legend()
+        ax.grid(axis='y', linestyle='--', alpha=0.3)
+        fig.tight_layout()
+        figs[f"{mode}_per_site_ordered.png"] = fig
+    return figs
+
+
+@figure("{mode}_latency_over_time.png", "dns_timeline")
+def latency_over_time(dns_timeline, modes):
+    """One figure per mode: per-minute median and p95 lookup latency over the campaign."""
+    from matplotlib.dates import DateFormatter
+
+    figs = {}
+    for mode in modes:
+        rows = dns_timeline[dns_timeline['mode'] == mode].set_index('time')
+        if rows.empty:
+            continue
+        n, minutes = int(rows['count'].sum()), len(rows)
+        # minutes without lookups become NaN so the lines break there
+        rows = rows.reindex(pd.date_range(rows.index.min(), rows.index.max(), freq=TIMELINE_STEP))
+        color = COLORS.get(mode, OTHER_COLOR)
+        fig, ax = _new_figure((12, 5))
+        ax.fill_between(rows.index, rows['median'], rows['p95'], color=color, alpha=0.15)
+        ax.plot(rows.index, rows['median'], marker='o', markersize=3, color=color, label='Median')
+        ax.plot(rows.index, rows['p95'], marker='o', markersize=3, linestyle='--', color=color, label='p95')
+        ax.xaxis.set_major_formatter(DateFormatter('%m-%d %H:%M', tz='UTC'))
+        ax.set_xlabel("Time (UTC)")
+        ax.set_ylabel("DNS Latency (ms)")
+        ax.set_title(f"DNS Lookup Latency over the Campaign for mode '{mode}' (per minute)\n"
+                     f"{n} lookups in {minutes} minutes")
+        ax.legend()
+        ax.grid(linestyle='--', alpha=0.3)
+        fig.autofmt_xdate()
+        fig.tight_layout()
+        figs[f"{mode}_latency_over_time.png"] = fig
+    return figs
+
+
+# ============================================================
+# Figures: analysis/cs740_analysis.py
+# ============================================================
+
+def ci_err(stats):
+    """Asymmetric yerr (median -> bootstrap 95% CI bounds) for bar charts."""
+    return [(stats["median"] - stats["median_ci_low"]).fillna(0).tolist(),
+            (stats["median_ci_high"] - stats["median"]).fillna(0).tolist()]
+
+
+def _state_stats(dns_states, state, modes):
+    return dns_states[dns_states["cache_state"] == state].set_index("mode").reindex(modes)
+
+
+@figure("fig1_dns_latency_by_mode.png", "dns_states", style=ANALYSIS_STYLE)
+def fig1_dns_latency_by_mode(dns_states, modes):
+    cold_stats = _state_stats(dns_states, "cold", modes)
+    medians = cold_stats["median"].tolist()
+    fig, ax1 = _new_figure((8, 5))
+    bars = ax1.bar([LABELS.get(m, m) for m in modes], medians,
+                   color=[COLORS.get(m, OTHER_COLOR) for m in modes], yerr=ci_err(cold_stats),
+                   capsize=5, edgecolor='black', linewidth=1.2)
+    ax1.set_ylabel("DNS Latency (ms)", fontsize=12)
+    ax1.set_xlabel("DNS Mode", fontsize=12)
+    ax1.set_title("DNS Resolution Time by Mode (Cold Cache, 95% CI)", fontsize=14, fontweight='bold')
+    ax1.set_ylim(0, max(max(medians), cold_stats["median_ci_high"].max()) * 1.3)
+    for bar, med, top in zip(bars, medians, cold_stats["median_ci_high"].fillna(0)):
+        ax1.annotate(f'{med:.0f}', xy=(bar.get_x() + bar.get_width()/2, max(bar.get_height(), top)),
+                     ha='center', va='bottom', fontsize=11, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+@figure("fig2_cold_vs_warm.png", "dns_states", style=ANALYSIS_STYLE)
+def fig2_cold_vs_warm(dns_states, modes):
+    cold_stats = _state_stats(dns_states, "cold", modes)
+    warm_stats = _state_stats(dns_states, "warm", modes)
+    x = np.arange(len(modes))
+    width = 0.35
+    cold_meds = cold_stats["median"].tolist()
+    warm_meds = warm_stats["median"].fillna(0).tolist()
+
+    fig, ax2 = _new_figure((8, 5))
+    ax2.bar(x - width/2, cold_meds, width, label='Cold', color='#e74c3c', edgecolor='black',
+            yerr=ci_err(cold_stats), capsize=4)
+    ax2.bar(x + width/2, warm_meds, width, label='Warm', color='#2ecc71', edgecolor='black',
+            yerr=ci_err(warm_stats), capsize=4)
+    ax2.set_ylabel("DNS Latency (ms)", fontsize=12)
+    ax2.set_xlabel("DNS Mode", fontsize=12)
+    ax2.set_title("Cold vs Warm DNS Lookup Time", fontsize=14, fontweight='bold')
+    ax2.set_xticks(x)
+    ax2.set_xticklabels([LABELS.get(m, m) for m in modes])
+    ax2.legend()
+    ax2.set_ylim(0, max(max(cold_meds), cold_stats["median_ci_high"].max()) * 1.2)
+    fig.tight_layout()
+    return fig
+
+
+@figure("fig3_pageload_breakdown.png", "web_breakdown", style=ANALYSIS_STYLE)
+def fig3_pageload_breakdown(web_breakdown, modes):
+    medians = (web_breakdown.pivot(index="mode", columns="metric", values="median")
+               .reindex(modes).dropna(how="all").round(0))
+    web_modes = medians.index.tolist()
+    ttfb = medians["ttfb_ms"].tolist()
+    dom_only = (medians["dom_ms"] - medians["ttfb_ms"]).tolist()
+    load_only = (medians["load_ms"] - medians["dom_ms"]).tolist()
+
+    fig, ax3 = _new_figure((9, 5))
+    x = np.arange(len(web_modes))
+    ax3.bar(x, ttfb, label='TTFB', color='#3498db', edgecolor='black')
+    ax3.bar(x, dom_only, bottom=ttfb, label='DOM Load', color='#f39c12', edgecolor='black')
+    ax3.bar(x, load_only, bottom=[t+d for t,d in zip(ttfb, dom_only)], label='Full Load', color='#e74c3c', edgecolor='black')
+    ax3.set_ylabel("Time (ms)", fontsize=12)
+    ax3.set_xlabel("DNS Mode", fontsize=12)
+    ax3.set_title("Page Load Time Breakdown by DNS Mode", fontsize=14, fontweight='bold')
+    ax3.set_xticks(x)
+    ax3.set_xticklabels([LABELS.get(m, m) for m in web_modes])
+    ax3.legend(loc='upper right')
+    fig.tight_layout()
+    return fig
+
+
+@figure("fig4_dns_boxplot.png", "dns_cold", style=ANALYSIS_STYLE)
+def fig4_dns_boxplot(dns_cold, modes):
+    cold_samples = {m: g.dropna().to_numpy(float) for m, g in dns_cold.groupby("mode", observed=True)["ms"]}
+    box_data = [cold_samples.get(m, np.array([])) for m in modes]
+    fig, ax4 = _new_figure((9, 5))
+    bp = ax4.boxplot(box_data, patch_artist=True)
+    ax4.set_xticks(np.arange(1, len(modes) + 1), [LABELS.get(m, m) for m in modes])
+    for patch, mode in zip(bp['boxes'], modes):
+        patch.set_facecolor(COLORS.get(mode, OTHER_COLOR))
+        patch.set_alpha(0.7)
+    ax4.set_ylabel("DNS Latency (ms)", fontsize=12)
+    ax4.set_xlabel("DNS Mode", fontsize=12)
+    ax4.set_title("DNS Latency Distribution (Cold Cache)", fontsize=14, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+@figure("fig5_encrypted_comparison.png", "dns_encrypted", style=ANALYSIS_STYLE)
+def fig5_encrypted_comparison(dns_encrypted, modes):
+    enc = dns_encrypted.set_index("encrypted").reindex([False, True])
+    values = enc["median"].to_numpy(float)
+    enc_err = [(values - enc["median_ci_low"].to_numpy(float)).clip(0),
+               (enc["median_ci_high"].to_numpy(float) - values).clip(0)]
+    fig, ax5 = _new_figure((6, 5))
+    categories = ['Unencrypted\n(Public+ISP)', 'Encrypted\n(DoT+DoH)']
+    bars = ax5.bar(categories, values, color=['#2ecc71', '#9b59b6'], edgecolor='black', linewidth=1.5,
+                   yerr=np.nan_to_num(enc_err), capsize=6)
+    ax5.set_ylabel("Median DNS Latency (ms)", fontsize=12)
+    ax5.set_title("Encrypted vs Unencrypted DNS", fontsize=14, fontweight='bold')
+    for bar, val, top in zip(bars, values, enc["median_ci_high"].fillna(0)):
+        ax5.annotate(f'{val:.1f} ms', xy=(bar.get_x() + bar.get_width()/2, max(bar.get_height(), top)),
+                     ha='center', va='bottom', fontsize=12, fontweight='bold')
+    ax5.set_ylim(0, max(np.nanmax(values), np.nanmax(enc["median_ci_high"].to_numpy(float))) * 1.25)
+    fig.tight_layout()
+    return fig
+
+
+@figure("fig6_dns_phase_breakdown.png", "dns_phases", style=ANALYSIS_STYLE)
+def fig6_dns_phase_breakdown(dns_phases, modes):
+    """Stacked mean phase times per lookup; only drawn when cs740.measure phase timings exist."""
+    if dns_phases.empty:
+        return None
+    fig, ax6 = _new_figure((9, 5))
+    x = np.arange(len(dns_phases))
+    bottom = np.zeros(len(dns_phases))
+    phase_colors = ['#95a5a6', '#9b59b6', '#3498db', '#f39c12', '#e74c3c']
+    phase_labels = ['TCP Connect', 'TLS Handshake', 'Request Write', 'Wait (First Byte)', 'Response Read']
+    for col, color, label in zip(PHASE_COLS, phase_colors, phase_labels):
+        ax6.bar(x, dns_phases[col], bottom=bottom, label=label, color=color, edgecolor='black')
+        bottom += dns_phases[col].to_numpy()
+    ax6.set_ylabel("Mean Time per Lookup (ms)", fontsize=12)
+    ax6.set_xlabel("DNS Mode", fontsize=12)
+    ax6.set_title("DNS Lookup Phase Breakdown by Mode", fontsize=14, fontweight='bold')
+    ax6.set_xticks(x)
+    ax6.set_xticklabels([LABELS.get(m, m) for m in dns_phases["mode"]])
+    ax6.legend(loc='upper right')
+    fig.tight_layout()
+    return fig
+
+
+@figure("fig7_dns_vs_page_load.png", "dns_page_join", "dns_page_fit", style=ANALYSIS_STYLE)
+def fig7_dns_vs_page_load(dns_page_join, dns_page_fit, modes):
+    """TTFB and load time against the DNS run before each page load, with per-mode fits."""
+    from matplotlib.figure import Figure
+
+    if dns_page_join.empty:
+        return None
+    fig = Figure(figsize=(12, 5))
+    axes = fig.subplots(1, len(PAGE_TIMES))
+    for ax, metric, title in zip(axes, PAGE_TIMES, ["Time to First Byte", "Page Load Time"]):
+        for mode in modes:
+            rows = dns_page_join[dns_page_join["mode"] == mode]
+            if rows.empty:
+                continue
+            fit = dns_page_fit[(dns_page_fit["mode"] == mode) & (dns_page_fit["metric"] == metric)]
+            label = LABELS.get(mode, mode)
+            if len(fit) and pd.notna(fit["slope"].iloc[0]):
+                label += f" (r={fit['pearson_r'].iloc[0]:.2f})"
+                xs = np.array([rows["dns_ms"].min(), rows["dns_ms"].max()])
+                ax.plot(xs, fit["intercept"].iloc[0] + fit["slope"].iloc[0] * xs,
+                        color=COLORS.get(mode, OTHER_COLOR), linewidth=1.5)
+            ax.scatter(rows["dns_ms"], rows[metric], s=18, alpha=0.7, label=label,
+                       color=COLORS.get(mode, OTHER_COLOR), edgecolor='black', linewidth=0.3)
+        ax.set_xlabel("DNS Lookup Before the Load (ms)", fontsize=12)
+        ax.set_ylabel(f"{title} (ms)", fontsize=12)
+        ax.set_title(f"DNS vs {title}", fontsize=14, fontweight='bold')
+        ax.legend(fontsize=9)
+    fig.tight_layout()
+    return fig
+
+
+ANALYSIS_FIGURES = [name for name in FIGURES if name.startswith("fig")]
+
+
+# ============================================================
+# Pipeline
+# ============================================================
+
+def select(patterns=None):
+    """Names of the registered figures matching any of patterns (fnmatch), all by default."""
+    if not patterns:
+        return list(FIGURES)
+    names = [n for n in FIGURES if any(fnmatch.fnmatchcase(n, p) for p in patterns)]
+    unknown = [p for p in patterns if not any(fnmatch.fnmatchcase(n, p) for n in FIGURES)]
+    if unknown:
+        raise KeyError(f"no figure matches {', '.join(unknown)} (see --list)")
+    return names
+
+
+def build_tables(names, dirs=DEFAULT_DIRS, tables=None):
+    """Every table the figures names read, built once; tables seeds already-computed ones."""
+    tables = dict(tables or {})
+    dataset = []
+
+    def get(name):
+        if name not in tables:
+            if name in DATASET_TABLES:
+                if not dataset:
+                    dataset.append(load_dataset(dirs))
+                tables[name] = getattr(dataset[0], name)
+            else:
+                spec = TABLES[name]
+                tables[name] = spec.build(*(get(i) for i in spec.inputs))
+        return tables[name]
+
+    for name in names:
+        for i in FIGURES[name].inputs:
+            get(i)
+    return tables
+
+
+@lru_cache(maxsize=None)
+def _source_digest():
+    with open(__file__, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def digest(name, inputs, modes):
+    """Fingerprint of what figure name would draw: its input tables, modes and this module."""
+    h = hashlib.sha1(f"{_source_digest()}|{name}|{modes}".encode())
+    for df in inputs:
+        h.update(",".join(map(str, df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _figure_modes(inputs):
+    modes = set()
+    for df in inputs:
+        if "mode" in df.columns:
+            modes.update(df["mode"].dropna().unique())
+    return order_modes(modes)
+
+
+def _render(name, inputs, modes, out_dir):
+    """Draw figure name and save its file(s) under out_dir; runs in pool workers."""
+    import matplotlib.style
+
+    spec = FIGURES[name]
+    with matplotlib.style.context(spec.style or []):
+        figs = spec.render(*inputs, modes=modes)
+        if figs is None:
+            return []
+        if not isinstance(figs, dict):
+            figs = {spec.filename: figs}
+        paths = []
+        for filename, fig in figs.items():
+            path = os.path.join(out_dir, filename)
+            fig.savefig(path, dpi=spec.dpi)
+            paths.append(path)
+    return paths
+
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def render(names=None, dirs=DEFAULT_DIRS, out_dir="figs", modes=None, tables=None, force=False,
+           workers=None):
+    """Render the figures matching names (all by default) into out_dir.
+
+    All figures are drawn from one dataset (dirs, loaded once) and the
+    tables built from it; tables seeds tables the caller already has.
+    modes fixes the modes shown (default: those in each figure's inputs).
+    Figures whose inputs are unchanged since the last render are skipped
+    unless force. Returns {name: [paths]} of the figures drawn.
+    """
+    names = select(names)
+    os.makedirs(out_dir, exist_ok=True)
+    tables = build_tables(names, dirs, tables)
+    manifest = _read_manifest(out_dir)
+
+    jobs, keys = [], {}
+    for name in names:
+        inputs = [tables[i] for i in FIGURES[name].inputs]
+        fig_modes = list(modes) if modes is not None else _figure_modes(inputs)
+        keys[name] = digest(name, inputs, fig_modes)
+        entry = manifest.get(name, {})
+        files = [os.path.join(out_dir, f) for f in entry.get("files", [])]
+        if not force and entry.get("key") == keys[name] and all(map(os.path.exists, files)):
+            print(f"  [skip] {name} (unchanged)")
+            continue
+        jobs.append((name, inputs, fig_modes, out_dir))
+
+    drawn = dict(zip([j[0] for j in jobs], parallel_map(_render, jobs, workers)))
+    for name, paths in drawn.items():
+        manifest[name] = {"key": keys[name], "files": [os.path.relpath(p, out_dir) for p in paths]}
+        for path in paths:
+            print(f"  [OK] {path}")
+        if not paths:
+            print(f"  [--] {name} (nothing to draw)")
+    _write_manifest(out_dir, manifest)
+    return drawn
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Render the project's figures from one loaded dataset.")
+    ap.add_argument("figures", nargs="*", help="figure names or glob patterns (default: all)")
+    ap.add_argument("--data", nargs="+", default=list(DEFAULT_DIRS), help="raw data directories")
+    ap.add_argument("--out-dir", default=os.path.join(REPO_DIR, "figs"))
+    ap.add_argument("--modes", nargs="+", help="modes to show, in order (default: all in the data)")
+    ap.add_argument("--force", action="store_true", help="re-render figures whose inputs are unchanged")
+    ap.add_argument("--workers", type=int, help="render processes (default CS740_WORKERS or one per core)")
+    ap.add_argument("--list", action="store_true", help="list the figures and exit")
+    args = ap.parse_args(argv)
+
+    if args.list:
+        for spec in FIGURES.values():
+            print(f"{spec.name:30s} {spec.filename:38s} <- {', '.join(spec.inputs)}")
+        return
+    try:
+        drawn = render(args.figures, args.data, args.out_dir, args.modes, force=args.force,
+                       workers=args.workers)
+    except KeyError as e:
+        ap.error(e.args[0])
+    print(f"{len(drawn)} figure(s) rendered, {sum(map(len, drawn.values()))} file(s) -> {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
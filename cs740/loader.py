@@ -0,0 +1,371 @@
+"""
+Shared loader for raw DNS / page-load measurements.
+
+- Discovers every raw CSV under the given directories once, using the
+  filename conventions of the measurement scripts:
+      {mode}_{dns|web|req}_{cold|warm}[_unpopular].csv   (data_for_submission, data_ryan)
+      {dns|web}_{mode}[_{cold|warm}].csv                  (legacy data/raw layout)
+  Per-site files ({site}_{mode}_{cold|warm}.csv under data/raw/dns and
+  data/raw/web) are recognised by parse_site_filename() but not picked up
+  by discover(); cs740.catalog indexes every layout.
+- Parses all files in a single pass with explicit dtypes and returns one
+  typed table per measurement kind (categorical mode/site/status,
+  int32 trial and latencies).
+- DNS rows carry the latency twice: the legacy integer `ms` and a float
+  `us` (microseconds). Files written before `us` existed get it from
+  `ms`, so `us` is always the most precise value available.
+  `handshake_us` is the connection setup time cs740.measure records for
+  queries that had to open a TCP/TLS connection (NaN otherwise), and the
+  DNS_PHASES columns split each lookup into its phases.
+- Every DNS row has a categorical `cache` label, miss or hit, built once
+  at ingestion (classify_cache): the one cs740.measure recorded from the
+  answer's TTL, else miss for the first trial of a cold run. Group by it
+  instead of re-deriving cold / warm lookups from trial numbers.
+- `req` files hold one row per navigation / resource timing entry of a
+  page load (written by cs740.pageload and 30_measure_pageload.js), keyed
+  to their page-load row by (ts, mode, site). Times are ms since the
+  navigation started; NaN where the browser didn't expose them.
+- Tables are memoized per directory list, so every caller in a process
+  shares the same in-memory frames. Treat them as read-only.
+- Consolidated tables are persisted by cs740.cache and reused across runs.
+- Files are parsed concurrently in a process pool (CS740_WORKERS, default
+  one per core) once there is enough data to pay for the workers; the
+  typed frames are concatenated once at the end.
+"""
+
+import glob
+import io
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from cs740 import DEFAULT_DIRS
+
+# Per-query phase durations written by cs740.measure (us; connect/tls only on new connections)
+DNS_PHASES = ["connect_us", "tls_us", "write_us", "first_byte_us", "transfer_us"]
+DNS_COLUMNS = (["iso", "mode", "site", "trial", "ms", "status", "us", "handshake_us"] + DNS_PHASES
+               + ["ttl", "cache"])
+WEB_COLUMNS = ["ts", "mode", "site", "ttfb_ms", "dom_ms", "load_ms", "status"]
+
+DNS_DTYPES = {"iso": "string", "site": "category", "trial": "int32",
+              "ms": "Int32", "status": "category", "us": "float64", "handshake_us": "float64",
+              **{p: "float64" for p in DNS_PHASES}, "ttl": "Int32", "cache": "category"}
+WEB_DTYPES = {"ts": "string", "site": "category", "ttfb_ms": "Int32",
+              "dom_ms": "Int32", "load_ms": "Int32", "status": "category"}
+
+REQ_TIMES = ["start_ms", "dns_start_ms", "dns_end_ms", "connect_start_ms",
+             "connect_end_ms", "tls_start_ms", "response_end_ms"]
+REQ_COLUMNS = ["ts", "mode", "site", "entry", "host", "initiator"] + REQ_TIMES
+REQ_DTYPES = {"ts": "string", "site": "category", "entry": "category", "host": "category",
+              "initiator": "category", **{c: "float64" for c in REQ_TIMES}}
+
+SCHEMAS = {"dns": (DNS_COLUMNS, DNS_DTYPES), "web": (WEB_COLUMNS, WEB_DTYPES),
+           "req": (REQ_COLUMNS, REQ_DTYPES)}
+
+# Worker processes for parsing; below PARALLEL_MIN_BYTES of input a pool costs more than it saves
+WORKERS = int(os.environ.get("CS740_WORKERS", 0)) or os.cpu_count() or 1
+PARALLEL_MIN_BYTES = 8 << 20
+
+# Short mode names used by the early data/raw files
+MODE_ALIASES = {"public": "public_udp", "isp": "isp_udp"}
+
+LABEL_COLUMNS = ["cache_state", "popularity"]
+CACHE_STATES = ["cold", "warm"]
+CACHE_LOOKUPS = ["miss", "hit"]
+POPULARITY = ["popular", "unpopular"]
+
+RawFile = namedtuple("RawFile", ["path", "table", "mode", "cache_state", "popularity"])
+Dataset = namedtuple("Dataset", list(SCHEMAS))
+
+
+# ---------------------------
+# Filename conventions
+# ---------------------------
+def parse_filename(fname):
+    """Return a RawFile for a raw measurement CSV, or None if the name doesn't match."""
+    base = os.path.basename(fname).lower()
+    if not base.endswith(".csv"):
+        return None
+    parts = base[:-len(".csv")].split('_')
+
+    unpopular = "unpop" in os.path.basename(os.path.dirname(fname)).lower()
+    if parts[-1] == "unpopular":
+        unpopular = True
+        parts = parts[:-1]
+
+    # Files without a cold/warm suffix were always treated as cold
+    cache_state = "cold"
+    if parts and parts[-1] in CACHE_STATES:
+        cache_state = parts.pop()
+
+    tables = [i for i, p in enumerate(parts) if p in SCHEMAS]
+    if len(tables) != 1:
+        return None
+    i = tables[0]
+    if i == 0:
+        mode = '_'.join(parts[1:])
+    elif i == len(parts) - 1:
+        mode = '_'.join(parts[:i])
+    else:
+        return None
+    if not mode:
+        return None
+
+    return RawFile(fname, parts[i], MODE_ALIASES.get(mode, mode), cache_state,
+                   "unpopular" if unpopular else "popular")
+
+
+def parse_site_filename(fname):
+    """(RawFile, site) for a per-site file {site}_{mode}_{cold|warm}.csv in a dns/web/req
+    directory (data/raw/dns/apache.org_doh_cold.csv), or None."""
+    table = os.path.basename(os.path.dirname(os.path.abspath(fname))).lower()
+    base = os.path.basename(fname).lower()
+    if table not in SCHEMAS or not base.endswith(".csv"):
+        return None
+    parts = base[:-len(".csv")].split('_')
+    if len(parts) < 3 or parts[-1] not in CACHE_STATES:
+        return None
+    site, mode = parts[0], '_'.join(parts[1:-1])
+    unpopular = "unpop" in os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(fname)))).lower()
+    raw = RawFile(fname, table, MODE_ALIASES.get(mode, mode), parts[-1],
+                  "unpopular" if unpopular else "popular")
+    return raw, site
+
+
+def mode_from_filename(fname):
+    raw = parse_filename(fname)
+    return raw.mode if raw else None
+
+
+def kind_from_filename(fname):
+    raw = parse_filename(fname)
+    return raw.cache_state if raw else None
+
+
+def discover(dirs=DEFAULT_DIRS):
+    """List every recognised raw CSV directly under the given directories."""
+    found = []
+    for d in dirs:
+        for f in sorted(glob.glob(os.path.join(d, "*.csv"))):
+            raw = parse_filename(f)
+            if raw is not None:
+                found.append(raw)
+    return found
+
+
+# ---------------------------
+# Parsing
+# ---------------------------
+def _schema(table):
+    return SCHEMAS[table]
+
+
+def _layout(first_line, table):
+    """read_csv names/usecols/dtype for a file whose first line is first_line (bytes).
+
+    Older files lack trailing columns added since (they are filled in by
+    _complete), and rows may carry extra trailing columns written by newer
+    measurement code, which get placeholder names and are not read.
+    """
+    columns, dtypes = _schema(table)
+    n = first_line.count(b",") + 1
+    names = columns[:n] + [f"_extra{i}" for i in range(n - len(columns))]
+    dtype = {c: t for c, t in dtypes.items() if c in names}
+    return dict(names=names, usecols=list(dtype), dtype=dtype)
+
+
+def _complete(df, table):
+    """Add columns missing from older files and derive `us` from `ms` where it wasn't recorded."""
+    for col, t in _schema(table)[1].items():
+        if col not in df.columns:
+            df[col] = pd.Series(np.nan if t == "float64" else pd.NA, index=df.index, dtype=t)
+    if table == "dns":
+        # dig only reports whole milliseconds
+        df["us"] = df["us"].fillna(df["ms"].astype("float64") * 1000)
+    return df
+
+
+def read_raw(raw, data=None):
+    """Parse one raw CSV into a typed frame (mode and labels are added by load_dataset).
+
+    data may hold the file's bytes (or just an appended tail of complete
+    rows) when the caller has already read them.
+    """
+    dtypes = _schema(raw.table)[1]
+    if data is None:
+        with open(raw.path, "rb") as f:
+            data = f.read()
+    if not data.strip():
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in dtypes.items()})
+    # data rows start with an ISO timestamp; anything else is a header line
+    header = None if data[:1].isdigit() else 0
+    end = data.find(b"\n")
+    layout = _layout(data[:end if end >= 0 else len(data)].rstrip(b"\r"), raw.table)
+    return _complete(pd.read_csv(io.BytesIO(data), header=header, **layout), raw.table)
+
+
+def iter_raw(raw, chunksize=100_000):
+    """Yield typed frames of at most chunksize rows from one raw CSV, in bounded memory."""
+    with open(raw.path, "rb") as f:
+        first = f.readline()
+        if not first:
+            return
+        f.seek(0)
+        layout = _layout(first.rstrip(b"\r\n"), raw.table)
+        for chunk in pd.read_csv(f, header=None if first[:1].isdigit() else 0,
+                                 chunksize=chunksize, **layout):
+            yield _complete(chunk, raw.table)
+
+
+def iter_chunks(dirs=DEFAULT_DIRS, table="dns", chunksize=100_000):
+    """Yield labelled chunks (mode, cache_state, popularity added) of every raw file of table."""
+    for raw in discover(dirs):
+        if raw.table != table:
+            continue
+        for chunk in iter_raw(raw, chunksize):
+            chunk["mode"] = raw.mode
+            chunk["cache_state"] = raw.cache_state
+            chunk["popularity"] = raw.popularity
+            if table == "dns":
+                classify_cache(chunk)
+            yield _normalize_status(chunk)
+
+
+def _normalize_status(df):
+    if "status" not in df.columns:
+        return df
+    status = df["status"].cat.categories.str.strip().str.lower()
+    if status.is_unique:
+        df["status"] = df["status"].cat.rename_categories(status)
+    return df
+
+
+def classify_cache(dns):
+    """Fill dns's `cache` column (categorical miss / hit) in place, once per row.
+
+    Rows measured by cs740.measure keep the label it recorded from the
+    answer's TTL; the rest (dig-era rows, unknown labels) count as a miss
+    on the first trial of a cold run and a hit otherwise.
+    """
+    codes = pd.Categorical(dns["cache"], CACHE_LOOKUPS).codes.copy()
+    unknown = codes < 0
+    first_cold = (dns["cache_state"].to_numpy() == "cold") & (dns["trial"].to_numpy() == 1)
+    codes[unknown] = np.where(first_cold[unknown], 0, 1)
+    dns["cache"] = pd.Categorical.from_codes(codes, CACHE_LOOKUPS)
+    return dns
+
+
+def precise_ms(dns, drop_unresolved=True):
+    """dns with `ms` replaced by the float latency in milliseconds taken from `us`.
+
+    dig-era rows only know whole milliseconds, so their 0 ms lookups say
+    nothing about the latency; drop_unresolved removes them, and
+    drop_unresolved="cold" only from cold runs (a warm 0 ms lookup was
+    answered from cache in under a millisecond). Rows measured by
+    cs740.measure are never 0 and are always kept.
+    """
+    if drop_unresolved == "cold":
+        dns = dns[(dns["cache_state"] == "warm") | (dns["us"] != 0)]
+    elif drop_unresolved:
+        dns = dns[dns["us"] != 0]
+    return dns.assign(ms=dns["us"] / 1000)
+
+
+def concat_frames(table, frames):
+    """Concatenate typed frames, unioning categoricals instead of degrading them to object."""
+    columns, dtypes = _schema(table)
+    if not frames:
+        frames = [pd.DataFrame({c: pd.Series(dtype=t) for c, t in dtypes.items()})]
+    cat_cols = [c for c, t in dtypes.items() if t == "category"]
+    filled = [f for f in frames if len(f)] or frames[:1]
+    # a column missing from a file (or blank throughout it) has no categories,
+    # typed float rather than string, which union_categoricals refuses to mix
+    cats = {c: union_categoricals([f[c].cat.set_categories(f[c].cat.categories.astype(str))
+                                   for f in filled], sort_categories=True)
+            for c in cat_cols}
+    df = pd.concat([f.drop(columns=cat_cols) for f in frames], ignore_index=True)
+    for col, values in cats.items():
+        df[col] = values
+    return df[[c for c in columns if c in df.columns]]
+
+
+def parallel_map(func, args, workers=None, nbytes=None):
+    """[func(*a) for a in args], spread over a process pool when worthwhile.
+
+    nbytes is the amount of input behind args; small jobs stay serial.
+    """
+    workers = min(workers or WORKERS, len(args))
+    if workers <= 1 or (nbytes is not None and nbytes < PARALLEL_MIN_BYTES):
+        return [func(*a) for a in args]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, *zip(*args), chunksize=max(1, len(args) // (workers * 4))))
+
+
+def read_all(raws, workers=None):
+    """Parse every raw file, in parallel when worthwhile; frames come back in raws order."""
+    nbytes = sum(os.path.getsize(r.path) for r in raws)
+    return parallel_map(read_raw, [(r,) for r in raws], workers, nbytes)
+
+
+def _label_column(values, lengths, categories):
+    """Categorical column holding one constant label per source file."""
+    codes = np.repeat([categories.index(v) for v in values], lengths).astype(np.int8)
+    return pd.Categorical.from_codes(codes, categories)
+
+
+def consolidate(table, raws, frames):
+    """Concatenate per-file frames (as returned by read_raw) into one labelled table."""
+    columns = _schema(table)[0]
+    df = concat_frames(table, frames)
+    lengths = [len(f) for f in frames] if raws else []
+    df["mode"] = _label_column([r.mode for r in raws], lengths, sorted({r.mode for r in raws}))
+    df["cache_state"] = _label_column([r.cache_state for r in raws], lengths, CACHE_STATES)
+    df["popularity"] = _label_column([r.popularity for r in raws], lengths, POPULARITY)
+    if table == "dns":
+        classify_cache(df)
+    return _normalize_status(df)[columns + LABEL_COLUMNS]
+
+
+@lru_cache(maxsize=None)
+def _load(dirs, cache, workers):
+    from cs740.cache import TableCache
+
+    found = discover(dirs)
+    store = TableCache(dirs) if cache and TableCache.available() else None
+    tables = {}
+    for table in SCHEMAS:
+        raws = [r for r in found if r.table == table]
+        if store is not None:
+            tables[table] = store.load(table, raws, workers)
+        else:
+            tables[table] = consolidate(table, raws, read_all(raws, workers))
+    return Dataset(**tables)
+
+
+def load_dataset(dirs=DEFAULT_DIRS, cache=True, workers=None):
+    """Return Dataset(dns, web, req) for all raw files under dirs (parsed once per process).
+
+    With cache=True the consolidated tables are also persisted on disk
+    (see cs740.cache), so later runs only re-parse raw files that changed.
+    workers overrides the size of the parsing pool (1 = serial).
+    """
+    if isinstance(dirs, str):
+        dirs = [dirs]
+    return _load(tuple(os.path.normpath(d) for d in dirs), cache, workers)
+
+
+def load_dns(dirs=DEFAULT_DIRS, cache=True, workers=None):
+    return load_dataset(dirs, cache, workers).dns
+
+
+def load_web(dirs=DEFAULT_DIRS, cache=True, workers=None):
+    return load_dataset(dirs, cache, workers).web
+
+
+def load_req(dirs=DEFAULT_DIRS, cache=True, workers=None):
+    return load_dataset(dirs, cache, workers).req
@@ -0,0 +1,590 @@
+"""
+Asyncio DNS measurement engine — Python replacement for the dig loop in
+scripts/20_measure_dns.sh.
+
+- Sends the queries itself over UDP, TCP, DNS-over-TLS or DNS-over-HTTPS
+  and times them with the monotonic nanosecond clock, so no process spawn
+  lands inside (or between) the timed regions.
+- Stream transports keep a pool of open connections and reuse them across
+  queries (reuse=False / --new-connection opens one per query). The time
+  spent setting up a connection (TCP connect + TLS handshake) is reported
+  in `handshake_us`, separately from the query time in `ms` / `us`.
+- Runs many sites concurrently, capped at max_in_flight outstanding
+  queries; the trials of one site stay sequential so trial 1 is still the
+  cold lookup. A cold trial that flushes holds every slot while it flushes
+  and queries, so no other site's lookup sees the flush.
+- Splits every lookup into phases (TCP connect, TLS handshake, request
+  write, wait for the first reply byte, rest of the reply) so encrypted
+  DNS time can be broken down.
+- Appends rows in the 20_measure_dns.sh schema (iso,mode,site,trial,ms,status)
+  plus `us` (the latency in microseconds), `handshake_us`, one
+  `<phase>_us` column per phase, the answer's `ttl` and whether the
+  resolver answered from its `cache` (hit / miss, see CacheTracker).
+- --adaptive replaces the fixed trial count: each site is measured until
+  the bootstrap CI of its median is narrow enough (cs740.adaptive), and
+  why it stopped goes to a `_stops` file next to --out.
+
+Usage:
+    python3 -m cs740.measure --mode public_udp --resolver 8.8.8.8 \\
+        --out data/raw/public_udp_dns_cold.csv --trials 10 --sites-file config/sites.txt
+    python3 -m cs740.measure --mode dot --transport dot --resolver 1.1.1.1 \\
+        --tls-name cloudflare-dns.com --out data/raw/dot_dns_warm.csv --sites-file config/sites.txt
+    python3 -m cs740.measure --mode doh --transport doh \\
+        --resolver https://cloudflare-dns.com/dns-query --out data/raw/doh_dns_warm.csv ...
+    COLD=1 FLUSH_CMD='sudo unbound-control flush %s' python3 -m cs740.measure ...
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import os
+import ssl
+import struct
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from cs740.dnswire import (DEFAULT_PORTS, DOH_PATH, FLAG_AA, DNSFormatError, build_query, parse_resolver,
+                           parse_response, qname_from_site)
+
+# Per-query phases, in order: TCP connect and TLS handshake (new connections
+# only), request write, wait for the first reply byte, rest of the reply
+PHASES = ["connect", "tls", "write", "first_byte", "transfer"]
+DNS_HEADER = (["iso", "mode", "site", "trial", "ms", "status", "us", "handshake_us"]
+              + [f"{p}_us" for p in PHASES] + ["ttl", "cache"])
+DEFAULT_TIMEOUT = 5.0          # dig +time=5
+DEFAULT_MAX_IN_FLIGHT = 32
+FLUSH_SETTLE = 0.3             # same pause as flush() in 20_measure_dns.sh
+
+# Stub resolvers restarted on cold runs so their caches are empty too. Only
+# for the 20_measure_dns.sh setup, where DoT / DoH go through a local stub
+# queried over plain DNS (see stub_restart)
+STUB_RESTART = {"dot": "sudo systemctl restart stubby",
+                "doh": "sudo systemctl restart cloudflared"}
+
+Row = namedtuple("Row", DNS_HEADER)
+# ns durations of one lookup: total query time (= write + first_byte + transfer)
+# and its phases; connect / tls are None when no connection was opened
+Timing = namedtuple("Timing", ["total"] + PHASES)
+
+
+class HTTPStatusError(Exception):
+    pass
+
+
+def isodate():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def stub_restart(mode, transport="udp", resolver="127.0.0.1"):
+    """Command restarting the local stub resolver behind mode, or None if there is none.
+
+    Only a DoT / DoH mode reached over plain UDP / TCP on a loopback address
+    goes through a stub (stubby, cloudflared); measuring the dot / doh
+    transports directly, or any remote resolver, has nothing to restart.
+    """
+    if mode not in STUB_RESTART or transport not in ("udp", "tcp"):
+        return None
+    host = parse_resolver(resolver, transport)[0]
+    try:
+        local = ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        local = host == "localhost"
+    return STUB_RESTART[mode] if local else None
+
+
+def tls_context(cafile=None, insecure=False):
+    """Client TLS context; cafile trusts e.g. a local stand-in's certificate."""
+    ctx = ssl.create_default_context(cafile=cafile)
+    if insecure:
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+
+# ---------------------------
+# UDP
+# ---------------------------
+class _UDPReply(asyncio.DatagramProtocol):
+    def __init__(self, qid, done):
+        self.qid = qid
+        self.done = done
+
+    def datagram_received(self, data, addr):
+        # stamp arrival before anything else; ignore stray datagrams
+        now = time.perf_counter_ns()
+        if not self.done.done() and data[:2] == struct.pack(">H", self.qid):
+            self.done.set_result((now, data))
+
+    def error_received(self, exc):
+        if not self.done.done():
+            self.done.set_exception(exc)
+
+
+async def exchange_udp(host, port, wire, qid, timeout=DEFAULT_TIMEOUT):
+    """Send wire in one datagram; return (reply, write_ns, first_byte_ns, end_ns) relative to the send."""
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(lambda: _UDPReply(qid, done),
+                                                       remote_addr=(host, port))
+    try:
+        start = time.perf_counter_ns()
+        transport.sendto(wire)
+        wrote = time.perf_counter_ns()
+        end, data = await asyncio.wait_for(done, timeout)
+    finally:
+        transport.close()
+    # a datagram arrives whole: its first byte is its last
+    return data, wrote - start, end - start, end - start
+
+
+async def query_udp(host, port, name, qtype="A", timeout=DEFAULT_TIMEOUT):
+    """Return (latency_ns, Response) for one query over UDP."""
+    qid, wire = build_query(name, qtype)
+    data, _, _, ns = await exchange_udp(host, port, wire, qid, timeout)
+    return ns, parse_response(data, qid)
+
+
+class UDPClient:
+    """Resolver reached over UDP: one socket per query, nothing to set up."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+
+    async def query(self, name, qtype="A", timeout=DEFAULT_TIMEOUT):
+        """Return (Timing, Response) for one lookup."""
+        qid, wire = build_query(name, qtype)
+        data, wrote, first, end = await exchange_udp(self.host, self.port, wire, qid, timeout)
+        return Timing(end, None, None, wrote, first - wrote, end - first), parse_response(data, qid)
+
+    async def close(self):
+        pass
+
+
+# ---------------------------
+# TCP / DoT / DoH
+# ---------------------------
+class Connection:
+    """An open TCP or TLS connection and how long its TCP connect / TLS handshake took."""
+
+    def __init__(self, reader, writer, connect_ns, tls_ns=None):
+        self.reader, self.writer = reader, writer
+        self.connect_ns, self.tls_ns = connect_ns, tls_ns
+        self.reusable = True
+
+    def close(self):
+        self.writer.close()
+
+
+async def exchange_stream(conn, wire):
+    """One query/response over TCP or DoT: 2-byte length prefix each way (RFC 7766).
+
+    Returns (reply, write_done_ns, first_byte_ns) with perf_counter_ns stamps.
+    """
+    conn.writer.write(struct.pack(">H", len(wire)) + wire)
+    await conn.writer.drain()
+    wrote = time.perf_counter_ns()
+    head = await conn.reader.readexactly(1)
+    first = time.perf_counter_ns()
+    (length,) = struct.unpack(">H", head + await conn.reader.readexactly(1))
+    return await conn.reader.readexactly(length), wrote, first
+
+
+async def exchange_doh(conn, wire, host, path=DOH_PATH):
+    """One POST of an application/dns-message (RFC 8484) over HTTP/1.1 keep-alive.
+
+    Returns (reply, write_done_ns, first_byte_ns) like exchange_stream().
+    """
+    conn.writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+                       "Content-Type: application/dns-message\r\n"
+                       "Accept: application/dns-message\r\n"
+                       f"Content-Length: {len(wire)}\r\n\r\n").encode() + wire)
+    await conn.writer.drain()
+    wrote = time.perf_counter_ns()
+    head = await conn.reader.readexactly(1)
+    first = time.perf_counter_ns()
+    status = (head + await conn.reader.readuntil(b"\r\n")).split(None, 2)
+    headers = {}
+    while (line := await conn.reader.readuntil(b"\r\n")) != b"\r\n":
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    body = await conn.reader.readexactly(int(headers.get("content-length", 0)))
+    if headers.get("connection", "").lower() == "close":
+        conn.reusable = False
+    if len(status) < 2 or status[1] != b"200":
+        raise HTTPStatusError(b" ".join(status[1:]).decode("latin-1").strip())
+    return body, wrote, first
+
+
+class StreamClient:
+    """Resolver reached over TCP, DoT or DoH through a pool of reusable connections.
+
+    Concurrent queries each take an idle connection or open a new one, so
+    the pool grows to the number of queries in flight. With reuse=False
+    every query opens (and closes) its own connection.
+    """
+
+    def __init__(self, host, port, transport="tcp", reuse=True, path=DOH_PATH,
+                 ssl_context=None, server_hostname=None):
+        self.host, self.port, self.path = host, port, path
+        self.transport = transport
+        self.reuse = reuse
+        self.tls = None
+        if transport in ("dot", "doh"):
+            self.tls = ssl_context or tls_context()
+        self.server_hostname = server_hostname or host
+        self.idle = []
+
+    async def connect(self):
+        """Open a connection, timing the TCP connect and the TLS handshake apart."""
+        start = time.perf_counter_ns()
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        connected = time.perf_counter_ns()
+        if self.tls is None:
+            return Connection(reader, writer, connected - start)
+        try:
+            await writer.start_tls(self.tls, server_hostname=self.server_hostname)
+        except BaseException:
+            writer.close()
+            raise
+        return Connection(reader, writer, connected - start, time.perf_counter_ns() - connected)
+
+    async def _exchange(self, conn, wire):
+        start = time.perf_counter_ns()
+        if self.transport == "doh":
+            data, wrote, first = await exchange_doh(conn, wire, self.server_hostname, self.path)
+        else:
+            data, wrote, first = await exchange_stream(conn, wire)
+        end = time.perf_counter_ns()
+        return data, end - start, wrote - start, first - wrote, end - first
+
+    async def _query(self, wire):
+        if self.idle:
+            conn = self.idle.pop()
+            try:
+                data, *exchange = await self._exchange(conn, wire)
+                return conn, data, Timing(exchange[0], None, None, *exchange[1:])
+            except (OSError, EOFError):
+                # the server dropped the idle connection; retry on a new one
+                conn.close()
+            except BaseException:
+                # timed out or cancelled mid-exchange: the connection is out of sync
+                conn.close()
+                raise
+        conn = await self.connect()
+        try:
+            data, *exchange = await self._exchange(conn, wire)
+        except BaseException:
+            conn.close()
+            raise
+        return conn, data, Timing(exchange[0], conn.connect_ns, conn.tls_ns, *exchange[1:])
+
+    async def query(self, name, qtype="A", timeout=DEFAULT_TIMEOUT):
+        """Return (Timing, Response) for one lookup; connect/tls are None on a reused connection."""
+        # DoH uses id 0 so that answers stay HTTP-cacheable (RFC 8484 section 4.1)
+        qid, wire = build_query(name, qtype, qid=0 if self.transport == "doh" else None)
+        conn, data, timing = await asyncio.wait_for(self._query(wire), timeout)
+        if self.reuse and conn.reusable:
+            self.idle.append(conn)
+        else:
+            conn.close()
+        return timing, parse_response(data, qid)
+
+    async def close(self):
+        while self.idle:
+            self.idle.pop().close()
+
+
+async def query_tcp(host, port, name, qtype="A", timeout=DEFAULT_TIMEOUT):
+    """Return (latency_ns, Response) for one query over a fresh TCP connection, connect included."""
+    timing, response = await StreamClient(host, port, reuse=False).query(name, qtype, timeout)
+    return timing.connect + timing.total, response
+
+
+def make_client(resolver, transport="udp", reuse=True, ssl_context=None, server_hostname=None):
+    """Client for resolver over transport (udp, tcp, dot or doh)."""
+    if transport not in DEFAULT_PORTS:
+        raise ValueError(f"unknown transport {transport!r}")
+    host, port, path = parse_resolver(resolver, transport)
+    if transport == "udp":
+        return UDPClient(host, port)
+    return StreamClient(host, port, transport, reuse, path, ssl_context, server_hostname)
+
+
+# ---------------------------
+# Cache state
+# ---------------------------
+class CacheTracker:
+    """Labels each answer of one resolver a cache hit or miss from the TTLs it returns.
+
+    A resolver answering from its cache counts the record's TTL down from
+    what it fetched; a fresh fetch starts again from the full TTL. Per name
+    the tracker keeps the last TTL, when it arrived and the largest TTL seen
+    so far. An answer (allowing 1 s for rounding) is a
+      miss  when authoritative (AA set), when its TTL is above where the
+            last one would have counted down to, or after a flush;
+      hit   when its TTL is below the full TTL seen before (even after a
+            flush: some cache the flush did not reach answered), or
+            consistent with the last answer's countdown;
+      NA    for answers without records and the first answer of a name
+            that was not flushed.
+    """
+
+    def __init__(self):
+        self.seen = {}      # name -> (ttl, monotonic ns, largest ttl)
+
+    def observe(self, name, response, flushed=False, now_ns=None):
+        """Record response's TTL for name and return its label."""
+        if not response.ttls:
+            return "NA"
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        ttl = min(response.ttls)
+        last = self.seen.get(name)
+        self.seen[name] = (ttl, now_ns, ttl if last is None else max(ttl, last[2]))
+        if response.flags & FLAG_AA:
+            return "miss"
+        if last is not None:
+            last_ttl, last_ns, full = last
+            if ttl > last_ttl - (now_ns - last_ns) / 1e9 + 1:
+                return "miss"
+            if ttl < full - 1:
+                return "hit"
+        if flushed:
+            return "miss"
+        return "NA" if last is None else "hit"
+
+
+# ---------------------------
+# Trials
+# ---------------------------
+class ResolverSlots:
+    """At most `size` queries at once against one resolver; exclusive() takes all of them."""
+
+    def __init__(self, size):
+        self.size = size
+        self._slots = asyncio.Semaphore(size)
+        self._exclusive = asyncio.Lock()
+
+    async def acquire(self, exclusive=False):
+        if not exclusive:
+            await self._slots.acquire()
+            return 1
+        async with self._exclusive:
+            for _ in range(self.size):
+                await self._slots.acquire()
+        return self.size
+
+    def release(self, taken):
+        for _ in range(taken):
+            self._slots.release()
+
+
+def _us(ns):
+    return "NA" if ns is None else f"{ns / 1e3:.1f}"
+
+
+async def measure_trial(client, site, trial, mode, timeout=DEFAULT_TIMEOUT, tracker=None, flushed=False):
+    """Time one lookup of site and return it as a Row.
+
+    With a CacheTracker, the answer is labelled a cache hit or miss
+    (flushed: the resolver's cache was flushed right before).
+    """
+    iso = isodate()
+    failed = ("NA",) * (len(DNS_HEADER) - 6)
+    name = qname_from_site(site)
+    try:
+        timing, response = await client.query(name, timeout=timeout)
+    except ssl.SSLError:
+        return Row(iso, mode, site, trial, "NA", "tls_error", *failed)
+    except (asyncio.TimeoutError, OSError, EOFError):
+        return Row(iso, mode, site, trial, "NA", "no_response", *failed)
+    except HTTPStatusError:
+        return Row(iso, mode, site, trial, "NA", "http_error", *failed)
+    except (DNSFormatError, ValueError):
+        return Row(iso, mode, site, trial, "NA", "bad_parse", *failed)
+    handshake = None
+    if timing.connect is not None:
+        handshake = timing.connect + (timing.tls or 0)
+    ttl = min(response.ttls) if response.ttls else "NA"
+    cache = tracker.observe(name, response, flushed) if tracker else "NA"
+    return Row(iso, mode, site, trial, round(timing.total / 1e6), "ok", _us(timing.total),
+               _us(handshake), *map(_us, timing[1:]), ttl, cache)
+
+
+async def flush(flush_cmd, site, restart=None):
+    """Run FLUSH_CMD (with %s -> site) and then restart (see stub_restart), as 20_measure_dns.sh does.
+
+    Returns whether there was anything to run.
+    """
+    cmds = []
+    if flush_cmd:
+        cmds.append(flush_cmd % site if "%s" in flush_cmd else flush_cmd)
+    if restart:
+        cmds.append(restart)
+    for cmd in cmds:
+        proc = await asyncio.create_subprocess_shell(cmd, stdout=asyncio.subprocess.DEVNULL,
+                                                     stderr=asyncio.subprocess.DEVNULL)
+        await proc.wait()
+    if cmds:
+        await asyncio.sleep(FLUSH_SETTLE)
+    return bool(cmds)
+
+
+class RowWriter:
+    """Append rows to a raw DNS CSV (or another header's CSV), writing the header for new files.
+
+    Files that already hold an older (shorter) header keep getting those
+    columns only, so every line of a file has the same shape. A half-written
+    last line (an interrupted run) is dropped before the first new row. Headerless
+    files (their first line is a row, as in data/raw/dns_dot_*.csv) get as
+    many of header's columns as that row has, which is how cs740.loader
+    reads them.
+    """
+
+    def __init__(self, path, header=DNS_HEADER):
+        self.path = path
+        self.columns = header
+        if path and os.path.exists(path) and os.path.getsize(path):
+            with open(path) as f:
+                first = f.readline().strip()
+            self.columns = header[:first.count(",") + 1] if first[:1].isdigit() else first.split(",")
+        self.f = None
+
+    def __enter__(self):
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path):
+                with open(self.path, "rb+") as f:
+                    data = f.read()
+                    if data and not data.endswith(b"\n"):
+                        f.truncate(data.rfind(b"\n") + 1)
+            new = not os.path.exists(self.path) or not os.path.getsize(self.path)
+            self.f = open(self.path, "a", buffering=1)
+            if new:
+                self.f.write(",".join(self.columns) + "\n")
+        return self
+
+    def write(self, row):
+        if self.f:
+            values = row._asdict()
+            self.f.write(",".join(str(values.get(c, "NA")) for c in self.columns) + "\n")
+
+    def __exit__(self, *exc):
+        if self.f:
+            self.f.close()
+
+
+def latency_ms(row):
+    """Query time of a Row in ms (from `us`), NaN if the lookup failed."""
+    return float(row.us) / 1e3 if row.status == "ok" and row.us != "NA" else float("nan")
+
+
+async def run(sites, resolver, mode, out=None, trials=5, transport="udp", reuse=True,
+              max_in_flight=DEFAULT_MAX_IN_FLIGHT, timeout=DEFAULT_TIMEOUT,
+              cold=False, flush_cmd=None, ssl_context=None, server_hostname=None, stop_rule=None):
+    """Measure every site concurrently; returns the rows and appends them to out.
+
+    With a StopRule, each site gets between stop_rule.min_trials and
+    max_trials trials (`trials` is ignored) and its stop is logged to
+    stops_path(out).
+    """
+    client = make_client(resolver, transport, reuse, ssl_context, server_hostname)
+    tracker = CacheTracker()
+    slots = ResolverSlots(max_in_flight)
+    restart = stub_restart(mode, transport, resolver)
+    needs_flush = cold and bool(flush_cmd or restart)
+    rows = []
+    max_trials = stop_rule.max_trials if stop_rule else trials
+    stops_out = stop_header = None
+    if out and stop_rule:
+        # cs740.adaptive pulls in pandas; only adaptive runs pay for it
+        from cs740.adaptive import STOP_HEADER, stops_path
+        stops_out, stop_header = stops_path(out), STOP_HEADER
+
+    with RowWriter(out) as writer, RowWriter(stops_out, stop_header) as stops:
+        async def one_site(site):
+            latencies = []
+            for trial in range(1, max_trials + 1):
+                # a flush (and the stub restart) must not land under other sites' queries
+                taken = await slots.acquire(exclusive=needs_flush)
+                try:
+                    flushed = needs_flush and await flush(flush_cmd, site, restart)
+                    row = await measure_trial(client, site, trial, mode, timeout, tracker, flushed)
+                finally:
+                    slots.release(taken)
+                writer.write(row)
+                rows.append(row)
+                if stop_rule:
+                    latencies.append(latency_ms(row))
+                    stop = stop_rule.stop(isodate(), mode, site, trial, latencies)
+                    if stop:
+                        stops.write(stop)
+                        break
+
+        try:
+            await asyncio.gather(*(one_site(site) for site in sites))
+        finally:
+            await client.close()
+    return rows
+
+
+def measure(sites, resolver, mode, out=None, **kwargs):
+    """Synchronous wrapper around run()."""
+    return asyncio.run(run(sites, resolver, mode, out, **kwargs))
+
+
+def read_sites(path):
+    with open(path, encoding="utf-8") as f:
+        return [ln.strip() for ln in f if ln.strip()]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Time DNS lookups without spawning dig per trial.")
+    ap.add_argument("sites", nargs="*", help="sites to resolve (or use --sites-file)")
+    ap.add_argument("--sites-file")
+    ap.add_argument("--resolver", default="127.0.0.1",
+                    help="host[#port] as in 20_measure_dns.sh, or https://host/path for DoH")
+    ap.add_argument("--mode", required=True)
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--trials", type=int, default=5, help="trials per site (minimum with --adaptive)")
+    ap.add_argument("--adaptive", action="store_true",
+                    help="keep adding trials until the median's bootstrap CI is narrow enough")
+    ap.add_argument("--max-trials", type=int, help="trial budget per site with --adaptive")
+    ap.add_argument("--ci-width", type=float,
+                    help="target 95%% CI width of the median, ms (default: cs740.adaptive's)")
+    ap.add_argument("--ci-rel", type=float, help="or target width as a fraction of the median")
+    ap.add_argument("--transport", choices=sorted(DEFAULT_PORTS), default="udp")
+    ap.add_argument("--new-connection", action="store_true",
+                    help="open a fresh TCP/TLS connection per query instead of reusing pooled ones")
+    ap.add_argument("--tls-name", help="TLS server name to verify (default: resolver host)")
+    ap.add_argument("--cafile", help="CA bundle to trust, e.g. a local stand-in's certificate")
+    ap.add_argument("--insecure", action="store_true", help="skip TLS certificate verification")
+    ap.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT)
+    ap.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    args = ap.parse_args(argv)
+
+    sites = args.sites + (read_sites(args.sites_file) if args.sites_file else [])
+    if not sites:
+        ap.error("no sites given")
+    tls = tls_context(args.cafile, args.insecure) if args.transport in ("dot", "doh") else None
+    stop_rule = None
+    if args.adaptive:
+        from cs740.adaptive import DEFAULT_CI_WIDTH_MS, DEFAULT_MAX_TRIALS, StopRule
+        try:
+            stop_rule = StopRule(args.trials,
+                                 DEFAULT_MAX_TRIALS if args.max_trials is None else args.max_trials,
+                                 DEFAULT_CI_WIDTH_MS if args.ci_width is None else args.ci_width,
+                                 args.ci_rel)
+        except ValueError as e:
+            ap.error(str(e))
+    rows = measure(sites, args.resolver, args.mode, args.out, trials=args.trials,
+                   transport=args.transport, reuse=not args.new_connection,
+                   max_in_flight=args.max_in_flight, timeout=args.timeout,
+                   cold=os.environ.get("COLD") == "1", flush_cmd=os.environ.get("FLUSH_CMD"),
+                   ssl_context=tls, server_hostname=args.tls_name, stop_rule=stop_rule)
+    ok = sum(r.status == "ok" for r in rows)
+    print(f"[{args.mode}] {ok}/{len(rows)} ok -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+DNS time per page load, from the per-request (`req`) timing table.
+
+- Every navigation / resource entry whose domainLookupEnd is after its
+  domainLookupStart is one DNS lookup made by the browser for that page.
+- total_dns_ms adds those lookups up; critical_dns_ms is the wall-clock
+  time during which at least one of them was outstanding (the union of
+  their intervals), i.e. how much of the page load was spent waiting on
+  DNS once parallel lookups are accounted for.
+- Resources fetched over a reused connection, from the browser cache, or
+  cross-origin without Timing-Allow-Origin expose no DNS timing and count
+  as no lookup.
+"""
+
+import pandas as pd
+
+PAGE_KEYS = ["ts", "mode", "site"]
+PAGE_DNS_COLS = ["total_dns_ms", "critical_dns_ms", "dns_share_pct"]
+
+
+def page_dns(req, keys=PAGE_KEYS):
+    """One row per page load: requests, lookups, nav_dns_ms, total_dns_ms, critical_dns_ms."""
+    keys = [k for k in keys + ["cache_state", "popularity"] if k in req.columns]
+    dns_ms = (req["dns_end_ms"] - req["dns_start_ms"]).clip(lower=0).fillna(0)
+    is_nav = req["entry"] == "navigation"
+    pages = req[keys].assign(requests=1, lookups=(dns_ms > 0).astype(int),
+                             nav_dns_ms=dns_ms.where(is_nav, 0), total_dns_ms=dns_ms)
+    pages = pages.groupby(keys, observed=True).sum().reset_index()
+
+    # union of the lookup intervals of each page: sort by start and only count
+    # the part of each interval past the furthest end seen so far
+    lookups = req.loc[dns_ms > 0, keys + ["dns_start_ms", "dns_end_ms"]].sort_values(keys + ["dns_start_ms"])
+    groups = [lookups[k] for k in keys]
+    reach = lookups.groupby(groups, observed=True)["dns_end_ms"].cummax()
+    prev = reach.groupby(groups, observed=True).shift()
+    start = lookups["dns_start_ms"].where(prev.isna(), lookups["dns_start_ms"].clip(lower=prev))
+    critical = (lookups["dns_end_ms"] - start).clip(lower=0).groupby(groups, observed=True).sum()
+
+    pages = pages.merge(critical.rename("critical_dns_ms").reset_index(), on=keys, how="left")
+    pages["critical_dns_ms"] = pages["critical_dns_ms"].fillna(0)
+    return pages
+
+
+def with_load_share(pages, web, keys=PAGE_KEYS):
+    """pages joined to their page-load rows, plus DNS's share (%) of load_ms."""
+    pages = pages.merge(web[keys + ["load_ms"]], on=keys, how="left")
+    load = pages["load_ms"].astype("float64")
+    pages["dns_share_pct"] = pages["critical_dns_ms"] / load.where(load > 0) * 100
+    return pages
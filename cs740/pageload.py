@@ -0,0 +1,264 @@
+"""
+Page-load orchestrator — Python replacement for launching
+scripts/30_measure_pageload.js once per load.
+
+- Keeps a pool of long-lived Chromium processes (Playwright) started with
+  the same flags as the JS script, instead of paying browser startup on
+  every load.
+- Cold loads get a fresh, isolated browser context (empty HTTP cache,
+  connections and host cache); warm loads reuse one context per site that
+  is first warmed up with an unmeasured load, like the warm-up run in
+  40_run_all.sh.
+- Loads many sites in parallel, capped at max_parallel sites at a time
+  spread over the pool; the loads of one site run one after another.
+- Appends rows in the 30_measure_pageload.js schema
+  (ts,mode,site,ttfb_ms,dom_ms,load_ms,status), and the DNS / connect /
+  TLS timings of the navigation and of every resource it fetched to a
+  `req` file next to it ({mode}_req_{state}.csv for {mode}_web_{state}.csv).
+
+Needs the playwright package and its Chromium (`playwright install chromium`);
+CHROME_PATH / PUPPETEER_EXECUTABLE_PATH point it at another binary.
+
+Usage:
+    python3 -m cs740.pageload --mode doh --state cold --out data/raw/doh_web_cold.csv \\
+        --sites-file config/sites.txt --browsers 2 --max-parallel 6
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+from datetime import datetime, timezone
+
+from cs740.measure import read_sites
+
+WEB_HEADER = ["ts", "mode", "site", "ttfb_ms", "dom_ms", "load_ms", "status"]
+REQ_HEADER = ["ts", "mode", "site", "entry", "host", "initiator", "start_ms", "dns_start_ms",
+              "dns_end_ms", "connect_start_ms", "connect_end_ms", "tls_start_ms", "response_end_ms"]
+NAV_TIMEOUT_MS = 45_000        # page.setDefaultNavigationTimeout in 30_measure_pageload.js
+DEFAULT_BROWSERS = 2
+DEFAULT_MAX_PARALLEL = 4
+
+# Same switches as 30_measure_pageload.js: keep Chromium on the system resolver
+CHROME_ARGS = ["--no-sandbox", "--disable-dev-shm-usage",
+               "--disable-features=AsyncDns,DnsOverHttps", "--disable-quic"]
+
+# Navigation timing plus the network timings of the navigation and every
+# resource entry, in ms since navigation start. Zeros mean "not exposed"
+# (cross-origin resources without Timing-Allow-Origin, reused connections)
+# and come back as null.
+NAV_TIMING_JS = """() => {
+  const t = v => (Number.isFinite(v) && v > 0) ? Math.round(v * 10) / 10 : null;
+  const host = u => { try { return new URL(u).host; } catch (e) { return ''; } };
+  const req = (kind, e) => [kind, host(e.name), e.initiatorType || kind, Math.max(0, t(e.startTime) || 0),
+    t(e.domainLookupStart), t(e.domainLookupEnd), t(e.connectStart), t(e.connectEnd),
+    t(e.secureConnectionStart), t(e.responseEnd)];
+  const nav = performance.getEntriesByType('navigation')[0];
+  const resources = performance.getEntriesByType('resource').map(e => req('resource', e));
+  if (nav) return {ttfb: nav.responseStart, dom: nav.domContentLoadedEventEnd, load: nav.loadEventEnd,
+                   requests: [req('navigation', nav), ...resources]};
+  const p = performance.timing;
+  return {ttfb: p.responseStart - p.navigationStart,
+          dom: p.domContentLoadedEventEnd - p.navigationStart,
+          load: p.loadEventEnd - p.navigationStart, requests: resources};
+}"""
+
+
+def iso():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def requests_path(out):
+    """Where the per-request rows of the page-load file out go ('web' token -> 'req')."""
+    head, base = os.path.split(out)
+    stem, ext = os.path.splitext(base)
+    parts = stem.split("_")
+    parts = ["req" if p == "web" else p for p in parts] if "web" in parts else parts + ["req"]
+    return os.path.join(head, "_".join(parts) + ext)
+
+
+def site_url(site):
+    return site if site.startswith("http") else f"https://{site}"
+
+
+def as_int(value):
+    """Whole milliseconds, or NA for a missing / negative timing (asInt() in the JS script)."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return "NA"
+    return round(value) if value >= 0 else "NA"
+
+
+def chrome_path():
+    for var in ("CHROME_PATH", "PUPPETEER_EXECUTABLE_PATH"):
+        path = os.environ.get(var)
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+class BrowserPool:
+    """Long-lived Chromium processes handing out contexts round-robin."""
+
+    def __init__(self, size=DEFAULT_BROWSERS, headless=True, executable_path=None):
+        self.size = size
+        self.headless = headless
+        self.executable_path = executable_path or chrome_path()
+        self.browsers = []
+        self._next = None
+        self._playwright = None
+
+    async def __aenter__(self):
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError as e:
+            raise SystemExit("cs740.pageload needs playwright: pip install playwright && "
+                             "playwright install chromium") from e
+        self._playwright = await async_playwright().start()
+        launch = dict(headless=self.headless, args=CHROME_ARGS)
+        if self.executable_path:
+            launch["executable_path"] = self.executable_path
+        launched = await asyncio.gather(
+            *(self._playwright.chromium.launch(**launch) for _ in range(self.size)),
+            return_exceptions=True)
+        self.browsers = [b for b in launched if not isinstance(b, BaseException)]
+        errors = [b for b in launched if isinstance(b, BaseException)]
+        if errors:
+            await self.__aexit__()
+            raise errors[0]
+        self._next = itertools.cycle(self.browsers)
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.gather(*(b.close() for b in self.browsers), return_exceptions=True)
+        await self._playwright.stop()
+
+    async def new_context(self):
+        """A fresh, isolated context (own cache, cookies, connections) on the next browser."""
+        context = await next(self._next).new_context()
+        context.set_default_navigation_timeout(NAV_TIMEOUT_MS)
+        context.set_default_timeout(NAV_TIMEOUT_MS)
+        return context
+
+
+async def load_page(context, url):
+    """Navigate a new page of context to url and return its NAV_TIMING_JS result."""
+    page = await context.new_page()
+    try:
+        await page.goto(url, wait_until="load")
+        return await page.evaluate(NAV_TIMING_JS)
+    finally:
+        await page.close()
+
+
+def _rows(site, mode, timing=None):
+    """(page-load row, per-request rows) of one load; timing None for a failed load."""
+    ts = iso()
+    if timing is None:
+        return [ts, mode, site, "NA", "NA", "NA", "err"], []
+    row = [ts, mode, site, *(as_int(timing[k]) for k in ("ttfb", "dom", "load")), "ok"]
+    requests = [[ts, mode, site] + ["NA" if v is None else v for v in entry]
+                for entry in timing["requests"]]
+    return row, requests
+
+
+async def measure_site(pool, site, mode, state="cold", loads=1):
+    """(page-load rows, per-request rows) for `loads` loads of site.
+
+    Cold: every load in its own fresh context. Warm: one context kept for
+    the site, warmed up by an unmeasured load, then loaded `loads` times.
+    """
+    url = site_url(site)
+    rows, requests = [], []
+    context = None
+    try:
+        for _ in range(loads):
+            if context is None or state == "cold":
+                if context is not None:
+                    await context.close()
+                context = await pool.new_context()
+                if state == "warm":
+                    try:
+                        await load_page(context, url)
+                    except Exception:
+                        pass  # the warm-up is best effort, like `|| true` in 40_run_all.sh
+            try:
+                row, entries = _rows(site, mode, await load_page(context, url))
+            except Exception as e:
+                print(f"[pageload error] {site}: {e}")
+                row, entries = _rows(site, mode)
+            rows.append(row)
+            requests.extend(entries)
+    finally:
+        if context is not None:
+            await context.close()
+    return rows, requests
+
+
+def _append_csv(path, header):
+    """Line-buffered append handle on path, writing header first if the file is new."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    new = not os.path.exists(path) or not os.path.getsize(path)
+    f = open(path, "a", buffering=1)
+    if new:
+        f.write(",".join(header) + "\n")
+    return f
+
+
+async def run(sites, mode, out=None, state="cold", loads=1, browsers=DEFAULT_BROWSERS,
+              max_parallel=DEFAULT_MAX_PARALLEL, headless=True):
+    """Load every site `loads` times, max_parallel sites at once.
+
+    Returns the page-load rows; they are appended to out and their
+    per-request rows to requests_path(out).
+    """
+    rows = []
+    files = [_append_csv(out, WEB_HEADER), _append_csv(requests_path(out), REQ_HEADER)] if out else []
+    slots = asyncio.Semaphore(max_parallel)
+
+    async def one_site(pool, site):
+        async with slots:
+            site_rows, requests = await measure_site(pool, site, mode, state, loads)
+        rows.extend(site_rows)
+        for f, lines in zip(files, (site_rows, requests)):
+            f.writelines(",".join(map(str, line)) + "\n" for line in lines)
+
+    try:
+        async with BrowserPool(browsers, headless) as pool:
+            await asyncio.gather(*(one_site(pool, site) for site in sites))
+    finally:
+        for f in files:
+            f.close()
+    return rows
+
+
+def measure(sites, mode, out=None, **kwargs):
+    """Synchronous wrapper around run()."""
+    return asyncio.run(run(sites, mode, out, **kwargs))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Measure page loads over a pool of long-lived browsers.")
+    ap.add_argument("sites", nargs="*", help="sites or URLs to load (or use --sites-file)")
+    ap.add_argument("--sites-file")
+    ap.add_argument("--mode", required=True)
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--state", choices=["cold", "warm"], default="cold")
+    ap.add_argument("--loads", type=int, default=1, help="measured loads per site")
+    ap.add_argument("--browsers", type=int, default=DEFAULT_BROWSERS, help="browser processes in the pool")
+    ap.add_argument("--max-parallel", type=int, default=DEFAULT_MAX_PARALLEL)
+    ap.add_argument("--headed", action="store_true")
+    args = ap.parse_args(argv)
+
+    sites = args.sites + (read_sites(args.sites_file) if args.sites_file else [])
+    if not sites:
+        ap.error("no sites given")
+    rows = measure(sites, args.mode, args.out, state=args.state, loads=args.loads,
+                   browsers=args.browsers, max_parallel=args.max_parallel, headless=not args.headed)
+    ok = sum(r[-1] == "ok" for r in rows)
+    print(f"[{args.mode}/{args.state}] {ok}/{len(rows)} ok -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Filtered reads from the compacted measurement store (cs740.catalog).
+
+    select("dns", mode="doh", cache_state="warm", popularity="unpopular",
+           status="ok", us_gt=0, time_range=("2025-12-03T07:40Z", None),
+           columns=["site", "trial", "us"])
+
+- Keyword predicates are column=value (a list / tuple / set means "is
+  one of") or column_<op>=value with op one of gt, ge, lt, le, ne.
+  time_range=(start, end) keeps start <= time < end; either end may be
+  None.
+- Predicates are applied as early as possible:
+    partition  mode / cache_state pick the partition directories;
+    file       each partition's index.json entry (popularity, sites,
+               time range) skips partitions that cannot match;
+    row group  the rest go to the Parquet reader as filters, which skips
+               row groups by their min/max statistics (rows are stored
+               sorted by popularity, site and time) before filtering the
+               rows it does read.
+- Only the requested columns are decoded; columns that are only
+  filtered on are not returned. Values come back with the loader's dtypes (categorical
+  mode / site / status / labels).
+- status values in the store are already stripped and lowercased.
+"""
+
+import os
+from collections import namedtuple
+
+import pandas as pd
+
+from cs740.catalog import DEFAULT_STORE, PARTITIONS, read_store_index
+from cs740.loader import CACHE_STATES, consolidate
+
+OPS = {"gt": ">", "ge": ">=", "lt": "<", "le": "<=", "ne": "!="}
+# filters that a partition's index.json entry can rule out without opening it
+ENTRY_LISTS = {"popularity": "popularity", "site": "sites"}
+
+Plan = namedtuple("Plan", ["partitions", "filters", "skipped"])
+
+
+def _predicates(where):
+    """[(column, op, value)] from select()'s keyword arguments."""
+    preds = []
+    for key, value in where.items():
+        column, _, op = key.rpartition("_")
+        if column and op in OPS:
+            preds.append((column, OPS[op], value))
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            preds.append((key, "in", list(value)))
+        else:
+            preds.append((key, "==", value))
+    return preds
+
+
+def _timestamp(when):
+    when = pd.Timestamp(when)
+    return when.tz_localize("UTC") if when.tz is None else when.tz_convert("UTC")
+
+
+def _may_match(entry, preds, start, end):
+    """False when the partition's index entry proves no row can match."""
+    for column, op, value in preds:
+        values = value if op == "in" else [value]
+        if column in PARTITIONS:
+            if op in ("==", "in") and entry[column] not in values:
+                return False
+            if op == "!=" and entry[column] == value:
+                return False
+        elif column in ENTRY_LISTS and op in ("==", "in"):
+            if not set(map(str, values)) & set(entry[ENTRY_LISTS[column]]):
+                return False
+    if entry["first"] is None:
+        return start is None and end is None
+    if start is not None and _timestamp(entry["last"]) < start:
+        return False
+    if end is not None and _timestamp(entry["first"]) >= end:
+        return False
+    return True
+
+
+def plan(table="dns", store=DEFAULT_STORE, time_range=None, **where):
+    """Plan(partitions to read, Parquet row filters, number of partitions skipped)."""
+    preds = _predicates(where)
+    start, end = (None, None) if time_range is None else [
+        None if t is None else _timestamp(t) for t in time_range]
+    entries = [p for p in read_store_index(store) if p["table"] == table]
+    partitions = [p for p in entries if _may_match(p, preds, start, end)]
+    filters = [(c, op, v) for c, op, v in preds if c not in PARTITIONS]
+    if start is not None:
+        filters.append(("time", ">=", start))
+    if end is not None:
+        filters.append(("time", "<", end))
+    return Plan(partitions, filters, len(entries) - len(partitions))
+
+
+def select(table="dns", columns=None, store=DEFAULT_STORE, time_range=None, **where):
+    """Rows of table in store matching every predicate, with only columns (default: all)."""
+    import pyarrow.parquet as pq
+
+    query = plan(table, store, time_range, **where)
+    stored = [c for c in columns if c not in PARTITIONS] if columns is not None else None
+    frames = []
+    for p in query.partitions:
+        path = os.path.join(store, table, f"mode={p['mode']}", f"cache_state={p['cache_state']}",
+                            "part-0.parquet")
+        df = pq.read_table(path, columns=stored, filters=query.filters or None).to_pandas()
+        frames.append(df.assign(mode=p["mode"], cache_state=p["cache_state"]))
+    if not frames:
+        empty = consolidate(table, [], [])          # typed, with the loader's columns
+        return empty.reindex(columns=columns) if columns is not None else empty
+    df = pd.concat(frames, ignore_index=True)
+    df["mode"] = df["mode"].astype("category")
+    df["cache_state"] = pd.Categorical(df["cache_state"], CACHE_STATES)
+    for col in df.columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype) and not isinstance(df[col].dtype,
+                                                                                   pd.CategoricalDtype):
+            df[col] = df[col].astype("category")        # categories differed between partitions
+    return df[columns] if columns is not None else df
@@ -0,0 +1,268 @@
+"""
+Compact binary store of raw DNS samples, memory-mapped for analysis.
+
+- A store is a directory holding records.bin and names.json. records.bin
+  is a 16-byte header (MAGIC, format version, record size) followed by
+  fixed-width RECORD rows, appended in order and never rewritten.
+- Each record is 24 bytes: the timestamp as int64 ns since the epoch (UTC;
+  NaT for rows without one), the dictionary ids of mode / site / status,
+  trial, the latency as float32 ms, and the cold/warm and
+  popular/unpopular labels the loader takes from the file name.
+- names.json maps ids back to names. Ids are assigned in order of first
+  appearance and never change, so old records stay valid as the
+  dictionaries grow. It is rewritten (atomically) before the records that
+  use new ids are appended.
+- SampleStore.records() memory-maps the file read-only, and its columns
+  (records()["ms"], ...) are zero-copy strided views. A trailing partial
+  record (an append that was interrupted) is ignored and overwritten by
+  the next append.
+- from_csv() / to_csv() convert from and to the raw CSV layout of
+  data_for_submission/ ({mode}_dns_{state}[_unpopular].csv with
+  iso,mode,site,trial,ms,status). Files written by cs740.measure keep
+  their float latency (a `us` column is written back when a value isn't a
+  whole millisecond) but not their handshake / phase columns.
+- manifest.json records, per imported CSV, what cs740.cache's manifest
+  does (path, size, mtime, byte offset and last row read), so importing
+  the same directories again only appends the rows written since. A CSV
+  rewritten in place can't be taken back out of the store; importing it
+  again is refused.
+
+Usage:
+    python3 -m cs740 samples from-csv data_for_submission/pop_raw data_for_submission/unpop_raw \\
+        --store data/samples/submission
+    python3 -m cs740 samples info --store data/samples/submission
+    python3 -m cs740 samples to-csv --store data/samples/submission --out-dir /tmp/raw
+"""
+
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from cs740 import DEFAULT_DIRS
+from cs740.cache import ingest
+from cs740.loader import CACHE_STATES, POPULARITY, consolidate, discover
+
+MAGIC = b"CS740SMP"
+VERSION = 1
+HEADER = struct.Struct("<8sII")          # magic, version, record size
+NAT = np.iinfo(np.int64).min              # numpy's NaT as int64
+
+RECORD = np.dtype({
+    "names": ["ts_ns", "site", "ms", "trial", "mode", "status", "cache_state", "popularity"],
+    "formats": ["<i8", "<u4", "<f4", "<u2", "<u2", "u1", "u1", "u1"],
+    "offsets": [0, 8, 12, 16, 18, 20, 21, 22],
+    "itemsize": 24,
+})
+NAME_FIELDS = {"mode": "<u2", "site": "<u4", "status": "u1"}
+CSV_HEADER = ["iso", "mode", "site", "trial", "ms", "status"]
+
+
+class SampleStore:
+    """Append-only store of DNS samples under directory path."""
+
+    def __init__(self, path):
+        self.path = path
+        self.records_path = os.path.join(path, "records.bin")
+        self.names_path = os.path.join(path, "names.json")
+        self.manifest_path = os.path.join(path, "manifest.json")
+        self.names = {field: [] for field in NAME_FIELDS}
+        if os.path.exists(self.names_path):
+            with open(self.names_path) as f:
+                self.names.update(json.load(f))
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def __len__(self):
+        if not os.path.exists(self.records_path):
+            return 0
+        return max(0, os.path.getsize(self.records_path) - HEADER.size) // RECORD.itemsize
+
+    def _check_header(self, f):
+        magic, version, size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or size != RECORD.itemsize:
+            raise ValueError(f"{self.records_path}: not a version {VERSION} sample store")
+
+    def records(self, start=None, stop=None):
+        """Read-only memory-mapped RECORD array (rows start:stop); no data is copied."""
+        n = len(self)
+        if n == 0:
+            return np.empty(0, RECORD)
+        with open(self.records_path, "rb") as f:
+            self._check_header(f)
+        rows = np.memmap(self.records_path, dtype=RECORD, mode="r", offset=HEADER.size, shape=(n,))
+        return rows[start:stop]
+
+    def _ids(self, field, values):
+        """Dictionary ids of values (new names get the next free ids)."""
+        names = self.names[field]
+        index = {name: i for i, name in enumerate(names)}
+        cat = pd.Categorical(values)
+        codes = cat.codes
+        lookup = [index.setdefault(str(name), len(index)) for name in cat.categories]
+        if (codes < 0).any():
+            lookup.append(index.setdefault("", len(index)))   # codes -1 (missing) pick the last
+        names.extend(list(index)[len(names):])
+        limit = np.iinfo(NAME_FIELDS[field]).max
+        if len(names) > limit + 1:
+            raise ValueError(f"more than {limit + 1} distinct {field} names")
+        return np.asarray(lookup, dtype=NAME_FIELDS[field])[codes]
+
+    def append(self, dns):
+        """Append the rows of a DNS table (as returned by cs740.loader); returns their count."""
+        if not len(dns):
+            return 0
+        rows = np.zeros(len(dns), RECORD)
+        ts = pd.to_datetime(dns["iso"], utc=True, errors="coerce", format="ISO8601")
+        rows["ts_ns"] = ts.to_numpy("datetime64[ns]").view(np.int64)
+        rows["ms"] = (dns["us"].to_numpy("float64", na_value=np.nan) / 1000).astype(np.float32)
+        trial = dns["trial"].to_numpy("int64")
+        if trial.min() < 0 or trial.max() > np.iinfo(np.uint16).max:
+            raise ValueError("trial out of range for the sample store")
+        rows["trial"] = trial
+        for field in NAME_FIELDS:
+            rows[field] = self._ids(field, dns[field])
+        rows["cache_state"] = pd.Categorical(dns["cache_state"], CACHE_STATES).codes
+        rows["popularity"] = pd.Categorical(dns["popularity"], POPULARITY).codes
+
+        os.makedirs(self.path, exist_ok=True)
+        _write_json(self.names, self.names_path)
+
+        n = len(self)
+        with open(self.records_path, "ab") as f:
+            if f.tell() == 0:
+                f.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize))
+            else:
+                f.truncate(HEADER.size + n * RECORD.itemsize)   # drop a partial record
+                f.seek(0, os.SEEK_END)
+            f.write(rows.tobytes())
+        return len(rows)
+
+    def save_manifest(self):
+        os.makedirs(self.path, exist_ok=True)
+        _write_json(self.manifest, self.manifest_path)
+
+    def categorical(self, field, ids):
+        """ids of a dictionary-encoded field as a Categorical of its names."""
+        return pd.Categorical.from_codes(ids.astype(np.int64), self.names[field])
+
+    def to_frame(self, start=None, stop=None):
+        """Rows start:stop as a DNS table like cs740.loader's (ms and us as floats, `ts` as datetime)."""
+        rows = self.records(start, stop)
+        ms = rows["ms"].astype("float64")
+        return pd.DataFrame({
+            "ts": pd.to_datetime(rows["ts_ns"], utc=True),
+            "mode": self.categorical("mode", rows["mode"]),
+            "site": self.categorical("site", rows["site"]),
+            "trial": rows["trial"].astype("int32"),
+            "ms": ms,
+            "status": self.categorical("status", rows["status"]),
+            "us": ms * 1000,
+            "cache_state": pd.Categorical.from_codes(rows["cache_state"].astype(np.int8), CACHE_STATES),
+            "popularity": pd.Categorical.from_codes(rows["popularity"].astype(np.int8), POPULARITY),
+        })
+
+
+def _write_json(obj, path):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def from_csv(dirs, store):
+    """Append the DNS rows under dirs that store doesn't hold yet; returns the number added."""
+    raws, frames, entries = [], [], {}
+    for raw in discover(dirs):
+        if raw.table != "dns":
+            continue
+        entry = store.manifest.get(os.path.abspath(raw.path))
+        frame, new_entry, appended = ingest(raw, entry)
+        if entry is not None and not appended:
+            if entry.get("offset") is not None:
+                raise ValueError(f"{raw.path}: rewritten since it was imported into {store.path}")
+            frame = frame.iloc[entry["rows"]:]      # was mid-write: its first rows are in the store
+        raws.append(raw)
+        frames.append(frame)
+        entries[new_entry["path"]] = new_entry
+    n = store.append(consolidate("dns", raws, frames))
+    store.manifest.update(entries)
+    store.save_manifest()
+    return n
+
+
+def _iso(ts_ns):
+    """ISO-8601 UTC strings, to the second like dig-era rows when every value allows it."""
+    ts = ts_ns.astype("datetime64[ns]")
+    whole = (ts_ns[ts_ns != NAT] % 1_000_000_000 == 0).all()
+    iso = np.char.add(np.datetime_as_string(ts, unit="s" if whole else "ms"), "Z")
+    return np.where(ts_ns == NAT, "", iso)
+
+
+def to_csv(store, out_dir):
+    """Write store back as raw CSVs, one per (mode, cache state, popularity); returns the paths."""
+    rows = store.records()
+    os.makedirs(out_dir, exist_ok=True)
+    groups = (rows["mode"].astype(np.int64) * 4 + rows["cache_state"] * 2 + rows["popularity"])
+    paths = []
+    for group in np.unique(groups):
+        part = rows[groups == group]
+        mode = store.names["mode"][group // 4]
+        state, popularity = CACHE_STATES[(group // 2) % 2], POPULARITY[group % 2]
+        suffix = "_unpopular" if popularity == "unpopular" else ""
+        path = os.path.join(out_dir, f"{mode}_dns_{state}{suffix}.csv")
+
+        ms = part["ms"].astype("float64")
+        df = pd.DataFrame({
+            "iso": _iso(part["ts_ns"]),
+            "mode": mode,
+            "site": np.asarray(store.names["site"], dtype=object)[part["site"]],
+            "trial": part["trial"],
+            "ms": pd.array(np.round(ms), dtype="Int64"),
+            "status": np.asarray(store.names["status"], dtype=object)[part["status"]],
+        }, columns=CSV_HEADER)
+        # float latencies from cs740.measure go back out as `us`
+        if not np.array_equal(ms[~np.isnan(ms)], np.round(ms[~np.isnan(ms)])):
+            df["us"] = np.round(ms * 1000, 1)
+        df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Convert raw DNS CSVs to and from a binary sample store.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("from-csv", help="append every DNS CSV under the directories to the store")
+    p.add_argument("dirs", nargs="*", default=list(DEFAULT_DIRS))
+    p.add_argument("--store", required=True)
+    p = sub.add_parser("to-csv", help="write the store back as raw CSVs")
+    p.add_argument("--store", required=True)
+    p.add_argument("--out-dir", required=True)
+    p = sub.add_parser("info", help="rows, size and names in the store")
+    p.add_argument("--store", required=True)
+    args = ap.parse_args(argv)
+
+    store = SampleStore(args.store)
+    if args.command == "from-csv":
+        try:
+            n = from_csv(args.dirs, store)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"{n} rows appended -> {args.store} ({len(store)} rows)")
+    elif args.command == "to-csv":
+        for path in to_csv(store, args.out_dir):
+            print(f"  [OK] {path}")
+    else:
+        size = os.path.getsize(store.records_path) if len(store) else 0
+        print(f"{len(store)} rows, {size} bytes ({RECORD.itemsize} per row)")
+        for field, names in store.names.items():
+            print(f"  {field}: {len(names)} ({', '.join(names[:8])}{', ...' if len(names) > 8 else ''})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Streaming, constant-memory latency statistics.
+
+- KLLSketch is a mergeable quantile sketch (Karnin, Lang & Liberty 2016):
+  a stack of compactors whose capacities shrink geometrically towards the
+  bottom, so memory stays O(k) however many samples are added. It also
+  keeps exact count / mean / std / min / max.
+- Sketches merge losslessly with respect to their error bound, so they can
+  be built per file or per machine and combined later; to_dict()/from_dict()
+  give a JSON-friendly form for shipping them around.
+- stream_sketches() feeds the raw CSVs chunk by chunk into one sketch per
+  group; sketch_summary() turns the result into the same tidy layout as
+  cs740.summary.summarize().
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from cs740.loader import DEFAULT_DIRS, iter_chunks
+from cs740.summary import QUANTILES, quantile_column
+
+DEFAULT_K = 200
+
+
+class KLLSketch:
+    """Mergeable quantile sketch with rank error of roughly 1.7/k."""
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[len(items) - len(items) % 2:]
+                promoted = items[self._rng.integers(2):len(items) - len(keep):2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """Add a batch of samples (NaNs are ignored)."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.n += values.size
+        self.total += values.sum()
+        self.total_sq += np.square(values).sum()
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold other into this sketch in place."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile (exact, linearly interpolated, while nothing was compacted)."""
+        if self.n == 0:
+            return np.nan
+        if len(self.levels) == 1:
+            return float(np.quantile(self.levels[0], q))
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(v), 2 ** i) for i, v in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cum = np.cumsum(weights[order])
+        idx = np.searchsorted(cum, q * cum[-1], side="left")
+        return float(np.clip(items[order][min(idx, len(items) - 1)], self.min, self.max))
+
+    def mean(self):
+        return self.total / self.n if self.n else np.nan
+
+    def std(self):
+        if self.n < 2:
+            return np.nan
+        var = (self.total_sq - self.total ** 2 / self.n) / (self.n - 1)
+        return math.sqrt(max(var, 0.0))
+
+    def to_dict(self):
+        return {"k": self.k, "n": self.n, "total": self.total, "total_sq": self.total_sq,
+                "min": self.min, "max": self.max, "levels": [v.tolist() for v in self.levels]}
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls(d["k"])
+        sketch.levels = [np.asarray(v, dtype=float) for v in d["levels"]]
+        sketch.n, sketch.total, sketch.total_sq = d["n"], d["total"], d["total_sq"]
+        sketch.min, sketch.max = d["min"], d["max"]
+        return sketch
+
+
+def update_sketches(sketches, df, value="ms", by=("mode", "site", "cache_state"), k=DEFAULT_K):
+    """Add df[value] to one sketch per group of df (dict keyed by group tuple)."""
+    by = list(by)
+    for key, values in df.groupby(by, observed=True)[value]:
+        key = key if isinstance(key, tuple) else (key,)
+        if key not in sketches:
+            sketches[key] = KLLSketch(k)
+        sketches[key].update(values.to_numpy(dtype=float, na_value=np.nan))
+    return sketches
+
+
+def merge_sketches(*groups):
+    """Merge several {group: sketch} dicts (e.g. from different files or machines)."""
+    merged = {}
+    for sketches in groups:
+        for key, sketch in sketches.items():
+            if key in merged:
+                merged[key].merge(sketch)
+            else:
+                merged[key] = KLLSketch(sketch.k).merge(sketch)
+    return merged
+
+
+def stream_sketches(dirs=DEFAULT_DIRS, table="dns", value="ms", by=("mode", "site", "cache_state"),
+                    prepare=None, chunksize=100_000, k=DEFAULT_K):
+    """Sketch every raw file under dirs chunk by chunk, never holding the full table.
+
+    prepare, if given, maps each chunk to the rows/columns to sketch (e.g.
+    filter on status or derive a grouping column).
+    """
+    sketches = {}
+    for chunk in iter_chunks(dirs, table, chunksize):
+        if prepare is not None:
+            chunk = prepare(chunk)
+        update_sketches(sketches, chunk, value, by, k)
+    return sketches
+
+
+def sketch_summary(sketches, by=("mode", "site", "cache_state"), metric="ms", quantiles=QUANTILES):
+    """Tidy table (same columns as summarize()) from a {group: sketch} dict."""
+    quantiles = [q for q in quantiles if q != 0.5]      # reported as `median`
+    rows = []
+    for key, sketch in sorted(sketches.items(), key=lambda kv: tuple(map(str, kv[0]))):
+        row = dict(zip(by, key), metric=metric, count=sketch.n, mean=sketch.mean(),
+                   std=sketch.std(), median=sketch.quantile(0.5))
+        row.update({quantile_column(q): sketch.quantile(q) for q in quantiles})
+        rows.append(row)
+    columns = list(by) + ["metric", "count", "mean", "std", "median"] + [quantile_column(q) for q in quantiles]
+    return pd.DataFrame(rows, columns=columns)
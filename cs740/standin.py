@@ -0,0 +1,364 @@
+"""
+Local stand-in resolver for reproducible DNS benchmarks, no network needed.
+
+- Answers every A / AAAA query with a fixed address derived from the name
+  (other types get an empty NOERROR, *.invalid gets NXDOMAIN) over UDP
+  and TCP on one port, and optionally over DoT and DoH (HTTP/1.1 POST or
+  GET, RFC 8484) when given a certificate.
+- Behaves like a caching recursive resolver: the first lookup of a
+  (name, type), or one whose TTL has run out, is a miss and waits a delay
+  drawn from the miss distribution before answering; later lookups are
+  hits, wait the hit distribution and get the remaining TTL.
+- loss is the fraction of queries lost: UDP ones get no reply (the client
+  times out), TCP / TLS ones are answered RETRANSMIT_MS later, as after a
+  retransmission.
+- All delays and losses come from one random.Random(seed), so with a seed
+  a sequential client sees the same sequence on every run.
+- A control port takes `flush [site]` and `stats` lines, so the stand-in
+  can be the FLUSH_CMD of cs740.measure and cs740.campaign.
+
+Latency specs, in ms: a number (constant), const:V, uniform:LO,HI,
+normal:MEAN,SD (clipped at 0), lognormal:MEDIAN,SIGMA or exp:MEAN.
+
+Usage:
+    python3 -m cs740 standin serve --port 8053 --control-port 8099 \\
+        --miss lognormal:30,0.5 --hit 0.2 --loss 0.01 --seed 1
+    FLUSH_CMD='python3 -m cs740 standin flush --control 127.0.0.1#8099 %s' COLD=1 \\
+        python3 -m cs740 measure --mode public_udp --resolver 127.0.0.1#8053 \\
+        --out /tmp/bench/public_udp_dns_cold.csv --sites-file config/sites.txt
+    python3 -m cs740 standin serve --port 8053 --dot-port 8853 --doh-port 8443 \\
+        --certfile cert.pem --keyfile key.pem
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import socket
+import ssl
+import struct
+import time
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+
+from cs740.dnswire import (DOH_PATH, FLAG_QR, QTYPES, RCODE_FORMERR, RCODE_NXDOMAIN, RCODE_NOERROR,
+                           DNSFormatError, build_response, parse_query, parse_resolver, qname_from_site)
+
+DEFAULT_PORT = 8053
+DEFAULT_TTL = 300
+DEFAULT_HIT = "const:0"
+DEFAULT_MISS = "lognormal:30,0.5"
+RETRANSMIT_MS = 200            # Linux minimum TCP retransmission timeout
+
+# kind -> (number of parameters, draw(rng, *params) in ms)
+LATENCIES = {
+    "const": (1, lambda rng, v: v),
+    "uniform": (2, lambda rng, lo, hi: rng.uniform(lo, hi)),
+    "normal": (2, lambda rng, mean, sd: max(0.0, rng.gauss(mean, sd))),
+    "lognormal": (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma)),
+    "exp": (1, lambda rng, mean: rng.expovariate(1 / mean)),
+}
+
+
+def parse_latency(spec):
+    """draw(rng) -> delay in ms for a spec such as 'lognormal:30,0.5' or '2.5'."""
+    kind, _, params = str(spec).partition(":")
+    if not params:
+        kind, params = "const", kind
+    if kind not in LATENCIES:
+        raise ValueError(f"unknown latency distribution {kind!r} (one of {', '.join(LATENCIES)})")
+    nparams, draw = LATENCIES[kind]
+    try:
+        values = [float(v) for v in params.split(",")]
+    except ValueError:
+        raise ValueError(f"bad latency parameters in {spec!r}") from None
+    if len(values) != nparams or any(v < 0 for v in values) or \
+            (kind in ("lognormal", "exp") and values[0] <= 0):
+        raise ValueError(f"{kind} takes {nparams} non-negative parameter(s), got {spec!r}")
+    return lambda rng: draw(rng, *values)
+
+
+def address(name, qtype):
+    """Stable synthetic rdata for name: 10.0.0.0/8 for A, fd00::/8 for AAAA."""
+    digest = hashlib.sha1(name.encode()).digest()
+    return b"\x0a" + digest[:3] if qtype == QTYPES["A"] else b"\xfd" + digest[:15]
+
+
+def server_tls_context(certfile, keyfile=None):
+    ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ctx.load_cert_chain(certfile, keyfile)
+    return ctx
+
+
+class StandIn:
+    """The stand-in resolver; `async with StandIn(...) as server:` serves until the block ends.
+
+    Ports given as 0 are picked by the OS and readable after start(); UDP
+    and TCP always share one port. dot_port / doh_port / control_port None
+    leave that front-end off.
+    """
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, hit=DEFAULT_HIT, miss=DEFAULT_MISS,
+                 loss=0.0, ttl=DEFAULT_TTL, seed=None, dot_port=None, doh_port=None,
+                 ssl_context=None, control_port=None):
+        if not 0 <= loss < 1:
+            raise ValueError("loss must be in [0, 1)")
+        if (dot_port is not None or doh_port is not None) and ssl_context is None:
+            raise ValueError("DoT / DoH need a certificate (ssl_context)")
+        self.host, self.port = host, port
+        self.dot_port, self.doh_port, self.control_port = dot_port, doh_port, control_port
+        self.hit, self.miss = parse_latency(hit), parse_latency(miss)
+        self.loss, self.ttl = loss, ttl
+        self.rng = random.Random(seed)
+        self.ssl_context = ssl_context
+        self.cache = {}                # (name, qtype) -> expiry, time.monotonic()
+        self.stats = Counter()
+        self.servers = []
+        self.tasks = set()
+
+    # ---------------------------
+    # Resolution
+    # ---------------------------
+    def flush(self, site=None):
+        """Forget every cached answer, or those of one site's name; returns how many."""
+        if site is None:
+            n = len(self.cache)
+            self.cache.clear()
+            return n
+        name = qname_from_site(site).lower()
+        keys = [k for k in self.cache if k[0] == name]
+        for key in keys:
+            del self.cache[key]
+        return len(keys)
+
+    async def resolve(self, wire, transport):
+        """Reply to the query in wire after its simulated delay; None when it is lost."""
+        try:
+            query = parse_query(wire)
+        except DNSFormatError:
+            self.stats["formerr"] += 1
+            if len(wire) < 2:
+                return None
+            return struct.pack(">HHHHHH", struct.unpack(">H", wire[:2])[0], FLAG_QR | RCODE_FORMERR,
+                               0, 0, 0, 0)
+        self.stats["queries"] += 1
+        self.stats[transport] += 1
+
+        delay = 0.0
+        if self.loss and self.rng.random() < self.loss:
+            self.stats["lost"] += 1
+            if transport == "udp":
+                return None
+            delay += RETRANSMIT_MS
+
+        name = query.name.lower().rstrip(".")
+        key = (name, query.qtype)
+        expiry = self.cache.get(key, 0)
+        hit = expiry > time.monotonic()
+        self.stats["hits" if hit else "misses"] += 1
+        delay += (self.hit if hit else self.miss)(self.rng)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if not hit:
+            expiry = self.cache[key] = time.monotonic() + self.ttl
+
+        if name == "invalid" or name.endswith(".invalid"):
+            return build_response(query, RCODE_NXDOMAIN)
+        answers = []
+        if query.qtype in (QTYPES["A"], QTYPES["AAAA"]):
+            ttl = max(0, math.ceil(expiry - time.monotonic()))
+            answers.append((query.qtype, ttl, address(name, query.qtype)))
+        return build_response(query, RCODE_NOERROR, answers)
+
+    # ---------------------------
+    # Front-ends
+    # ---------------------------
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _stream(self, reader, writer, transport):
+        """TCP / DoT: length-prefixed queries (RFC 7766), answered in order, until the client closes."""
+        try:
+            while True:
+                (length,) = struct.unpack(">H", await reader.readexactly(2))
+                reply = await self.resolve(await reader.readexactly(length), transport)
+                if reply is None:
+                    break
+                writer.write(struct.pack(">H", len(reply)) + reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    async def _https(self, reader, writer):
+        """DoH over HTTP/1.1 keep-alive: POST application/dns-message or GET ?dns=<base64url>."""
+        try:
+            while True:
+                method, target, _ = (await reader.readuntil(b"\r\n")).decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                url = urlsplit(target)
+                if method == "GET":
+                    dns = parse_qs(url.query).get("dns", [""])[0]
+                    body = base64.urlsafe_b64decode(dns + "=" * (-len(dns) % 4))
+                if url.path != DOH_PATH or method not in ("GET", "POST"):
+                    status, reply = "404 Not Found", b""
+                else:
+                    reply = await self.resolve(body, "doh")
+                    status, reply = ("200 OK", reply) if reply is not None else ("400 Bad Request", b"")
+                writer.write((f"HTTP/1.1 {status}\r\nContent-Type: application/dns-message\r\n"
+                              f"Content-Length: {len(reply)}\r\n\r\n").encode() + reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ssl.SSLError,
+                ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _control(self, reader, writer):
+        """One command per line: `flush [site]` or `stats`; one JSON reply line each."""
+        try:
+            while line := (await reader.readline()).decode().split():
+                if line[0] == "flush":
+                    reply = {"flushed": self.flush(line[1] if len(line) > 1 else None)}
+                elif line[0] == "stats":
+                    reply = dict(self.stats, cached=len(self.cache))
+                else:
+                    reply = {"error": f"unknown command {line[0]!r}"}
+                writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        standin = self
+
+        class UDP(asyncio.DatagramProtocol):
+            def connection_made(self, transport):
+                self.transport = transport
+
+            def datagram_received(self, data, addr):
+                async def answer():
+                    reply = await standin.resolve(data, "udp")
+                    if reply is not None:
+                        self.transport.sendto(reply, addr)
+                standin._spawn(answer())
+
+        udp, _ = await loop.create_datagram_endpoint(UDP, local_addr=(self.host, self.port))
+        self.servers.append(udp)
+        self.port = udp.get_extra_info("sockname")[1]
+
+        async def listen(handler, port, tls=None):
+            server = await asyncio.start_server(handler, self.host, port, ssl=tls)
+            self.servers.append(server)
+            return server.sockets[0].getsockname()[1]
+
+        await listen(lambda r, w: self._stream(r, w, "tcp"), self.port)
+        if self.dot_port is not None:
+            self.dot_port = await listen(lambda r, w: self._stream(r, w, "dot"), self.dot_port,
+                                         self.ssl_context)
+        if self.doh_port is not None:
+            self.doh_port = await listen(self._https, self.doh_port, self.ssl_context)
+        if self.control_port is not None:
+            self.control_port = await listen(self._control, self.control_port)
+        return self
+
+    async def close(self):
+        for server in self.servers:
+            server.close()
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for server in self.servers:
+            if isinstance(server, asyncio.AbstractServer):      # the UDP endpoint is a transport
+                await server.wait_closed()
+        self.servers = []
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def endpoints(self):
+        """Resolver specs for cs740.measure / campaign, one per running front-end."""
+        out = {"udp": f"{self.host}#{self.port}", "tcp": f"{self.host}#{self.port}"}
+        if self.dot_port is not None:
+            out["dot"] = f"{self.host}#{self.dot_port}"
+        if self.doh_port is not None:
+            out["doh"] = f"https://{self.host}:{self.doh_port}{DOH_PATH}"
+        if self.control_port is not None:
+            out["control"] = f"{self.host}#{self.control_port}"
+        return out
+
+
+def control(address, command, timeout=5.0):
+    """Send one control command to a running stand-in at host#port; returns its JSON reply."""
+    host, port, _ = parse_resolver(address)
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(command.encode() + b"\n")
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+async def serve(**kwargs):
+    async with StandIn(**kwargs) as server:
+        for transport, spec in server.endpoints().items():
+            print(f"[standin] {transport:7s} {spec}")
+        await asyncio.Event().wait()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local stand-in resolver with simulated latency, cache and loss.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("serve", help="run the stand-in until interrupted")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT, help="UDP and TCP port")
+    p.add_argument("--dot-port", type=int, help="serve DoT here (needs --certfile)")
+    p.add_argument("--doh-port", type=int, help=f"serve DoH ({DOH_PATH}) here (needs --certfile)")
+    p.add_argument("--certfile", help="PEM certificate (and key, unless --keyfile) for DoT / DoH")
+    p.add_argument("--keyfile")
+    p.add_argument("--control-port", type=int, help="accept flush / stats commands here")
+    p.add_argument("--hit", default=DEFAULT_HIT, help=f"latency of cache hits (default {DEFAULT_HIT})")
+    p.add_argument("--miss", default=DEFAULT_MISS, help=f"latency of cache misses (default {DEFAULT_MISS})")
+    p.add_argument("--loss", type=float, default=0.0, help="fraction of queries lost (default 0)")
+    p.add_argument("--ttl", type=int, default=DEFAULT_TTL, help=f"answer TTL, s (default {DEFAULT_TTL})")
+    p.add_argument("--seed", type=int, help="seed for delays and losses (default: random)")
+    for name, help_text in (("flush", "flush a running stand-in's cache (one site, or all)"),
+                            ("stats", "print a running stand-in's counters")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--control", required=True, help="host#port of its --control-port")
+        if name == "flush":
+            p.add_argument("site", nargs="?")
+    args = ap.parse_args(argv)
+
+    if args.command != "serve":
+        command = " ".join(filter(None, [args.command, getattr(args, "site", None)]))
+        print(json.dumps(control(args.control, command)))
+        return
+    if (args.dot_port is not None or args.doh_port is not None) and not args.certfile:
+        ap.error("--dot-port / --doh-port need --certfile")
+    try:
+        tls = server_tls_context(args.certfile, args.keyfile) if args.certfile else None
+        asyncio.run(serve(host=args.host, port=args.port, hit=args.hit, miss=args.miss, loss=args.loss,
+                          ttl=args.ttl, seed=args.seed, dot_port=args.dot_port, doh_port=args.doh_port,
+                          ssl_context=tls, control_port=args.control_port))
+    except ValueError as e:
+        ap.error(str(e))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Uncertainty for the latency summaries: bootstrap CIs and tests between modes.
+
+- bootstrap() resamples a quantile (median by default) of every group at
+  once. A bootstrap resample's k-th order statistic is the empirical
+  quantile at U_(k) ~ Beta(k, n - k + 1), so each resample costs O(1) per
+  group after one sort instead of redrawing all n values; the two order
+  statistics np.quantile interpolates between are drawn jointly, so the
+  result matches resampling row by row. One (groups x resamples) matrix,
+  built in slices of MAX_CELLS, however many rows each group has.
+- quantile_ci() turns that into a tidy per-group (estimate, ci_low,
+  ci_high); with_ci() adds the median's CI to a cs740.summary table.
+- compare_modes() gives, per group and pair of modes, the difference of
+  their medians with a bootstrap CI (difference of the two resample
+  rows), the Mann-Whitney U test (average ranks from one sort of the
+  rows, normal approximation with tie correction) and a permutation test
+  on the median difference (batched; pools larger than PERMUTATION_MAX_N
+  are subsampled first).
+"""
+
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+
+from cs740.summary import quantile_column
+
+DEFAULT_LEVEL = 0.95
+BOOTSTRAP_RESAMPLES = 2000
+PERMUTATION_RESAMPLES = 2000
+PERMUTATION_MAX_N = 5000
+BOOTSTRAP_SEED = 740
+MAX_CELLS = 4_000_000          # groups x resamples drawn at a time
+
+
+def stat_name(q):
+    return "median" if q == 0.5 else quantile_column(q)
+
+
+def _sorted_rows(df, value, by):
+    """(keys with n, group id, values, rows, row order) of df's non-null rows, sorted by (group, value)."""
+    data = df[df[value].notna()]
+    overall = not by
+    if overall:
+        data = data.assign(_all=0)
+        by = ["_all"]
+    g = data.groupby(list(by), observed=True, sort=True)
+    gid = g.ngroup().to_numpy()
+    vals = data[value].to_numpy("float64")
+    order = np.lexsort((vals, gid))
+    keys = g.size().rename("n").reset_index()
+    if overall:
+        keys = keys.drop(columns=["_all"])
+    return keys, gid[order], vals[order], data, order
+
+
+def _resample(sorted_vals, offsets, sizes, q, resamples, rng):
+    """(groups x resamples) bootstrap draws of the q-quantile (np.quantile's linear method)."""
+    n = sizes[:, None].astype("float64")
+    h = (sizes - 1) * q
+    lower = np.floor(h).astype(np.int64)
+    w = (h - lower)[:, None]
+    k = (lower + 1)[:, None]                     # 1-based rank of the lower order statistic
+    shape = (len(sizes), resamples)
+    u_lo = rng.beta(k, sizes[:, None] - k + 1, size=shape)
+    u_hi = u_lo + (1 - u_lo) * rng.beta(1, np.maximum(sizes[:, None] - k, 1), size=shape)
+
+    def at(u):
+        rank = np.clip(np.ceil(u * n).astype(np.int64) - 1, 0, sizes[:, None] - 1)
+        return sorted_vals[offsets[:, None] + rank]
+
+    return (1 - w) * at(u_lo) + w * at(u_hi)
+
+
+def _bootstrap(df, value, by, q, resamples, seed):
+    """(keys with n, q-quantile of each group, groups x resamples draws)."""
+    keys, _, sorted_vals, _, _ = _sorted_rows(df, value, list(by))
+    sizes = keys["n"].to_numpy()
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    h = (sizes - 1) * q
+    lower = np.floor(h).astype(np.int64)
+    upper = np.minimum(lower + 1, sizes - 1)
+    estimate = sorted_vals[offsets + lower] + (h - lower) * (sorted_vals[offsets + upper]
+                                                             - sorted_vals[offsets + lower])
+    rng = np.random.default_rng(seed)
+    draws = np.empty((len(sizes), resamples))
+    step = max(1, MAX_CELLS // resamples)
+    for lo in range(0, len(sizes), step):
+        hi = lo + step
+        draws[lo:hi] = _resample(sorted_vals, offsets[lo:hi], sizes[lo:hi], q, resamples, rng)
+    return keys, estimate, draws
+
+
+def bootstrap(df, value="ms", by=("mode",), q=0.5, resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED):
+    """(keys, draws): keys has one row per group of df (with its n), draws the resampled q-quantiles."""
+    keys, _, draws = _bootstrap(df, value, by, q, resamples, seed)
+    return keys, draws
+
+
+def _ci(draws, level):
+    alpha = (1 - level) / 2
+    if not len(draws):
+        return np.empty(0), np.empty(0)
+    low, high = np.quantile(draws, [alpha, 1 - alpha], axis=1)
+    return low, high
+
+
+def quantile_ci(df, value="ms", by=("mode",), q=0.5, level=DEFAULT_LEVEL,
+                resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED):
+    """Tidy table: by..., n, estimate (the q-quantile), ci_low, ci_high."""
+    keys, estimate, draws = _bootstrap(df, value, by, q, resamples, seed)
+    low, high = _ci(draws, level)
+    return keys.assign(estimate=estimate, ci_low=low, ci_high=high)
+
+
+def with_ci(summary, df, values="ms", by=("mode",), level=DEFAULT_LEVEL, **kwargs):
+    """summary (from cs740.summary.summarize) plus median_ci_low / median_ci_high columns."""
+    values = [values] if isinstance(values, str) else list(values)
+    by = list(by)
+    if summary.empty:
+        return summary.assign(median_ci_low=pd.Series(dtype="float64"),
+                              median_ci_high=pd.Series(dtype="float64"))
+    cis = [quantile_ci(df, v, by, 0.5, level, **kwargs).assign(metric=v) for v in values]
+    cis = pd.concat(cis, ignore_index=True)[by + ["metric", "ci_low", "ci_high"]]
+    cis = cis.rename(columns={"ci_low": "median_ci_low", "ci_high": "median_ci_high"})
+    return summary.merge(cis, on=by + ["metric"], how="left")
+
+
+def _erfc(z):
+    return np.frompyfunc(math.erfc, 1, 1)(np.asarray(z, dtype="float64")).astype("float64")
+
+
+def _mann_whitney(gid, vals, is_a, groups):
+    """(n_a, n_b, U, two-sided p) per group, from rows sorted by (gid, value)."""
+    # ties share the mean position of their run of equal (group, value)
+    new_run = np.r_[True, (gid[1:] != gid[:-1]) | (vals[1:] != vals[:-1])]
+    run_start = np.flatnonzero(new_run)
+    run_len = np.diff(np.r_[run_start, len(vals)])
+    group_start = np.searchsorted(gid, np.arange(groups))
+    ranks = (run_start + (run_len - 1) / 2)[np.cumsum(new_run) - 1] - group_start[gid] + 1
+
+    n = np.bincount(gid, minlength=groups).astype("float64")
+    n_a = np.bincount(gid, weights=is_a, minlength=groups)
+    n_b = n - n_a
+    u = np.bincount(gid, weights=ranks * is_a, minlength=groups) - n_a * (n_a + 1) / 2
+    ties = np.bincount(gid[run_start], weights=run_len.astype("float64") ** 3 - run_len, minlength=groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = n_a * n_b / 12 * ((n + 1) - ties / (n * (n - 1)))
+        z = np.clip(np.abs(u - n_a * n_b / 2) - 0.5, 0, None) / np.sqrt(np.where(var > 0, var, np.nan))
+    u = np.where((n_a > 0) & (n_b > 0), u, np.nan)
+    return n_a.astype("int64"), n_b.astype("int64"), u, np.clip(_erfc(z / math.sqrt(2)), None, 1.0)
+
+
+def mann_whitney(df, a, b, value="ms", by=(), mode_col="mode"):
+    """Per group of df: n_a, n_b, U of mode a vs mode b and its two-sided p-value."""
+    keys, gid, vals, data, order = _sorted_rows(df[df[mode_col].isin([a, b])], value, list(by))
+    is_a = (data[mode_col] == a).to_numpy()[order]
+    n_a, n_b, u, p = _mann_whitney(gid, vals, is_a, len(keys))
+    return keys.drop(columns="n").assign(n_a=n_a, n_b=n_b, mwu_u=u, mwu_p=p)
+
+
+def permutation_test(a, b, q=0.5, resamples=PERMUTATION_RESAMPLES, seed=BOOTSTRAP_SEED,
+                     max_n=PERMUTATION_MAX_N):
+    """Two-sided permutation p-value for the difference of the q-quantiles of a and b."""
+    a = np.asarray(a, dtype="float64")
+    b = np.asarray(b, dtype="float64")
+    if not len(a) or not len(b):
+        return np.nan
+    rng = np.random.default_rng(seed)
+    if len(a) + len(b) > max_n:
+        keep = max_n / (len(a) + len(b))
+        a = rng.choice(a, max(1, round(len(a) * keep)), replace=False)
+        b = rng.choice(b, max(1, round(len(b) * keep)), replace=False)
+    observed = abs(np.quantile(a, q) - np.quantile(b, q))
+    pooled = np.broadcast_to(np.concatenate([a, b]), (resamples, len(a) + len(b)))
+    shuffled = rng.permuted(pooled, axis=1)
+    diffs = np.abs(np.quantile(shuffled[:, :len(a)], q, axis=1) - np.quantile(shuffled[:, len(a):], q, axis=1))
+    return (1 + np.count_nonzero(diffs >= observed - 1e-12)) / (resamples + 1)
+
+
+def compare_modes(df, value="ms", by=(), mode_col="mode", pairs=None, q=0.5, level=DEFAULT_LEVEL,
+                  resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED, permutations=PERMUTATION_RESAMPLES):
+    """One row per (group of by, pair of modes).
+
+    Columns: both modes' q-quantiles, their difference a - b with a
+    bootstrap CI, Mann-Whitney n / U / p and a permutation p-value
+    (permutations=0 skips it).
+    """
+    name = stat_name(q)
+    columns = list(by) + ["mode_a", "mode_b", f"{name}_a", f"{name}_b", "diff", "diff_ci_low",
+                          "diff_ci_high", "n_a", "n_b", "mwu_u", "mwu_p"] + (["perm_p"] if permutations else [])
+    by = list(by) or ["_all"]
+    if by == ["_all"]:
+        df = df.assign(_all=0)
+    keys, estimate, draws = _bootstrap(df, value, by + [mode_col], q, resamples, seed)
+    keys = keys.assign(estimate=estimate, row=np.arange(len(keys)))
+    if pairs is None:
+        present = set(keys[mode_col])
+        order = list(df[mode_col].cat.categories) if hasattr(df[mode_col], "cat") else sorted(present)
+        pairs = list(itertools.combinations([m for m in order if m in present], 2))
+
+    # one sort of all rows by (group, value) serves every pair's rank and permutation tests
+    groups, gid, vals, data, order = _sorted_rows(df, value, by)
+    codes, names = pd.factorize(data[mode_col])
+    modes = codes[order]
+    code = {m: i for i, m in enumerate(names)}
+    offsets = np.concatenate([[0], np.cumsum(groups["n"].to_numpy())])
+
+    out = []
+    for a, b in pairs:
+        both = keys[keys[mode_col] == a].drop(columns=[mode_col, "n"]).merge(
+            keys[keys[mode_col] == b].drop(columns=[mode_col, "n"]), on=by, suffixes=("_a", "_b"))
+        if both.empty:
+            continue
+        low, high = _ci(draws[both["row_a"].to_numpy()] - draws[both["row_b"].to_numpy()], level)
+        res = both[by].assign(mode_a=a, mode_b=b, **{f"{name}_a": both["estimate_a"].to_numpy(),
+                                                      f"{name}_b": both["estimate_b"].to_numpy()})
+        res["diff"] = res[f"{name}_a"] - res[f"{name}_b"]
+        res["diff_ci_low"], res["diff_ci_high"] = low, high
+
+        ca, cb = code[a], code[b]
+        in_pair = (modes == ca) | (modes == cb)
+        n_a, n_b, u, p = _mann_whitney(gid[in_pair], vals[in_pair], modes[in_pair] == ca, len(groups))
+        res = res.merge(groups[by].assign(n_a=n_a, n_b=n_b, mwu_u=u, mwu_p=p), on=by, how="left")
+        if permutations:
+            group_of = res[by].merge(groups[by].reset_index(), on=by)["index"].to_numpy()
+            res["perm_p"] = [
+                permutation_test(vals[lo:hi][modes[lo:hi] == ca], vals[lo:hi][modes[lo:hi] == cb],
+                                 q, permutations, seed)
+                for lo, hi in zip(offsets[group_of], offsets[group_of + 1])]
+        out.append(res)
+    if not out:
+        return pd.DataFrame(columns=columns)
+    out = pd.concat(out, ignore_index=True)
+    return out.sort_values(by, kind="stable", ignore_index=True)[columns]
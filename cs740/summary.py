@@ -0,0 +1,60 @@
+"""
+Vectorized summary engine.
+
+- summarize() computes count, mean, std, median and quantiles for every
+  group in a single grouped pass and returns a tidy table with one row
+  per (group keys..., metric).
+- When cache_state is one of the group keys, every row also carries the
+  cold -> warm median improvement (%) of its group.
+- stat_series() pulls one statistic back out of a summary for plotting.
+"""
+
+import pandas as pd
+
+GROUP_KEYS = ["mode", "cache_state", "popularity", "site"]
+QUANTILES = (0.25, 0.75, 0.95, 0.99)
+
+
+def quantile_column(q):
+    return f"p{round(q * 100)}"
+
+
+def summarize(df, values="ms", by=GROUP_KEYS, quantiles=QUANTILES):
+    """Tidy per-group statistics of one or more value columns of df."""
+    values = [values] if isinstance(values, str) else list(values)
+    by = list(by)
+    keys = by + ["metric"]
+    quantiles = [q for q in quantiles if q != 0.5]      # reported as `median`
+    stat_cols = ["count", "mean", "std", "median"] + [quantile_column(q) for q in quantiles]
+
+    long = df[by].join(df[values].astype("float64")).melt(
+        id_vars=by, value_vars=values, var_name="metric", value_name="value")
+    if long.empty:
+        return pd.DataFrame(columns=keys + stat_cols + (["improvement_pct"] if "cache_state" in by else []))
+
+    g = long.groupby(keys, observed=True)["value"]
+    out = g.agg(["count", "mean", "std", "median"])
+    if quantiles:
+        q = g.quantile(quantiles).unstack()
+        q.columns = [quantile_column(c) for c in q.columns]
+        out = out.join(q)
+    out = out.reset_index()
+
+    if "cache_state" in by:
+        rest = [k for k in keys if k != "cache_state"]
+        meds = pd.DataFrame({
+            "cold": out["median"].where(out["cache_state"] == "cold"),
+            "warm": out["median"].where(out["cache_state"] == "warm"),
+        })
+        meds = meds.groupby([out[k] for k in rest], observed=True).transform("max")
+        cold = meds["cold"].where(meds["cold"] > 0)
+        out["improvement_pct"] = (cold - meds["warm"]) / cold * 100
+    return out
+
+
+def stat_series(summary, stat, index="mode", **where):
+    """One statistic of summary as a Series indexed by index, for rows matching where."""
+    rows = summary
+    for col, value in where.items():
+        rows = rows[rows[col] == value]
+    return rows.set_index(index)[stat]
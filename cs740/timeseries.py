@@ -0,0 +1,130 @@
+"""
+Time index over measurement rows: range queries and windowed statistics.
+
+- TimeIndex parses a table's timestamps (dns `iso`, web / req `ts`, or a
+  datetime column such as SampleStore.to_frame()'s `ts`) once into int64
+  ns, sorts them, and answers range queries with binary search
+  (np.searchsorted) instead of re-scanning the table. Rows without a
+  timestamp (dig-era files without iso) are left out of the index.
+- windows() computes per-group statistics over fixed steps of the
+  campaign (per-minute median / p95 per mode by default). A window longer
+  than the step gives trailing rolling windows (window="5min" reports the
+  five minutes up to the end of each one-minute step).
+  Every window is a contiguous slice of the sorted timestamps.
+
+Usage:
+    index = TimeIndex(dataset.dns)
+    index.between("2025-12-03T07:40Z", "2025-12-03T08:00Z")
+    index.windows(values, "ms", step="1min", quantiles=(0.5, 0.95))
+"""
+
+import numpy as np
+import pandas as pd
+
+from cs740.summary import quantile_column
+
+TIME_COLUMNS = ("iso", "ts")
+NAT = np.iinfo(np.int64).min
+
+
+def timestamps_ns(times):
+    """int64 ns since the epoch (UTC) of ISO-8601 strings or datetimes; NAT where missing."""
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        times = pd.to_datetime(times, utc=True, errors="coerce", format="ISO8601")
+    elif getattr(times.dtype, "tz", None) is None:
+        times = times.dt.tz_localize("UTC")
+    return times.dt.tz_convert("UTC").to_numpy("datetime64[ns]").view(np.int64)
+
+
+def _ns(when):
+    """int64 ns of a timestamp given as ISO string, datetime or int ns (naive = UTC)."""
+    if isinstance(when, (int, np.integer)):
+        return int(when)
+    when = pd.Timestamp(when)
+    return (when.tz_localize("UTC") if when.tz is None else when).value
+
+
+def _step_ns(step):
+    return pd.Timedelta(step).value
+
+
+class TimeIndex:
+    """Rows of df sorted by time; df itself is neither copied nor reordered."""
+
+    def __init__(self, df, time_col=None):
+        if time_col is None:
+            time_col = next((c for c in TIME_COLUMNS if c in df.columns), None)
+            if time_col is None:
+                raise KeyError(f"no time column ({', '.join(TIME_COLUMNS)}) in table")
+        ns = timestamps_ns(df[time_col])
+        rows = np.flatnonzero(ns != NAT)
+        order = np.argsort(ns[rows], kind="stable")
+        self.df = df
+        self.rows = rows[order]       # positions in df, in time order
+        self.ns = ns[self.rows]       # sorted timestamps
+
+    def __len__(self):
+        return len(self.ns)
+
+    def span(self):
+        """(first, last) timestamp, or (None, None) when nothing is indexed."""
+        if not len(self):
+            return None, None
+        return pd.Timestamp(self.ns[0], tz="UTC"), pd.Timestamp(self.ns[-1], tz="UTC")
+
+    def bounds(self, start=None, end=None):
+        """(lo, hi) such that ns[lo:hi] are the timestamps in [start, end)."""
+        lo = 0 if start is None else int(np.searchsorted(self.ns, _ns(start), side="left"))
+        hi = len(self.ns) if end is None else int(np.searchsorted(self.ns, _ns(end), side="left"))
+        return lo, max(lo, hi)
+
+    def between(self, start=None, end=None):
+        """Rows with start <= time < end (either may be None), in time order."""
+        lo, hi = self.bounds(start, end)
+        return self.df.iloc[self.rows[lo:hi]]
+
+    def windows(self, value, step="1min", window=None, quantiles=(0.5, 0.95), by=("mode",),
+                start=None, end=None):
+        """Tidy per-window statistics of column value: by..., time, count, median / pNN.
+
+        time is the start of each step; a row covers [time + step - window,
+        time + step). Empty windows are omitted.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        step_ns = _step_ns(step)
+        window_ns = step_ns if window is None else _step_ns(window)
+        if step_ns <= 0 or window_ns < step_ns:
+            raise ValueError("step must be positive and window at least one step")
+        stat_cols = ["median" if q == 0.5 else quantile_column(q) for q in quantiles]
+        columns = by + ["time", "count"] + stat_cols
+
+        lo, hi = self.bounds(start, end)
+        rows, ns = self.rows[lo:hi], self.ns[lo:hi]
+        values = self.df[value].to_numpy("float64", na_value=np.nan)[rows]
+        keep = ~np.isnan(values)
+        rows, ns, values = rows[keep], ns[keep], values[keep]
+        if not len(ns):
+            return pd.DataFrame(columns=columns)
+
+        if by:
+            groups = self.df.iloc[rows][by].reset_index(drop=True)
+            members = groups.groupby(by, observed=True, sort=True).indices   # positions stay in time order
+        else:
+            members = {(): np.arange(len(ns))}
+
+        edges = np.arange(ns[0] - ns[0] % step_ns, ns[-1] + step_ns, step_ns)
+        ends = edges + step_ns
+        parts = []
+        for key, member in members.items():
+            g_ns, g_values = ns[member], values[member]
+            los = np.searchsorted(g_ns, ends - window_ns, side="left")
+            his = np.searchsorted(g_ns, ends, side="left")
+            filled = np.flatnonzero(his > los)
+            stats = [np.quantile(g_values[los[i]:his[i]], quantiles) for i in filled]
+            part = pd.DataFrame(np.reshape(stats, (len(filled), len(quantiles))), columns=stat_cols)
+            part.insert(0, "count", his[filled] - los[filled])
+            part.insert(0, "time", pd.to_datetime(edges[filled], utc=True))
+            for name, k in reversed(list(zip(by, key if isinstance(key, tuple) else (key,)))):
+                part.insert(0, name, k)
+            parts.append(part)
+        return pd.concat(parts, ignore_index=True)[columns]
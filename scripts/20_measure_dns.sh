@@ -9,7 +9,11 @@ trials="${5:-5}"
 mkdir -p "$(dirname "$out")"
 
 # Write header if file does not exist
-[[ -f "$out" ]] || echo "iso,mode,site,trial,ms,status" > "$out"
+[[ -f "$out" ]] || echo "iso,mode,site,trial,ms,status,us" > "$out"
+
+# Files started before the us column existed keep their six columns
+with_us=0
+[[ "$(head -n 1 "$out")" == *",us" ]] && with_us=1
 
 isodate() { date -u +"%Y-%m-%dT%H:%M:%SZ"; }
 
@@ -86,11 +90,12 @@ flush() {
 
 #
 # --- Actual DNS timing using dig ---
+# Prints "<ms> <us>"; newer dig reports usec, older dig whole msec.
 #
 dns_time() {
   dig +tries=1 +time=5 +stats A "$site" @"$resolver_host" \
       ${port_arg+"${port_arg[@]}"} 2>/dev/null \
-    | awk '/Query time/ {print $4}'
+    | awk '/Query time/ { us = ($5 == "usec") ? $4 : $4 * 1000; printf "%.0f %.1f\n", us / 1000, us }'
 }
 
 #
@@ -99,16 +104,20 @@ dns_time() {
 for t in $(seq 1 "$trials"); do
   flush
 
-  ms="$(dns_time)"
+  read -r ms us <<< "$(dns_time)"
   status="ok"
 
   if [[ -z "${ms:-}" ]]; then
-    ms="NA"
+    ms="NA"; us="NA"
     status="no_response"
-  elif ! [[ "$ms" =~ ^[0-9]+$ ]]; then
+  elif ! [[ "$ms" =~ ^[0-9]+$ && "$us" =~ ^[0-9]+(\.[0-9]+)?$ ]]; then
     status="bad_parse"
-    ms="NA"
+    ms="NA"; us="NA"
   fi
 
-  echo "$(isodate),$mode,$site,$t,$ms,$status" >> "$out"
+  if (( with_us )); then
+    echo "$(isodate),$mode,$site,$t,$ms,$status,$us" >> "$out"
+  else
+    echo "$(isodate),$mode,$site,$t,$ms,$status" >> "$out"
+  fi
 done
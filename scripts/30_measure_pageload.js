@@ -5,6 +5,15 @@ const puppeteer = require('puppeteer');
 
 function iso(){ return new Date().toISOString(); }
 function asInt(v){ return (Number.isFinite(v) && v >= 0) ? Math.round(v) : 'NA'; }
+// Per-request timings go next to the page-load file: doh_web_cold.csv -> doh_req_cold.csv
+function reqPath(out){
+  if (out === '/dev/null') return null;
+  const ext = path.extname(out), parts = path.basename(out, ext).split('_');
+  if (parts.includes('web')) parts[parts.indexOf('web')] = 'req'; else parts.push('req');
+  return path.join(path.dirname(out), parts.join('_') + ext);
+}
+const REQ_HEADER = "ts,mode,site,entry,host,initiator,start_ms,dns_start_ms,dns_end_ms," +
+                   "connect_start_ms,connect_end_ms,tls_start_ms,response_end_ms\n";
 function pickChromePath(){
   const env = process.env.CHROME_PATH || process.env.PUPPETEER_EXECUTABLE_PATH;
   if (env && fs.existsSync(env)) return env;
@@ -61,24 +70,41 @@ if (!fs.existsSync(out)) fs.appendFileSync(out, "ts,mode,site,ttfb_ms,dom_ms,loa
 
     const m = await page.evaluate(() => {
       try {
+        // ms since navigation start; 0 = not exposed (no Timing-Allow-Origin, reused connection)
+        const ms = v => (Number.isFinite(v) && v > 0) ? Math.round(v * 10) / 10 : 'NA';
+        const host = u => { try { return new URL(u).host; } catch { return ''; } };
+        const req = (kind, e) => [kind, host(e.name), e.initiatorType || kind, Math.max(0, Math.round(e.startTime * 10) / 10),
+          ms(e.domainLookupStart), ms(e.domainLookupEnd), ms(e.connectStart), ms(e.connectEnd),
+          ms(e.secureConnectionStart), ms(e.responseEnd)];
         const nav = performance.getEntriesByType('navigation')[0];
+        const resources = performance.getEntriesByType('resource').map(e => req('resource', e));
         if (nav) {
-          return { ttfb: nav.responseStart, dom: nav.domContentLoadedEventEnd, load: nav.loadEventEnd };
+          return { ttfb: nav.responseStart, dom: nav.domContentLoadedEventEnd, load: nav.loadEventEnd,
+                   requests: [req('navigation', nav), ...resources] };
         }
         const t = performance.timing;
         return {
           ttfb: t.responseStart - t.navigationStart,
           dom:  t.domContentLoadedEventEnd - t.navigationStart,
-          load: t.loadEventEnd - t.navigationStart
+          load: t.loadEventEnd - t.navigationStart,
+          requests: resources
         };
       } catch {
         return { ttfb: NaN, dom: NaN, load: NaN };
       }
     });
 
-    const row = [iso(), mode, site, asInt(m.ttfb), asInt(m.dom), asInt(m.load), 'ok'].join(',');
+    const ts = iso();
+    const row = [ts, mode, site, asInt(m.ttfb), asInt(m.dom), asInt(m.load), 'ok'].join(',');
     fs.appendFileSync(out, row + '\n', 'utf8');
 
+    const reqOut = reqPath(out);
+    if (reqOut && m.requests?.length) {
+      if (!fs.existsSync(reqOut)) fs.appendFileSync(reqOut, REQ_HEADER);
+      const lines = m.requests.map(r => [ts, mode, site, ...r].join(',') + '\n').join('');
+      fs.appendFileSync(reqOut, lines, 'utf8');
+    }
+
     if (ctx?.close) await ctx.close();
     await browser.close();
   } catch (e) {
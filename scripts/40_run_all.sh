@@ -28,7 +28,8 @@ for mode in $modes; do
   web_cold="$OUT_DIR/${mode}_web_cold.csv"
   web_warm="$OUT_DIR/${mode}_web_warm.csv"
 
-  rm -f "$dns_cold" "$dns_warm" "$web_cold" "$web_warm"
+  rm -f "$dns_cold" "$dns_warm" "$web_cold" "$web_warm" \
+        "$OUT_DIR/${mode}_req_cold.csv" "$OUT_DIR/${mode}_req_warm.csv"
 
   for site in "${sites[@]}"; do
     echo "mode=$mode site=$site resolver=$RESOLVER_IP"
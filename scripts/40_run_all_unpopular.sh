@@ -26,7 +26,8 @@ for mode in $modes; do
   web_warm="$OUT_DIR/${mode}_web_warm_unpopular.csv"
 
   # Start fresh for this mode
-  rm -f "$dns_cold" "$dns_warm" "$web_cold" "$web_warm"
+  rm -f "$dns_cold" "$dns_warm" "$web_cold" "$web_warm" \
+        "$OUT_DIR/${mode}_req_cold_unpopular.csv" "$OUT_DIR/${mode}_req_warm_unpopular.csv"
 
   for site in "${sites[@]}"; do
     safe_site=$(echo "$site" | sed 's|https\?://||; s|/|_|g')
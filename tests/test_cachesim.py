@@ -0,0 +1,58 @@
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from cs740 import cachesim
+from cs740.cachesim import Trace, resident, simulate, smaller_before
+
+
+def lru(site, time, capacity, ttl=np.inf):
+    """Hit flags of a plain LRU whose entries expire ttl after they were fetched."""
+    cache, hits = OrderedDict(), []
+    for s, t in zip(site, time):
+        hit = s in cache and t < cache[s] + ttl
+        hits.append(hit)
+        fetched = cache[s] if hit else t
+        cache.pop(s, None)
+        cache[s] = fetched
+        if len(cache) > capacity:
+            cache.popitem(last=False)
+    return np.array(hits, bool)
+
+
+def traces(n_cases, seed=3):
+    rng = np.random.default_rng(seed)
+    for _ in range(n_cases):
+        n, names = int(rng.integers(1, 400)), int(rng.integers(1, 60))
+        site = rng.integers(0, names, n).astype(np.int32)
+        yield site, names, int(rng.integers(1, names + 5)), rng
+
+
+def test_smaller_before():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 50, 1000)
+    at = np.sort(rng.choice(1000, 300, replace=False))
+    naive = [(values[:i] < values[i]).sum() for i in at]
+    assert smaller_before(values, at).tolist() == naive
+
+
+@pytest.mark.parametrize("level_cost", [0, 10 ** 6], ids=["merge", "per-name"])
+def test_resident_matches_lru(monkeypatch, level_cost):
+    monkeypatch.setattr(cachesim, "MERGE_LEVEL_COST", level_cost)
+    for site, names, capacity, _ in traces(300):
+        assert (resident(site, names, capacity) == lru(site, range(len(site)), capacity)).all()
+
+
+def test_simulate_ttl_expiry_matches_lru():
+    for site, names, capacity, rng in traces(200, seed=5):
+        time = np.cumsum(rng.exponential(1.0, len(site)))
+        ttl = rng.uniform(0.5, 20)
+        trace = Trace(time, site, [f"s{i}" for i in range(names)])
+        assert (simulate(trace, ttl, capacity) == lru(site, time, capacity, ttl)).all()
+
+
+def test_simulate_per_site_ttl():
+    # site 0 expires after 1.5 s, site 1 never within the trace
+    trace = Trace(np.arange(6.0), np.array([0, 1, 0, 1, 0, 1], np.int32), ["a", "b"])
+    assert simulate(trace, [1.5, 100.0], capacity=10).tolist() == [False, False, False, True, False, True]
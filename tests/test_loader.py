@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cs740.catalog import compact, recognise, scan
+from cs740.loader import consolidate, load_dataset, precise_ms, read_raw
+from cs740.query import select
+
+RAW = os.path.join(os.path.dirname(__file__), "data", "raw")
+KEY = ["mode", "cache_state", "site", "trial", "iso"]
+
+
+@pytest.fixture(scope="module")
+def dns():
+    return load_dataset(RAW, cache=False, workers=1).dns
+
+
+def rows(df, mode, cache_state):
+    return df[(df["mode"] == mode) & (df["cache_state"] == cache_state)].reset_index(drop=True)
+
+
+def test_labels_from_file_names(dns):
+    got = dns.groupby(["mode", "cache_state", "popularity"], observed=True).size().to_dict()
+    assert got == {("dot", "cold", "popular"): 5, ("doh", "warm", "popular"): 3,
+                   ("tcp", "cold", "popular"): 5}
+
+
+def test_typed_columns(dns):
+    assert list(dns.columns[:6]) == ["iso", "mode", "site", "trial", "ms", "status"]
+    for col, dtype in {"trial": "int32", "ms": "Int32", "us": "float64", "ttl": "Int32",
+                       "handshake_us": "float64"}.items():
+        assert dns[col].dtype == dtype, col
+    for col in ("site", "status", "mode", "cache_state", "popularity", "cache"):
+        assert isinstance(dns[col].dtype, pd.CategoricalDtype), col
+    assert set(dns["status"].cat.categories) == {"ok", "timeout", "no_response"}
+
+
+def test_headerless_file(dns):
+    dot = rows(dns, "dot", "cold")
+    assert list(dot["site"].astype(str)) == ["example.com"] * 2 + ["wikipedia.org"] * 3
+    assert list(dot["ms"].astype("float64").fillna(-1)) == [162, 41, 0, 38, -1]
+    # dig-era rows get `us` from whole milliseconds and nothing else
+    assert list(dot["us"].fillna(-1)) == [162000, 41000, 0, 38000, -1]
+    assert dot["ttl"].isna().all() and dot["handshake_us"].isna().all()
+
+
+def test_us_column_kept(dns):
+    tcp = rows(dns, "tcp", "cold")
+    assert list(tcp["us"].iloc[:4]) == [23456.5, 812.25, 1500, 30120]
+    assert np.isnan(tcp["us"].iloc[4])
+    assert list(tcp["ttl"].iloc[:4]) == [300, 299, 298, 3600]
+    assert tcp["status"].iloc[4] == "no_response"
+
+
+def test_classify_cache(dns):
+    # dig-era rows: miss on the first trial of a cold run, hit otherwise
+    assert list(rows(dns, "dot", "cold")["cache"]) == ["miss", "hit", "miss", "hit", "hit"]
+    assert list(rows(dns, "doh", "warm")["cache"]) == ["hit"] * 3
+    # recorded labels win; a blank one falls back to the rule
+    assert list(rows(dns, "tcp", "cold")["cache"]) == ["miss", "hit", "hit", "hit", "hit"]
+
+
+def test_precise_ms(dns):
+    out = precise_ms(dns)
+    assert (out["us"] != 0).all()
+    assert len(out) == len(dns) - 2               # the cold and the warm 0 ms dig rows
+    assert out["ms"].dtype == "float64"
+    tcp = rows(out, "tcp", "cold")
+    assert list(tcp["ms"].iloc[:4]) == [23.4565, 0.81225, 1.5, 30.12]
+
+    cold = precise_ms(dns, drop_unresolved="cold")
+    assert len(cold) == len(dns) - 1
+    assert list(rows(cold, "doh", "warm")["ms"]) == [0, 12, 25]
+
+    assert len(precise_ms(dns, drop_unresolved=False)) == len(dns)
+
+
+def test_per_site_file():
+    raw, layout = recognise(os.path.join(RAW, "dns", "ietf.org_dot_cold.csv"), {"ietf.org"})
+    assert layout == "per_site"
+    assert (raw.table, raw.mode, raw.cache_state, raw.popularity) == ("dns", "dot", "cold", "unpopular")
+    df = consolidate("dns", [raw], [read_raw(raw)])
+    assert list(df["site"].astype(str)) == ["https://ietf.org"] * 3
+    assert list(df["cache"]) == ["miss", "hit", "hit"]
+    assert list(df["popularity"]) == ["unpopular"] * 3
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("catalog")
+    index = scan([RAW], index_path=str(tmp / "catalog.json"), workers=1)
+    assert sorted(index["layout"]) == ["legacy", "legacy", "per_mode", "per_site"]
+    compact(index, store=str(tmp / "store"), tables=["dns"], workers=1)
+    files = ("dns_dot_cold.csv", "dns_doh_warm.csv", "tcp_dns_cold.csv", "dns/ietf.org_dot_cold.csv")
+    raws = [recognise(os.path.join(RAW, f), {"ietf.org"})[0] for f in files]
+    full = consolidate("dns", raws, [read_raw(r) for r in raws])
+    return str(tmp / "store"), full
+
+
+def plain(df):
+    df = df[KEY + ["ms", "us", "status", "cache", "popularity"]]
+    df = df.astype({c: str for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+    return df.sort_values(KEY).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("mode,cache_state", [("dot", "cold"), ("doh", "warm"), ("tcp", "cold"),
+                                              ("doh", "cold")])
+def test_select_matches_full_load(store, mode, cache_state):
+    path, full = store
+    got = select(mode=mode, cache_state=cache_state, status="ok", ms_gt=0, store=path)
+    want = full[(full["mode"] == mode) & (full["cache_state"] == cache_state)
+                & (full["status"] == "ok") & (full["ms"] > 0)]
+    pd.testing.assert_frame_equal(plain(got), plain(want))
+    assert got["ms"].dtype == "Int32" and isinstance(got["site"].dtype, pd.CategoricalDtype)
+
+
+def test_select_spans_files(store):
+    path, full = store
+    got = select(mode="dot", cache_state="cold", store=path)
+    assert len(got) == 8
+    assert set(got["popularity"].astype(str)) == {"popular", "unpopular"}
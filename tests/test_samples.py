@@ -0,0 +1,31 @@
+from cs740.samples import SampleStore, from_csv, to_csv
+
+ROWS = ["2025-12-03T07:39:59Z,doh,example.com,1,12,ok",
+        "2025-12-03T07:40:00Z,doh,example.com,2,3,ok"]
+
+
+def _write(path, lines, mode="w"):
+    with open(path, mode) as f:
+        f.writelines(line + "\n" for line in lines)
+
+
+def test_from_csv_twice_appends_only_new_rows(tmp_path):
+    raw_dir, store_dir = tmp_path / "raw", tmp_path / "store"
+    raw_dir.mkdir()
+    csv = raw_dir / "doh_dns_cold.csv"
+    _write(csv, ["iso,mode,site,trial,ms,status"] + ROWS)
+    _write(raw_dir / "dot_dns_warm.csv", ["2025-12-03T08:00:00Z,dot,example.com,1,9,ok"])  # headerless
+
+    assert from_csv([str(raw_dir)], SampleStore(str(store_dir))) == 3
+    assert from_csv([str(raw_dir)], SampleStore(str(store_dir))) == 0
+    assert len(SampleStore(str(store_dir))) == 3
+
+    _write(csv, ["2025-12-03T07:40:01Z,doh,example.com,3,4,ok"], mode="a")
+    store = SampleStore(str(store_dir))
+    assert from_csv([str(raw_dir)], store) == 1
+    assert len(store) == 4
+    assert store.to_frame()["ms"].tolist() == [12, 3, 9, 4]
+
+    out = tmp_path / "out"
+    paths = to_csv(store, str(out))
+    assert sum(len(open(p).readlines()) - 1 for p in paths) == 4
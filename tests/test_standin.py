@@ -0,0 +1,68 @@
+import asyncio
+import shutil
+import subprocess
+
+import pytest
+
+from cs740.measure import run, tls_context
+from cs740.standin import StandIn, server_tls_context
+
+SITES = ["example.com", "apache.org", "cern.ch"]
+MISS_MS = 40
+
+
+@pytest.fixture(scope="module")
+def cert(tmp_path_factory):
+    if shutil.which("openssl") is None:
+        pytest.skip("openssl not available")
+    d = tmp_path_factory.mktemp("cert")
+    key, pem = d / "key.pem", d / "cert.pem"
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+                    "-keyout", str(key), "-out", str(pem)], check=True, capture_output=True)
+    return str(pem), str(key)
+
+
+def measure(transport, trials=3, timeout=2.0, cert=None, **standin):
+    async def go():
+        tls = server_tls_context(*cert) if cert else None
+        ports = dict(dot_port=0, doh_port=0, ssl_context=tls) if cert else {}
+        async with StandIn(port=0, hit="const:0", miss=f"const:{MISS_MS}", seed=1, **ports,
+                           **standin) as server:
+            client_tls = tls_context(cert[0]) if cert else None
+            rows = await run(SITES, server.endpoints()[transport], transport, trials=trials,
+                             transport=transport, timeout=timeout, ssl_context=client_tls,
+                             server_hostname="localhost" if cert else None)
+            return rows, dict(server.stats)
+    return asyncio.run(go())
+
+
+def check_latency_and_hits(rows):
+    assert len(rows) == len(SITES) * 3 and all(r.status == "ok" for r in rows)
+    for row in rows:
+        us = float(row.us)
+        if row.trial == 1:
+            assert MISS_MS * 1000 <= us < MISS_MS * 1000 + 30_000
+        else:
+            assert us < MISS_MS * 1000
+            assert row.cache == "hit"
+
+
+@pytest.mark.parametrize("transport", ["udp", "tcp"])
+def test_latency_and_cache_hits(transport):
+    rows, stats = measure(transport)
+    check_latency_and_hits(rows)
+    assert stats["misses"] == len(SITES) and stats["hits"] == 2 * len(SITES)
+
+
+@pytest.mark.parametrize("transport", ["dot", "doh"])
+def test_latency_and_cache_hits_encrypted(transport, cert):
+    rows, _ = measure(transport, cert=cert)
+    check_latency_and_hits(rows)
+
+
+def test_udp_loss_times_out():
+    rows, stats = measure("udp", trials=10, timeout=0.2, loss=0.3)
+    lost = [r for r in rows if r.status == "no_response"]
+    assert 0 < len(lost) < len(rows)
+    assert len(lost) == stats["lost"]
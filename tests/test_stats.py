@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cs740.stats import mann_whitney, permutation_test, quantile_ci
+
+
+def naive_ci(values, q, level, resamples, rng):
+    draws = np.quantile(rng.choice(values, size=(resamples, len(values)), replace=True), q, axis=1)
+    return np.quantile(draws, [(1 - level) / 2, (1 + level) / 2])
+
+
+@pytest.mark.parametrize("q", [0.5, 0.9])
+def test_quantile_ci_matches_naive_bootstrap(q):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"mode": np.repeat(["doh", "dot"], [150, 60]),
+                       "ms": np.r_[rng.lognormal(3, 0.5, 150), rng.lognormal(2, 1.0, 60)]})
+    ci = quantile_ci(df, q=q, resamples=20_000, seed=2)
+    for row in ci.itertuples():
+        values = df.loc[df["mode"] == row.mode, "ms"].to_numpy()
+        low, high = naive_ci(values, q, 0.95, 20_000, np.random.default_rng(3))
+        assert row.n == len(values)
+        assert row.estimate == pytest.approx(np.quantile(values, q))
+        tol = 0.05 * (high - low)
+        assert row.ci_low == pytest.approx(low, abs=tol)
+        assert row.ci_high == pytest.approx(high, abs=tol)
+
+
+def test_quantile_ci_is_seeded():
+    df = pd.DataFrame({"mode": "doh", "ms": np.arange(50.0)})
+    assert quantile_ci(df, seed=7).equals(quantile_ci(df, seed=7))
+
+
+# a = 1, 2, 3 and b = 2, 4, 5, 6: ranks of a are 1, 2.5 (tied with b's 2) and 4
+MWU = pd.DataFrame({"mode": list("aaabbbb"), "ms": [1, 2, 3, 2, 4, 5, 6], "site": "x"})
+
+
+def test_mann_whitney_hand_computed():
+    out = mann_whitney(MWU, "a", "b").iloc[0]
+    u = (1 + 2.5 + 4) - 3 * 4 / 2
+    var = 3 * 4 / 12 * ((7 + 1) - (2 ** 3 - 2) / (7 * 6))       # tie-corrected
+    z = (abs(u - 3 * 4 / 2) - 0.5) / math.sqrt(var)              # continuity-corrected
+    assert (out["n_a"], out["n_b"]) == (3, 4)
+    assert out["mwu_u"] == pytest.approx(u)
+    assert out["mwu_p"] == pytest.approx(math.erfc(z / math.sqrt(2)))
+
+
+def test_mann_whitney_per_group_matches_scipy():
+    scipy_stats = pytest.importorskip("scipy.stats")
+    rng = np.random.default_rng(4)
+    df = pd.DataFrame({"mode": rng.choice(["a", "b"], 300), "site": rng.choice(["x", "y", "z"], 300),
+                       "ms": rng.integers(0, 20, 300).astype(float)})
+    out = mann_whitney(df, "a", "b", by=["site"])
+    for row in out.itertuples():
+        g = df[df["site"] == row.site]
+        ref = scipy_stats.mannwhitneyu(g.loc[g["mode"] == "a", "ms"], g.loc[g["mode"] == "b", "ms"],
+                                       method="asymptotic")
+        assert row.mwu_u == pytest.approx(ref.statistic)
+        assert row.mwu_p == pytest.approx(ref.pvalue)
+
+
+def test_permutation_test():
+    rng = np.random.default_rng(5)
+    a, b = rng.normal(10, 1, 80), rng.normal(10, 1, 80)
+    assert permutation_test(a, b, resamples=999) > 0.05
+    assert permutation_test(a, b + 5, resamples=999) == pytest.approx(1 / 1000)
+    assert np.isnan(permutation_test([], b))